@@ -1,4 +1,5 @@
+from ._browser_pool import BrowserContextPool
 from ._multimodal_web_surfer import MultimodalWebSurfer
 from .playwright_controller import PlaywrightController
 
-__all__ = ["MultimodalWebSurfer", "PlaywrightController"]
+__all__ = ["BrowserContextPool", "MultimodalWebSurfer", "PlaywrightController"]
@@ -0,0 +1,196 @@
+import asyncio
+import logging
+import os
+from typing import Any, Dict, List, Optional
+
+from autogen_core import EVENT_LOGGER_NAME
+from playwright.async_api import Browser, BrowserContext, Playwright, async_playwright
+
+from ._events import WebSurferEvent
+
+DEFAULT_USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36 Edg/122.0.0.0"
+
+
+class BrowserContextPool:
+    """
+    A pool of isolated browser contexts sharing one Chromium process.
+
+    The browser is launched (or connected to over CDP) once, on the first use. Every context of the pool starts from
+    the same storage state, so the surfers are logged in like the user's browser without sharing pages, cookies
+    written during a task or history. When connected over CDP, the storage state is taken from the default context
+    of the browser unless a storage state file is given.
+
+    Contexts are checked before they are handed out, and closed once they have served recycle_after tasks, so a
+    context leaking memory or stuck on a broken page does not outlive a few registrations.
+
+    Args:
+        max_size (int): The maximum number of contexts open at once; acquire waits when all of them are in use.
+        recycle_after (int): The number of tasks after which a context is closed and replaced by a new one.
+        warm_up (int): The number of contexts created when the pool starts.
+        connect_over_cdp (str): The CDP endpoint of a running browser. A browser is launched when empty.
+        headless (bool): Whether to launch the browser headless.
+        browser_channel (str | None): The channel of the launched browser, e.g. "chrome".
+        storage_state (str | None): A storage state file (cookies and local storage) to start the contexts from.
+        user_agent (str): The user agent of the contexts of a launched browser.
+        health_check_timeout (float): The number of seconds a context has to answer the health check.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 4,
+        recycle_after: int = 20,
+        warm_up: int = 1,
+        connect_over_cdp: str = "",
+        headless: bool = True,
+        browser_channel: Optional[str] = None,
+        storage_state: Optional[str] = None,
+        user_agent: str = DEFAULT_USER_AGENT,
+        health_check_timeout: float = 5.0,
+    ) -> None:
+        self.max_size = max(max_size, 1)
+        self.recycle_after = max(recycle_after, 1)
+        self.warm_up_size = min(warm_up, self.max_size)
+        self.connect_over_cdp = connect_over_cdp
+        self.headless = headless
+        self.browser_channel = browser_channel
+        self.storage_state_path = storage_state
+        self.user_agent = user_agent
+        self.health_check_timeout = health_check_timeout
+
+        self._playwright: Optional[Playwright] = None
+        self._browser: Optional[Browser] = None
+        self._storage_state: Optional[Dict[str, Any]] = None
+        self._idle: List[BrowserContext] = []
+        self._uses: Dict[int, int] = {}
+        self._lock: Optional[asyncio.Lock] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.created = 0
+        self.recycled = 0
+        self.logger = logging.getLogger(EVENT_LOGGER_NAME + ".BrowserContextPool")
+
+    @property
+    def in_use(self) -> int:
+        return len(self._uses) - len(self._idle)
+
+    async def start(self) -> None:
+        """Launch or connect to the browser, capture the storage state and create the warm-up contexts."""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+            self._slots = asyncio.Semaphore(self.max_size)
+        async with self._lock:
+            # A browser disconnected since is restarted by acquire
+            if self._browser is not None:
+                return
+            await self._start_browser()
+            while len(self._idle) < self.warm_up_size:
+                self._idle.append(await self._new_context())
+
+    async def acquire(self) -> BrowserContext:
+        """Hand out a healthy context, waiting while max_size contexts are in use."""
+        await self.start()
+        assert self._lock is not None and self._slots is not None
+        await self._slots.acquire()
+        try:
+            async with self._lock:
+                if self._browser is None or not self._browser.is_connected():
+                    await self._restart_browser()
+                while self._idle:
+                    context = self._idle.pop()
+                    if await self._is_healthy(context):
+                        return context
+                    await self._discard(context, "failed the health check")
+                return await self._new_context()
+        except BaseException:
+            self._slots.release()
+            raise
+
+    async def release(self, context: BrowserContext) -> None:
+        """Take a context back after a task. Its pages are closed, it is recycled once it has served recycle_after tasks."""
+        assert self._lock is not None and self._slots is not None
+        try:
+            async with self._lock:
+                uses = self._uses.get(id(context), 0) + 1
+                self._uses[id(context)] = uses
+                if uses >= self.recycle_after:
+                    await self._discard(context, f"served {uses} tasks")
+                elif not await self._is_healthy(context):
+                    await self._discard(context, "failed the health check")
+                else:
+                    for page in list(context.pages):
+                        await page.close()
+                    self._idle.append(context)
+        finally:
+            self._slots.release()
+
+    async def close(self) -> None:
+        for context in self._idle:
+            await self._close_context(context)
+        self._idle = []
+        self._uses = {}
+        # A browser reached over CDP belongs to the user, only the connection is dropped
+        if self._browser is not None and not self.connect_over_cdp:
+            await self._browser.close()
+        self._browser = None
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+
+    async def _start_browser(self) -> None:
+        if self._playwright is None:
+            self._playwright = await async_playwright().start()
+        if self.connect_over_cdp:
+            self._browser = await self._playwright.chromium.connect_over_cdp(self.connect_over_cdp)
+        else:
+            launch_args: Dict[str, Any] = {"headless": self.headless}
+            if self.browser_channel is not None:
+                launch_args["channel"] = self.browser_channel
+            self._browser = await self._playwright.chromium.launch(**launch_args)
+
+        if self.connect_over_cdp and self._browser.contexts and not self._has_storage_state_file():
+            # The default context of the user's browser holds the logged-in sessions
+            self._storage_state = await self._browser.contexts[0].storage_state()
+
+    async def _restart_browser(self) -> None:
+        self.logger.info(WebSurferEvent(source="BrowserContextPool", url="", message="Browser disconnected, restarting it."))
+        self._idle = []
+        self._uses = {}
+        self._browser = None
+        await self._start_browser()
+
+    async def _new_context(self) -> BrowserContext:
+        assert self._browser is not None
+        options: Dict[str, Any] = {}
+        if self._has_storage_state_file():
+            options["storage_state"] = self.storage_state_path
+        elif self._storage_state is not None:
+            options["storage_state"] = self._storage_state
+        if not self.connect_over_cdp:
+            options["user_agent"] = self.user_agent
+        context = await self._browser.new_context(**options)
+        self._uses[id(context)] = 0
+        self.created += 1
+        return context
+
+    def _has_storage_state_file(self) -> bool:
+        return self.storage_state_path is not None and os.path.exists(self.storage_state_path)
+
+    async def _is_healthy(self, context: BrowserContext) -> bool:
+        if self._browser is None or not self._browser.is_connected():
+            return False
+        try:
+            await asyncio.wait_for(context.cookies(), self.health_check_timeout)
+            return True
+        except Exception:
+            return False
+
+    async def _discard(self, context: BrowserContext, reason: str) -> None:
+        self.logger.info(WebSurferEvent(source="BrowserContextPool", url="", message=f"Closing a browser context that {reason}."))
+        self._uses.pop(id(context), None)
+        self.recycled += 1
+        await self._close_context(context)
+
+    async def _close_context(self, context: BrowserContext) -> None:
+        try:
+            await context.close()
+        except Exception:
+            pass
@@ -0,0 +1,54 @@
+import re
+from dataclasses import dataclass, field
+from typing import List
+
+from autogen_core.models import AssistantMessage, LLMMessage, UserMessage
+
+# The longest action kept in the log, e.g. a long text typed into a form is cut
+MAX_STEP_LENGTH = 200
+
+_PAGE = re.compile(r"web browser is open to the page \[(.*?)\]\((.*?)\)")
+
+
+def summarize_step(content: str) -> str:
+    """
+    One line of the action log for an observation of the surfer: the action, which is its first paragraph, and the
+    page it led to. Observations without a page, like answers, are cut to their first line.
+    """
+    action = content.strip().split("\n\n", 1)[0].split("\n", 1)[0].strip()
+    if len(action) > MAX_STEP_LENGTH:
+        action = action[: MAX_STEP_LENGTH - 3] + "..."
+    page = _PAGE.search(content)
+    if page is not None:
+        action += f" The page was then [{page.group(1)}]({page.group(2)})."
+    return action
+
+
+@dataclass
+class CompactedHistory:
+    """
+    The first `covered` messages of the chat history of a surfer, as the requests among them followed by a log of
+    the steps taken. The log only grows, so the compacted prefix of the prompt stays the same from one compaction to
+    the next but for the lines appended to it.
+    """
+
+    source: str
+    covered: int = 0
+    requests: List[LLMMessage] = field(default_factory=list)
+    steps: List[str] = field(default_factory=list)
+    # Built once per compaction, the same messages are sent on every step until the next one
+    prefix: List[LLMMessage] = field(default_factory=list)
+
+    def extend(self, history: List[LLMMessage], end: int) -> None:
+        """Compact the messages of the history up to end, the ones before covered being compacted already."""
+        for message in history[self.covered : end]:
+            if isinstance(message, AssistantMessage) and isinstance(message.content, str):
+                self.steps.append(summarize_step(message.content))
+            elif isinstance(message, UserMessage):
+                self.requests.append(message)
+        self.covered = max(self.covered, end)
+
+        self.prefix = list(self.requests)
+        if self.steps:
+            log = "Here is a summary of the steps I took earlier:\n" + "\n".join(f"{i + 1}. {step}" for i, step in enumerate(self.steps))
+            self.prefix.append(AssistantMessage(content=log, source=self.source))
@@ -1,7 +1,6 @@
 import asyncio
 import base64
 import hashlib
-import io
 import json
 import logging
 import os
@@ -17,17 +16,16 @@ from typing import (
     List,
     Optional,
     Sequence,
+    cast,
 )
 from urllib.parse import quote_plus
 
 import aiofiles
-import PIL.Image
 from autogen_agentchat.agents import BaseChatAgent
 from autogen_agentchat.base import Response, TerminatedException, TerminationCondition
 from autogen_agentchat.messages import AgentEvent, ChatMessage, MultiModalMessage, StopMessage, TextMessage, ToolCallExecutionEvent
 from autogen_agentchat.utils import content_to_str, remove_images
 from autogen_core import EVENT_LOGGER_NAME, CancellationToken, Component, ComponentModel, FunctionCall
-from autogen_core import Image as AGImage
 from autogen_core.models import (
     AssistantMessage,
     ChatCompletionClient,
@@ -38,17 +36,22 @@ from autogen_core.models import (
     UserMessage,
 )
 from PIL import Image
-from playwright.async_api import BrowserContext, Download, Page, Playwright, async_playwright
+from playwright.async_api import BrowserContext, Download, FloatRect, Page, Playwright, async_playwright
 from pydantic import BaseModel
 from typing_extensions import Self
 
+from ._browser_pool import BrowserContextPool
 from ._events import WebSurferEvent
+from ._history import CompactedHistory
+from ._page_diff import MAX_DIFF_RATIO, diff_lines, diff_targets, visible_targets
 from ._prompts import (
     WEB_SURFER_QA_PROMPT,
     WEB_SURFER_QA_SYSTEM_MESSAGE,
+    WEB_SURFER_SYSTEM_MESSAGE,
     WEB_SURFER_TOOL_PROMPT_MM,
     WEB_SURFER_TOOL_PROMPT_TEXT,
 )
+from ._screenshot import SCREENSHOT_EXTENSIONS, EncodedImage, ScreenshotFormat, capture_screenshot, dhash, hash_distance
 from ._set_of_mark import add_set_of_mark
 from ._tool_definitions import (
     TOOL_CLICK,
@@ -66,7 +69,7 @@ from ._tool_definitions import (
     TOOL_VISIT_URL,
     TOOL_WEB_SEARCH,
 )
-from ._types import InteractiveRegion, UserContent
+from ._types import InteractiveRegion, PageObservation, UserContent
 from .playwright_controller import PlaywrightController
 from autogen_agentchat.conditions import ExternalTermination
 
@@ -139,6 +142,13 @@ class MultimodalWebSurferConfig(BaseModel):
     browser_data_dir: str | None = None
     to_resize_viewport: bool = True
     connect_over_cdp: str = ""
+    screenshot_format: ScreenshotFormat = "jpeg"
+    screenshot_quality: int = 80
+    # A FloatRect, pydantic does not take the TypedDict of Playwright on Python 3.11
+    screenshot_clip: Dict[str, float] | None = None
+    screenshot_dedup_distance: int = 4
+    history_token_budget: int = 6000
+    history_keep_last: int = 4
 
 
 class MultimodalWebSurfer(BaseChatAgent, Component[MultimodalWebSurferConfig]):
@@ -198,6 +208,12 @@ class MultimodalWebSurfer(BaseChatAgent, Component[MultimodalWebSurferConfig]):
         browser_channel (str, optional): The browser channel. Defaults to None.
         browser_data_dir (str, optional): The browser data directory. Defaults to None.
         to_resize_viewport (bool, optional): Whether to resize the viewport. Defaults to True.
+        screenshot_format (str, optional): The format of the screenshots sent to the model, "png", "jpeg" or "webp". Defaults to "jpeg".
+        screenshot_quality (int, optional): The quality of the JPEG and WebP screenshots. Defaults to 80.
+        screenshot_clip (FloatRect, optional): The area of the page to capture. Defaults to None, the viewport.
+        screenshot_dedup_distance (int, optional): The number of bits of the perceptual hash that may differ between the screenshot of a step and the one of the previous step for the page to be considered unchanged, in which case the step is prompted without a screenshot. A negative value sends every screenshot. Defaults to 4.
+        history_token_budget (int, optional): The number of tokens of chat history above which the older steps are compacted into a log of the actions taken. Defaults to 6000.
+        history_keep_last (int, optional): The number of most recent messages of the chat history always sent verbatim. Defaults to 4.
         playwright (Playwright, optional): The playwright instance. Defaults to None.
         context (BrowserContext, optional): The browser context. Defaults to None.
 
@@ -243,7 +259,7 @@ class MultimodalWebSurfer(BaseChatAgent, Component[MultimodalWebSurferConfig]):
     component_config_schema = MultimodalWebSurferConfig
     component_provider_override = "autogen_ext.agents.web_surfer.MultimodalWebSurfer"
     # termination_condition = FunctionCallTermination(function_name="complete") | FunctionCallTermination(function_name="error")
-    termination_condition = ExternalTermination()
+    termination_condition: ExternalTermination
 
     DEFAULT_DESCRIPTION = """
     A helpful assistant with access to a web browser.
@@ -280,8 +296,15 @@ class MultimodalWebSurfer(BaseChatAgent, Component[MultimodalWebSurferConfig]):
         browser_data_dir: str | None = None,
         to_resize_viewport: bool = True,
         connect_over_cdp: str = "",
+        screenshot_format: ScreenshotFormat = "jpeg",
+        screenshot_quality: int = 80,
+        screenshot_clip: FloatRect | None = None,
+        screenshot_dedup_distance: int = 4,
+        history_token_budget: int = 6000,
+        history_keep_last: int = 4,
         playwright: Playwright | None = None,
         context: BrowserContext | None = None,
+        context_pool: BrowserContextPool | None = None,
     ):
         """
         Initialize the MultimodalWebSurfer.
@@ -306,15 +329,34 @@ class MultimodalWebSurfer(BaseChatAgent, Component[MultimodalWebSurferConfig]):
         self.to_resize_viewport = to_resize_viewport
         self.connect_over_cdp = connect_over_cdp
         self.animate_actions = animate_actions
+        if screenshot_format not in SCREENSHOT_EXTENSIONS:
+            raise ValueError(f"Unknown screenshot format '{screenshot_format}'. Please choose from: {', '.join(SCREENSHOT_EXTENSIONS)}")
+        self.screenshot_format: ScreenshotFormat = screenshot_format
+        self.screenshot_quality = screenshot_quality
+        self.screenshot_clip = screenshot_clip
+        self.screenshot_dedup_distance = screenshot_dedup_distance
+        self.history_token_budget = history_token_budget
+        self.history_keep_last = max(history_keep_last, 1)
 
         # Call init to set these in case not set
         self._playwright: Playwright | None = playwright
         self._context: BrowserContext | None = context
+        # With a pool, the context is acquired on the first reply and given back to the pool on reset
+        self._context_pool = context_pool
+        self._pooled_context = False
         self._page: Page | None = None
         self._last_download: Download | None = None
         self._prior_metadata_hash: str | None = None
+        # The URL, visible text digest and perceptual hash of the screenshot of the last step
+        self._prior_screenshot: tuple[str, str, int] | None = None
+        # The URL and the observation the model chose the last action from, the observation after the action is
+        # described as a diff from it when the action did not navigate away
+        self._prior_observation: tuple[str, PageObservation] | None = None
         self.logger = logging.getLogger(EVENT_LOGGER_NAME + f".{self.name}.MultimodalWebSurfer")
         self._chat_history: List[LLMMessage] = []
+        # The older messages of the chat history once it outgrew the token budget, compacted into a log of the steps
+        self._compacted_history: CompactedHistory | None = None
+        self._history_metrics: Dict[str, int] = {"compactions": 0, "compacted_messages": 0}
 
         # Define the download handler
         def _download_handler(download: Download) -> None:
@@ -348,6 +390,16 @@ class MultimodalWebSurfer(BaseChatAgent, Component[MultimodalWebSurferConfig]):
             TOOL_ERROR,
         ]
         self.did_lazy_init = False  # flag to check if we have initialized the browser
+        # Per agent, the surfers of a pool run concurrently and must not stop each other
+        self.termination_condition = ExternalTermination()
+        # Per action: how many times it ran and how long the page took to settle after it
+        self._action_metrics: Dict[str, Dict[str, float]] = {}
+        # The screenshots sent to the model: their size and the time spent capturing and encoding them
+        self._screenshot_metrics: Dict[str, float] = {"count": 0, "bytes": 0, "capture_ms": 0.0, "encode_ms": 0.0, "suppressed": 0}
+        # The screenshots replaced by a text observation since the last reset, that is during the current task
+        self._task_images_suppressed = 0
+        # The observations after an action described in full or as a diff, and the characters the diffs saved
+        self._observation_metrics: Dict[str, int] = {"full": 0, "diff": 0, "chars_saved": 0}
 
     async def _lazy_init(
         self,
@@ -372,11 +424,15 @@ class MultimodalWebSurfer(BaseChatAgent, Component[MultimodalWebSurferConfig]):
         self._last_download = None
         self._prior_metadata_hash = None
 
+        if self._context is None and self._context_pool is not None:
+            self._context = await self._context_pool.acquire()
+            self._pooled_context = True
+
         # Create the playwright self
         launch_args: Dict[str, Any] = {"headless": self.headless}
         if self.browser_channel is not None:
             launch_args["channel"] = self.browser_channel
-        if self._playwright is None:
+        if self._playwright is None and self._context is None:
             self._playwright = await async_playwright().start()
 
         # Create the context -- are we launching persistent?
@@ -401,7 +457,7 @@ class MultimodalWebSurfer(BaseChatAgent, Component[MultimodalWebSurferConfig]):
         self._page.on("download", self._download_handler)
         if self.to_resize_viewport:
             await self._page.set_viewport_size({"width": self.VIEWPORT_WIDTH, "height": self.VIEWPORT_HEIGHT})
-        await self._page.add_init_script(path=os.path.join(os.path.abspath(os.path.dirname(__file__)), "page_script.js"))
+        await self._page.add_init_script(script=self._playwright_controller.page_script)
         await self._page.goto(self.start_page)
         await self._page.wait_for_load_state()
 
@@ -417,6 +473,8 @@ class MultimodalWebSurfer(BaseChatAgent, Component[MultimodalWebSurferConfig]):
         if self._page is not None:
             await self._page.close()
             self._page = None
+        if self._pooled_context:
+            await self._release_context()
         if self._context is not None:
             await self._context.close()
             self._context = None
@@ -424,6 +482,16 @@ class MultimodalWebSurfer(BaseChatAgent, Component[MultimodalWebSurferConfig]):
             await self._playwright.stop()
             self._playwright = None
 
+    async def _release_context(self) -> None:
+        """Give the pooled context back, the next reply acquires a fresh one."""
+        assert self._context_pool is not None and self._context is not None
+        context = self._context
+        self._page = None
+        self._context = None
+        self._pooled_context = False
+        self.did_lazy_init = False
+        await self._context_pool.release(context)
+
     async def _set_debug_dir(self, debug_dir: str | None) -> None:
         assert self._page is not None
         if self.debug_dir is None:
@@ -445,16 +513,121 @@ class MultimodalWebSurfer(BaseChatAgent, Component[MultimodalWebSurferConfig]):
                 )
             )
 
+    @property
+    def metrics(self) -> Dict[str, Any]:
+        """
+        The count of each action and the seconds spent waiting for the page to settle after it, in total and at most,
+        the number of calls into the page script along with the number of times it had to be installed first, the
+        bytes and milliseconds of the screenshots prepared for the model, and how many steps were prompted without one
+        since the page looked unchanged, in total and during the current task, and how many observations
+        were described as a diff of the previous one along with the characters it saved, and the compactions of the chat
+        history.
+        """
+        return {
+            "history": dict(self._history_metrics),
+            "actions": {name: dict(stats) for name, stats in self._action_metrics.items()},
+            "observations": dict(self._observation_metrics),
+            "screenshots": dict(self._screenshot_metrics),
+            "task_images_suppressed": self._task_images_suppressed,
+            "script_calls": self._playwright_controller.script_calls,
+            "script_injections": self._playwright_controller.script_injections,
+        }
+
+    def _record_action(self, name: str, settle_seconds: float) -> None:
+        stats = self._action_metrics.setdefault(name, {"count": 0, "settle_seconds": 0.0, "settle_max_seconds": 0.0})
+        stats["count"] += 1
+        stats["settle_seconds"] = round(stats["settle_seconds"] + settle_seconds, 3)
+        stats["settle_max_seconds"] = max(stats["settle_max_seconds"], settle_seconds)
+
+    async def _screenshot(self, size: tuple[int, int] | None = None) -> tuple[bytes, EncodedImage]:
+        """
+        Capture the page, decoded once, and the image sent to the model: the captured bytes when they are already in the
+        format of the model and at its size, encoded once otherwise.
+        """
+        assert self._page is not None
+        # Captured lossless when it is encoded again, so the image is compressed once
+        capture_format: ScreenshotFormat = self.screenshot_format if size is None else "png"
+        data, image, capture_ms = await capture_screenshot(self._page, capture_format, self.screenshot_quality, self.screenshot_clip)
+        if size is not None and image.size != size:
+            scaled = image.resize(size)
+            image.close()
+            image = scaled
+
+        start = time.perf_counter()
+        if size is None and self.screenshot_format != "webp":
+            payload = EncodedImage(image, data)
+        else:
+            payload = EncodedImage.encode(image, self.screenshot_format, self.screenshot_quality)
+            image.close()
+        self._record_screenshot(len(payload.data or b""), capture_ms, (time.perf_counter() - start) * 1000)
+        return data, payload
+
+    def _screenshot_unchanged(self, observation: PageObservation, screenshot: Image.Image) -> bool:
+        """Whether the screenshot of a step shows the same page as the one of the previous step, which it replaces."""
+        assert self._page is not None
+        prior = self._prior_screenshot
+        text_digest = hashlib.md5(observation["visible_text"].encode("utf-8")).hexdigest()
+        self._prior_screenshot = (self._page.url, text_digest, dhash(screenshot))
+        return (
+            self.screenshot_dedup_distance >= 0
+            and prior is not None
+            and prior[:2] == self._prior_screenshot[:2]
+            and hash_distance(prior[2], self._prior_screenshot[2]) <= self.screenshot_dedup_distance
+        )
+
+    def _record_screenshot(self, size: int, capture_ms: float, encode_ms: float) -> None:
+        stats = self._screenshot_metrics
+        stats["count"] += 1
+        stats["bytes"] += size
+        stats["capture_ms"] = round(stats["capture_ms"] + capture_ms, 1)
+        stats["encode_ms"] = round(stats["encode_ms"] + encode_ms, 1)
+        self.logger.info(
+            WebSurferEvent(
+                source=self.name,
+                url=self._page.url if self._page is not None else "",
+                message=f"Screenshot: {size} bytes of {self.screenshot_format}, captured in {capture_ms:.0f}ms, encoded in {encode_ms:.0f}ms",
+            )
+        )
+
+    async def _save_screenshot(self, data: bytes, prefix: str = "screenshot", format: str | None = None) -> None:
+        """Write already encoded bytes to the debug directory."""
+        assert self._page is not None
+        current_timestamp = "_" + int(time.time()).__str__()
+        screenshot_name = prefix + current_timestamp + "." + SCREENSHOT_EXTENSIONS[format or self.screenshot_format]
+        async with aiofiles.open(os.path.join(self.debug_dir, screenshot_name), "wb") as file:  # type: ignore
+            await file.write(data)  # type: ignore
+        self.logger.info(
+            WebSurferEvent(
+                source=self.name,
+                url=self._page.url,
+                message="Screenshot: " + screenshot_name,
+            )
+        )
+
     @property
     def produced_message_types(self) -> Sequence[type[ChatMessage]]:
         return (MultiModalMessage,)
 
     async def on_reset(self, cancellation_token: CancellationToken) -> None:
+        if self._task_images_suppressed:
+            self.logger.info(
+                WebSurferEvent(source=self.name, url="", message=f"Suppressed {self._task_images_suppressed} unchanged screenshots during the task.")
+            )
+        self._task_images_suppressed = 0
+        self._prior_screenshot = None
+        self._prior_observation = None
+        self._compacted_history = None
         if not self.did_lazy_init:
+            self._chat_history.clear()
             return
         assert self._page is not None
 
         self._chat_history.clear()
+        if self._pooled_context:
+            await self._release_context()
+            self._last_download = None
+            self._prior_metadata_hash = None
+            return
         reset_prior_metadata, reset_last_download = await self._playwright_controller.visit_page(self._page, self.start_page)
         if reset_last_download and self._last_download is not None:
             self._last_download = None
@@ -520,6 +693,34 @@ class MultimodalWebSurfer(BaseChatAgent, Component[MultimodalWebSurferConfig]):
             self._chat_history.append(AssistantMessage(content=content, source=self.name))
             yield Response(chat_message=TextMessage(content=content, source=self.name))
 
+    def _compact_history(self) -> List[LLMMessage]:
+        """
+        The chat history to send, the older steps compacted into a log of the actions once it is over the token budget.
+        The last history_keep_last messages are always sent verbatim. The compacted prefix is only rebuilt when the
+        history outgrows the budget again, in between it is the same on every step and stays cached by the provider.
+        """
+        compacted = self._compacted_history
+        covered = compacted.covered if compacted is not None else 0
+        history = (compacted.prefix if compacted is not None else []) + self._chat_history[covered:]
+
+        end = len(self._chat_history) - self.history_keep_last
+        if end <= covered or self._model_client.count_tokens(remove_images(history)) <= self.history_token_budget:
+            return history
+
+        if compacted is None:
+            compacted = self._compacted_history = CompactedHistory(source=self.name)
+        compacted.extend(self._chat_history, end)
+        self._history_metrics["compactions"] += 1
+        self._history_metrics["compacted_messages"] = compacted.covered
+        self.logger.info(
+            WebSurferEvent(
+                source=self.name,
+                url=self._page.url if self._page is not None else "",
+                message=f"Compacted the first {compacted.covered} messages of the chat history into {len(compacted.steps)} steps.",
+            )
+        )
+        return compacted.prefix + self._chat_history[compacted.covered :]
+
     async def _generate_reply(self, cancellation_token: CancellationToken) -> UserContent:
         """Generates the actual reply. First calls the LLM to figure out which tool to use, then executes the tool."""
 
@@ -530,7 +731,7 @@ class MultimodalWebSurfer(BaseChatAgent, Component[MultimodalWebSurferConfig]):
         assert self._page is not None
 
         # Clone the messages, removing old screenshots
-        history: List[LLMMessage] = remove_images(self._chat_history)
+        history: List[LLMMessage] = remove_images(self._compact_history())
 
         # Split the history, removing the last message
         if len(history):
@@ -548,23 +749,19 @@ class MultimodalWebSurfer(BaseChatAgent, Component[MultimodalWebSurferConfig]):
         ]:
             history = []
 
-        # Ask the page for interactive elements, then prepare the state-of-mark screenshot
-        rects = await self._playwright_controller.get_interactive_rects(self._page)
-        viewport = await self._playwright_controller.get_visual_viewport(self._page)
-        screenshot = await self._page.screenshot()
-        som_screenshot, visible_rects, rects_above, rects_below = add_set_of_mark(screenshot, rects)
-
-        if self.to_save_screenshots:
-            current_timestamp = "_" + int(time.time()).__str__()
-            screenshot_png_name = "screenshot_som" + current_timestamp + ".png"
-            som_screenshot.save(os.path.join(self.debug_dir, screenshot_png_name))  # type: ignore
-            self.logger.info(
-                WebSurferEvent(
-                    source=self.name,
-                    url=self._page.url,
-                    message="Screenshot: " + screenshot_png_name,
-                )
-            )
+        # Read the page in one round trip, then prepare the state-of-mark screenshot
+        observation = await self._playwright_controller.observe_page(self._page)
+        self._prior_observation = (self._page.url, observation)
+        rects = observation["rects"]
+        viewport = observation["viewport"]
+        # Captured lossless, the marked image is compressed once when it is encoded for the model
+        _, screenshot, capture_ms = await capture_screenshot(self._page, "png", self.screenshot_quality, self.screenshot_clip)
+        # A hover, a scroll at the bottom of the page or a click that does nothing leave the page as it was, the step is
+        # then prompted with text only instead of the same screenshot again
+        unchanged = self._model_client.model_info["vision"] and self._screenshot_unchanged(observation, screenshot)
+        # Drawn at the resolution sent to the model, there is nothing to scale afterwards
+        som_screenshot, visible_rects, rects_above, rects_below = add_set_of_mark(screenshot, rects, (self.MLM_WIDTH, self.MLM_HEIGHT))
+        screenshot.close()
         # What tools are available?
         tools = self.default_tools.copy()
 
@@ -577,7 +774,7 @@ class MultimodalWebSurfer(BaseChatAgent, Component[MultimodalWebSurferConfig]):
             tools.append(TOOL_SCROLL_DOWN)
 
         # Focus hint
-        focused = await self._playwright_controller.get_focused_rect_id(self._page)
+        focused = observation["focused"]
         focused_hint = ""
         if focused:
             name = self._target_name(focused, rects)
@@ -610,48 +807,52 @@ class MultimodalWebSurfer(BaseChatAgent, Component[MultimodalWebSurferConfig]):
         else:
             other_targets_str = ""
 
-        state_description = "Your " + await self._get_state_description()
+        state_description = "Your " + await self._get_state_description(observation)
         tool_names = "\n".join([t["name"] for t in tools])
         all_tool_names = "\n".join([t["name"] for t in tools + self.termination_tools])
-        page_title = await self._page.title()
 
         prompt_message = None
-        if self._model_client.model_info["vision"]:
+        if self._model_client.model_info["vision"] and not unchanged:
             text_prompt = WEB_SURFER_TOOL_PROMPT_MM.format(
                 state_description=state_description,
                 visible_targets=visible_targets,
                 other_targets_str=other_targets_str,
                 focused_hint=focused_hint,
                 tool_names=tool_names,
-                title=page_title,
-                url=self._page.url,
             ).strip()
 
-            # Scale the screenshot for the MLM, and close the original
-            scaled_screenshot = som_screenshot.resize((self.MLM_WIDTH, self.MLM_HEIGHT))
+            # Encoded once, the same bytes are saved and sent on every request of the step
+            start = time.perf_counter()
+            som_image = EncodedImage.encode(som_screenshot, self.screenshot_format, self.screenshot_quality)
             som_screenshot.close()
+            self._record_screenshot(len(som_image.data or b""), capture_ms, (time.perf_counter() - start) * 1000)
             if self.to_save_screenshots:
-                scaled_screenshot.save(os.path.join(self.debug_dir, "screenshot_scaled.png"))  # type: ignore
+                await self._save_screenshot(som_image.data or b"", "screenshot_som")
 
             # Create the message
             prompt_message = UserMessage(
-                content=[re.sub(r"(\n\s*){3,}", "\n\n", text_prompt), AGImage.from_pil(scaled_screenshot)],
+                content=[re.sub(r"(\n\s*){3,}", "\n\n", text_prompt), som_image],
                 source=self.name,
             )
         else:
+            som_screenshot.close()
+            if unchanged:
+                self._screenshot_metrics["suppressed"] += 1
+                self._task_images_suppressed += 1
+                state_description += "\nThe page looks the same as on the previous step, so no new screenshot is attached."
             text_prompt = WEB_SURFER_TOOL_PROMPT_TEXT.format(
                 state_description=state_description,
                 visible_targets=visible_targets,
                 other_targets_str=other_targets_str,
                 focused_hint=focused_hint,
                 tool_names=tool_names,
-                title=page_title,
-                url=self._page.url,
             ).strip()
 
             # Create the message
             prompt_message = UserMessage(content=re.sub(r"(\n\s*){3,}", "\n\n", text_prompt), source=self.name)
 
+        # The instructions and the history first, they only grow from one step to the next, then the current state
+        history = [SystemMessage(content=WEB_SURFER_SYSTEM_MESSAGE), *history]
         history.append(prompt_message)
         history.append(user_request)
 
@@ -856,8 +1057,17 @@ class MultimodalWebSurfer(BaseChatAgent, Component[MultimodalWebSurferConfig]):
         else:
             raise ValueError(f"Unknown tool '{name}'. Please choose from:\n\n{tool_names}")
 
-        await self._page.wait_for_load_state()
-        await self._playwright_controller.sleep(self._page, 3)
+        # Return as soon as the page is stable instead of sleeping a fixed time after every action
+        settle = await self._playwright_controller.wait_for_page_settle(self._page)
+        self._record_action(name, settle["waited"])
+        self.logger.info(
+            WebSurferEvent(
+                source=self.name,
+                url=self._page.url,
+                action=name,
+                message=f"Page settled in {settle['waited']:.2f}s (network idle: {settle['network_idle']}, DOM quiet: {settle['dom_quiet']}, {settle['mutations']} mutations)",
+            )
+        )
 
         # Handle downloads
         if self._last_download is not None and self.downloads_folder is not None:
@@ -868,7 +1078,8 @@ class MultimodalWebSurfer(BaseChatAgent, Component[MultimodalWebSurferConfig]):
             await self._page.wait_for_load_state()
 
         # Handle metadata
-        page_metadata = json.dumps(await self._playwright_controller.get_page_metadata(self._page), indent=4)
+        observation = await self._playwright_controller.observe_page(self._page)
+        page_metadata = json.dumps(observation["metadata"], indent=4)
         metadata_hash = hashlib.md5(page_metadata.encode("utf-8")).hexdigest()
         if metadata_hash != self._prior_metadata_hash:
             page_metadata = "\n\nThe following metadata was extracted from the webpage:\n\n" + page_metadata.strip() + "\n"
@@ -876,36 +1087,33 @@ class MultimodalWebSurfer(BaseChatAgent, Component[MultimodalWebSurferConfig]):
             page_metadata = ""
         self._prior_metadata_hash = metadata_hash
 
-        new_screenshot = await self._page.screenshot()
+        new_screenshot, new_image = await self._screenshot()
         if self.to_save_screenshots:
-            current_timestamp = "_" + int(time.time()).__str__()
-            screenshot_png_name = "screenshot" + current_timestamp + ".png"
+            await self._save_screenshot(new_screenshot, format="jpeg" if self.screenshot_format == "jpeg" else "png")
 
-            async with aiofiles.open(os.path.join(self.debug_dir, screenshot_png_name), "wb") as file:  # type: ignore
-                await file.write(new_screenshot)  # type: ignore
-            self.logger.info(
-                WebSurferEvent(
-                    source=self.name,
-                    url=self._page.url,
-                    message="Screenshot: " + screenshot_png_name,
-                )
-            )
+        # Return the observation, as the changes since the one the action was chosen from unless the page navigated
+        prior_observation = None
+        if self._prior_observation is not None and self._prior_observation[0] == self._page.url:
+            prior_observation = self._prior_observation[1]
+        else:
+            self._observation_metrics["full"] += 1
+        state_description = "The " + await self._get_state_description(observation, prior_observation)
 
-        # Return the complete observation
-        state_description = "The " + await self._get_state_description()
         message_content = f"{action_description}\n\n" + state_description + page_metadata + "\nHere is a screenshot of the page."
 
         return [
             re.sub(r"(\n\s*){3,}", "\n\n", message_content),  # Removing blank lines
-            AGImage.from_pil(PIL.Image.open(io.BytesIO(new_screenshot))),
+            new_image,
         ]
 
-    async def _get_state_description(self) -> str:
+    async def _get_state_description(self, observation: PageObservation | None = None, prior: PageObservation | None = None) -> str:
         assert self._playwright_controller is not None
         assert self._page is not None
+        if observation is None:
+            observation = await self._playwright_controller.observe_page(self._page)
 
         # Describe the viewport of the new page in words
-        viewport = await self._playwright_controller.get_visual_viewport(self._page)
+        viewport = observation["viewport"]
         percent_visible = int(viewport["height"] * 100 / viewport["scrollHeight"])
         percent_scrolled = int(viewport["pageTop"] * 100 / viewport["scrollHeight"])
         if percent_scrolled < 1:  # Allow some rounding error
@@ -915,13 +1123,45 @@ class MultimodalWebSurfer(BaseChatAgent, Component[MultimodalWebSurferConfig]):
         else:
             position_text = str(percent_scrolled) + "% down from the top of the page"
 
-        visible_text = await self._playwright_controller.get_visible_text(self._page)
+        visible_text = observation["visible_text"]
 
         # Return the complete observation
-        page_title = await self._page.title()
+        page_title = observation["title"]
         message_content = f"web browser is open to the page [{page_title}]({self._page.url}).\nThe viewport shows {percent_visible}% of the webpage, and is positioned {position_text}\n"
-        message_content += f"The following text is visible in the viewport:\n\n{visible_text}"
-        return message_content
+        full_text = f"The following text is visible in the viewport:\n\n{visible_text}"
+        if prior is None:
+            return message_content + full_text
+
+        # Or the changes since the prior observation, unless they are about as long as the full text
+        changes = self._describe_changes(observation, prior)
+        if len(changes) > MAX_DIFF_RATIO * len(full_text):
+            self._observation_metrics["full"] += 1
+            return message_content + full_text
+        self._observation_metrics["diff"] += 1
+        self._observation_metrics["chars_saved"] += len(full_text) - len(changes)
+        return message_content + changes
+
+    def _describe_changes(self, observation: PageObservation, prior: PageObservation) -> str:
+        """Describe the text and the interactive targets that appeared in or left the viewport since the prior observation."""
+        added, removed = diff_lines(prior["visible_text"], observation["visible_text"])
+        new_targets, removed_targets = diff_targets(
+            visible_targets(prior["rects"], prior["viewport"]), visible_targets(observation["rects"], observation["viewport"])
+        )
+        if not (added or removed or new_targets or removed_targets):
+            return "The text and the interactive elements visible in the viewport did not change."
+
+        changes = "Compared to the previous observation of this page:\n"
+        if added:
+            changes += "\nThe following text appeared in the viewport:\n\n" + "\n".join(added) + "\n"
+        if removed:
+            changes += "\nThe following text is no longer visible:\n\n" + "\n".join(removed) + "\n"
+        if not (added or removed):
+            changes += "\nThe text visible in the viewport did not change.\n"
+        if new_targets:
+            changes += "\nThe following interactive elements appeared:\n" + "\n".join(self._format_target_list(new_targets, observation["rects"])) + "\n"
+        if removed_targets:
+            changes += "\nThe interactive elements with the following IDs are no longer visible: " + ", ".join(removed_targets) + "\n"
+        return changes
 
     def _target_name(self, target: str, rects: Dict[str, InteractiveRegion]) -> str | None:
         try:
@@ -971,11 +1211,8 @@ class MultimodalWebSurfer(BaseChatAgent, Component[MultimodalWebSurferConfig]):
         except Exception:
             pass
 
-        # Take a screenshot and scale it
-        screenshot = Image.open(io.BytesIO(await self._page.screenshot()))
-        scaled_screenshot = screenshot.resize((self.MLM_WIDTH, self.MLM_HEIGHT))
-        screenshot.close()
-        ag_image = AGImage.from_pil(scaled_screenshot)
+        # Take a screenshot at the size of the model
+        _, ag_image = await self._screenshot((self.MLM_WIDTH, self.MLM_HEIGHT))
 
         # Prepare the system prompt
         messages: List[LLMMessage] = []
@@ -1033,7 +1270,6 @@ class MultimodalWebSurfer(BaseChatAgent, Component[MultimodalWebSurferConfig]):
         # Generate the response
         response = await self._model_client.create(messages, cancellation_token=cancellation_token)
         self.model_usage.append(response.usage)
-        scaled_screenshot.close()
         assert isinstance(response.content, str)
         return response.content
 
@@ -1053,6 +1289,12 @@ class MultimodalWebSurfer(BaseChatAgent, Component[MultimodalWebSurferConfig]):
             browser_data_dir=self.browser_data_dir,
             to_resize_viewport=self.to_resize_viewport,
             connect_over_cdp=self.connect_over_cdp,
+            screenshot_format=self.screenshot_format,
+            screenshot_quality=self.screenshot_quality,
+            screenshot_clip=self.screenshot_clip,
+            screenshot_dedup_distance=self.screenshot_dedup_distance,
+            history_token_budget=self.history_token_budget,
+            history_keep_last=self.history_keep_last,
         )
 
     @classmethod
@@ -1072,4 +1314,10 @@ class MultimodalWebSurfer(BaseChatAgent, Component[MultimodalWebSurferConfig]):
             browser_data_dir=config.browser_data_dir,
             to_resize_viewport=config.to_resize_viewport,
             connect_over_cdp=config.connect_over_cdp,
+            screenshot_format=config.screenshot_format,
+            screenshot_quality=config.screenshot_quality,
+            screenshot_clip=cast(FloatRect, config.screenshot_clip),
+            screenshot_dedup_distance=config.screenshot_dedup_distance,
+            history_token_budget=config.history_token_budget,
+            history_keep_last=config.history_keep_last,
         )
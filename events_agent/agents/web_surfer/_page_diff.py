@@ -0,0 +1,41 @@
+import difflib
+from typing import Dict, List, Tuple
+
+from ._types import InteractiveRegion, VisualViewport
+
+# A diff longer than this share of the full text is not worth it, e.g. after scrolling, the full text is sent instead
+MAX_DIFF_RATIO = 0.6
+
+
+def visible_targets(rects: Dict[str, InteractiveRegion], viewport: VisualViewport) -> List[str]:
+    """The ids of the targets with a rectangle centered in the viewport, like the ones marked on the screenshot."""
+    targets: List[str] = []
+    for r in rects:
+        for rect in rects[r]["rects"]:
+            if not rect or rect["width"] * rect["height"] == 0:
+                continue
+            x, y = (rect["left"] + rect["right"]) / 2.0, (rect["top"] + rect["bottom"]) / 2.0
+            if 0 <= x < viewport["width"] and 0 <= y < viewport["height"]:
+                targets.append(r)
+                break
+    return targets
+
+
+def diff_targets(before: List[str], after: List[str]) -> Tuple[List[str], List[str]]:
+    """The targets that appeared and the ones that disappeared, the page script keeps the ids of elements stable."""
+    before_set, after_set = set(before), set(after)
+    return [r for r in after if r not in before_set], [r for r in before if r not in after_set]
+
+
+def diff_lines(before: str, after: str) -> Tuple[List[str], List[str]]:
+    """The lines of text added and removed between two observations, blank lines aside."""
+    before_lines = [line.strip() for line in before.splitlines() if line.strip()]
+    after_lines = [line.strip() for line in after.splitlines() if line.strip()]
+    added: List[str] = []
+    removed: List[str] = []
+    for tag, i1, i2, j1, j2 in difflib.SequenceMatcher(None, before_lines, after_lines, autojunk=False).get_opcodes():
+        if tag in ("replace", "delete"):
+            removed.extend(before_lines[i1:i2])
+        if tag in ("replace", "insert"):
+            added.extend(after_lines[j1:j2])
+    return added, removed
@@ -0,0 +1,79 @@
+import base64
+import io
+import time
+from typing import Any, Dict, Literal, Optional, Tuple
+
+from autogen_core import Image as AGImage
+from PIL import Image
+from playwright.async_api import FloatRect, Page
+
+ScreenshotFormat = Literal["png", "jpeg", "webp"]
+
+# The file extension of each format, for the screenshots saved to the debug directory
+SCREENSHOT_EXTENSIONS: Dict[str, str] = {"png": "png", "jpeg": "jpg", "webp": "webp"}
+# The side of the grid of the perceptual hash, which has HASH_SIZE * HASH_SIZE bits
+HASH_SIZE = 16
+
+
+class EncodedImage(AGImage):
+    """
+    An image along with its encoded bytes. The model clients call to_base64 on every request, the base image encodes
+    to PNG each time while this one encodes its bytes once.
+    """
+
+    def __init__(self, image: Image.Image, data: Optional[bytes] = None) -> None:
+        super().__init__(image)
+        self.data = data
+        self._base64: Optional[str] = None
+
+    @classmethod
+    def encode(cls, image: Image.Image, format: ScreenshotFormat, quality: int) -> "EncodedImage":
+        image = image.convert("RGB")
+        buffer = io.BytesIO()
+        image.save(buffer, format=format.upper(), quality=quality)
+        return cls(image, buffer.getvalue())
+
+    def to_base64(self) -> str:
+        if self.data is None:
+            return super().to_base64()
+        if self._base64 is None:
+            self._base64 = base64.b64encode(self.data).decode("utf-8")
+        return self._base64
+
+
+async def capture_screenshot(page: Page, format: ScreenshotFormat, quality: int, clip: Optional[FloatRect] = None) -> Tuple[bytes, Image.Image, float]:
+    """
+    Take a screenshot and decode it once. Only a JPEG capture is lossy, so pass "png" for an image that is drawn on or
+    resized before it is encoded. Playwright captures PNG or JPEG only, WebP screenshots are captured as PNG and
+    encoded to WebP afterwards, once. Returns the captured bytes, the decoded image and the milliseconds it took.
+    """
+    start = time.perf_counter()
+    options: Dict[str, Any] = {"type": "png"}
+    if format == "jpeg":
+        options = {"type": "jpeg", "quality": quality}
+    if clip is not None:
+        options["clip"] = clip
+    data = await page.screenshot(**options)
+    image = Image.open(io.BytesIO(data))
+    image.load()
+    return data, image, (time.perf_counter() - start) * 1000
+
+
+def dhash(image: Image.Image, hash_size: int = HASH_SIZE) -> int:
+    """
+    The difference hash of an image: one bit per cell of a hash_size grid of the grayscale image, set when the cell
+    is brighter than its right neighbour. Compression noise and antialiasing leave it unchanged, unlike a digest.
+    """
+    small = image.convert("L").resize((hash_size + 1, hash_size), Image.Resampling.BOX)
+    pixels = small.tobytes()
+    bits = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            bits = (bits << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return bits
+
+
+def hash_distance(left: int, right: int) -> int:
+    """The number of bits that differ between two hashes."""
+    return (left ^ right).bit_count()
@@ -1,42 +1,54 @@
 import io
 import random
-from typing import BinaryIO, Dict, List, Tuple, cast
+from functools import lru_cache
+from typing import BinaryIO, Dict, List, Optional, Tuple, cast
 
 from PIL import Image, ImageDraw, ImageFont
 
 from ._types import DOMRectangle, InteractiveRegion
 
 TOP_NO_LABEL_ZONE = 20  # Don't print any labels close the top of the page
+FONT_SIZE = 14
+LABEL_PADDING = 3
+OUTLINE_WIDTH = 2
+FILL_ALPHA = 48
 
 
 def add_set_of_mark(
-    screenshot: bytes | Image.Image | io.BufferedIOBase, ROIs: Dict[str, InteractiveRegion]
+    screenshot: bytes | Image.Image | io.BufferedIOBase, ROIs: Dict[str, InteractiveRegion], size: Optional[Tuple[int, int]] = None
 ) -> Tuple[Image.Image, List[str], List[str], List[str]]:
+    """
+    Draw the interactive regions and their labels over a grayscale copy of the screenshot.
+
+    When a size is given, the marks are drawn directly at that resolution instead of drawing them at the resolution of
+    the screenshot and scaling the result down.
+    """
     if isinstance(screenshot, Image.Image):
-        return _add_set_of_mark(screenshot, ROIs)
+        return _add_set_of_mark(screenshot, ROIs, size)
 
     if isinstance(screenshot, bytes):
         screenshot = io.BytesIO(screenshot)
 
     # TODO: Not sure why this cast was needed, but by this point screenshot is a binary file-like object
     image = Image.open(cast(BinaryIO, screenshot))
-    comp, visible_rects, rects_above, rects_below = _add_set_of_mark(image, ROIs)
+    comp, visible_rects, rects_above, rects_below = _add_set_of_mark(image, ROIs, size)
     image.close()
     return comp, visible_rects, rects_above, rects_below
 
 
 def _add_set_of_mark(
-    screenshot: Image.Image, ROIs: Dict[str, InteractiveRegion]
+    screenshot: Image.Image, ROIs: Dict[str, InteractiveRegion], size: Optional[Tuple[int, int]] = None
 ) -> Tuple[Image.Image, List[str], List[str], List[str]]:
     visible_rects: List[str] = list()
     rects_above: List[str] = list()  # Scroll up to see
     rects_below: List[str] = list()  # Scroll down to see
 
-    fnt = ImageFont.load_default(14)
-    base = screenshot.convert("L").convert("RGBA")
-    overlay = Image.new("RGBA", base.size)
+    # The regions are classified in page coordinates, and drawn in the coordinates of the output
+    width, height = screenshot.size
+    size = size or (width, height)
+    scale_x, scale_y = size[0] / width, size[1] / height
 
-    draw = ImageDraw.Draw(overlay)
+    marks: List[Tuple[int, Tuple[int, int, int, int]]] = []
     for r in ROIs:
         for rect in ROIs[r]["rects"]:
             # Empty rectangles
@@ -47,47 +59,83 @@ def _add_set_of_mark(
 
             mid = ((rect["right"] + rect["left"]) / 2.0, (rect["top"] + rect["bottom"]) / 2.0)
 
-            if 0 <= mid[0] and mid[0] < base.size[0]:
+            if 0 <= mid[0] and mid[0] < width:
                 if mid[1] < 0:
                     rects_above.append(r)
-                elif mid[1] >= base.size[1]:
+                elif mid[1] >= height:
                     rects_below.append(r)
                 else:
                     visible_rects.append(r)
-                    _draw_roi(draw, int(r), fnt, rect)
+                    marks.append((int(r), _scale_rect(rect, scale_x, scale_y)))
 
-    comp = Image.alpha_composite(base, overlay)
-    overlay.close()
+    base = screenshot.convert("L")
+    if base.size != size:
+        base = base.resize(size)
+
+    comp = _draw_boxes(base, marks)
+    for idx, box in marks:
+        _draw_label(comp, idx, box)
+
+    base.close()
     return comp, visible_rects, rects_above, rects_below
 
 
-def _draw_roi(
-    draw: ImageDraw.ImageDraw, idx: int, font: ImageFont.FreeTypeFont | ImageFont.ImageFont, rect: DOMRectangle
-) -> None:
-    color = _color(idx)
-    luminance = color[0] * 0.3 + color[1] * 0.59 + color[2] * 0.11
-    text_color = (0, 0, 0, 255) if luminance > 90 else (255, 255, 255, 255)
+def _scale_rect(rect: DOMRectangle, scale_x: float, scale_y: float) -> Tuple[int, int, int, int]:
+    return (
+        int(round(rect["left"] * scale_x)),
+        int(round(rect["top"] * scale_y)),
+        int(round(rect["right"] * scale_x)),
+        int(round(rect["bottom"] * scale_y)),
+    )
+
 
-    roi = ((rect["left"], rect["top"]), (rect["right"], rect["bottom"]))
+def _draw_boxes(base: Image.Image, marks: List[Tuple[int, Tuple[int, int, int, int]]]) -> Image.Image:
+    # The labels are pasted afterwards, over every box
+    rgba = base.convert("RGBA")
+    overlay = Image.new("RGBA", rgba.size)
+    draw = ImageDraw.Draw(overlay)
+    for idx, box in marks:
+        color = _color(idx)
+        draw.rectangle(box, outline=color, fill=(color[0], color[1], color[2], FILL_ALPHA), width=OUTLINE_WIDTH)
+    comp = Image.alpha_composite(rgba, overlay)
+    rgba.close()
+    overlay.close()
+    return comp
 
-    label_location = (rect["right"], rect["top"])
-    label_anchor = "rb"
 
-    if label_location[1] <= TOP_NO_LABEL_ZONE:
-        label_location = (rect["right"], rect["bottom"])
-        label_anchor = "rt"
+def _draw_label(comp: Image.Image, idx: int, box: Tuple[int, int, int, int]) -> None:
+    label = _label(idx)
+    left, top, right, bottom = box
 
-    draw.rectangle(roi, outline=color, fill=(color[0], color[1], color[2], 48), width=2)
+    # Above the top right corner, or below the bottom right corner close to the top of the page
+    if top <= TOP_NO_LABEL_ZONE:
+        comp.paste(label, (right - label.width + LABEL_PADDING, bottom - LABEL_PADDING))
+    else:
+        comp.paste(label, (right - label.width + LABEL_PADDING, top - label.height + LABEL_PADDING))
 
-    # TODO: Having trouble with these types being partially Unknown.
-    bbox = draw.textbbox(label_location, str(idx), font=font, anchor=label_anchor, align="center")  # type: ignore
-    bbox = (bbox[0] - 3, bbox[1] - 3, bbox[2] + 3, bbox[3] + 3)
-    draw.rectangle(bbox, fill=color)
 
+@lru_cache(maxsize=1)
+def _font() -> ImageFont.FreeTypeFont | ImageFont.ImageFont:
+    return ImageFont.load_default(FONT_SIZE)
+
+
+@lru_cache(maxsize=4096)
+def _label(idx: int) -> Image.Image:
+    """The label of a mark: its number over a padded box in its color, rendered once per number."""
+    color = _color(idx)
+    luminance = color[0] * 0.3 + color[1] * 0.59 + color[2] * 0.11
+    text_color = (0, 0, 0, 255) if luminance > 90 else (255, 255, 255, 255)
+
+    font = _font()
     # TODO: Having trouble with these types being partially Unknown.
-    draw.text(label_location, str(idx), fill=text_color, font=font, anchor=label_anchor, align="center")  # type: ignore
+    bbox = font.getbbox(str(idx))  # type: ignore
+    label = Image.new("RGBA", (int(bbox[2] - bbox[0]) + 2 * LABEL_PADDING, int(bbox[3] - bbox[1]) + 2 * LABEL_PADDING), color)
+    draw = ImageDraw.Draw(label)
+    draw.text((LABEL_PADDING - bbox[0], LABEL_PADDING - bbox[1]), str(idx), fill=text_color, font=font)  # type: ignore
+    return label
 
 
+@lru_cache(maxsize=4096)
 def _color(identifier: int) -> Tuple[int, int, int, int]:
     rnd = random.Random(int(identifier))
     color = [rnd.randint(0, 255), rnd.randint(125, 255), rnd.randint(0, 50)]
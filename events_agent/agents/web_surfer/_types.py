@@ -34,6 +34,14 @@ class VisualViewport(TypedDict):
     scrollHeight: Union[int, float]
 
 
+class PageSettle(TypedDict):
+    waited: float
+    load: bool
+    network_idle: bool
+    dom_quiet: bool
+    mutations: int
+
+
 class InteractiveRegion(TypedDict):
     tag_name: str
     role: str
@@ -76,6 +84,15 @@ def domrectangle_from_dict(rect: Dict[str, Any]) -> DOMRectangle:
     )
 
 
+class PageObservation(TypedDict):
+    rects: Dict[str, InteractiveRegion]
+    viewport: VisualViewport
+    focused: str | None
+    visible_text: str
+    title: str
+    metadata: Dict[str, Any]
+
+
 def interactiveregion_from_dict(region: Dict[str, Any]) -> InteractiveRegion:
     typed_rects: List[DOMRectangle] = []
     for rect in region["rects"]:
@@ -1,6 +1,9 @@
+// The version placeholder is replaced with a hash of this file by PlaywrightController, so a document keeps
+// the installed script unless it is an older one
 var MultimodalWebSurfer =
-  MultimodalWebSurfer ||
-  (function () {
+  MultimodalWebSurfer && MultimodalWebSurfer.version === "__PAGE_SCRIPT_VERSION__"
+    ? MultimodalWebSurfer
+    : (function () {
     let nextLabel = 10
 
     let roleMapping = {
@@ -510,11 +513,56 @@ var MultimodalWebSurfer =
       return textInView
     }
 
+    // Everything the surfer reads from the page before a step, in a single round trip. The rects come first
+    // since they label the elements the focused element id refers to
+    let observePage = function () {
+      return {
+        rects: getInteractiveRects(),
+        viewport: getVisualViewport(),
+        focused: getFocusedElementId(),
+        visibleText: getVisibleText(),
+        title: document.title,
+        metadata: getPageMetadata(),
+      }
+    }
+
+    // Resolves once the DOM has gone quietMs without a mutation, or after timeoutMs at the latest
+    let waitForDomQuiet = function (quietMs, timeoutMs) {
+      return new Promise((resolve) => {
+        let start = performance.now()
+        let mutations = 0
+        let finished = false
+        let quietTimer = null
+        let timeoutTimer = null
+
+        let done = function (quiet) {
+          if (finished) return
+          finished = true
+          observer.disconnect()
+          clearTimeout(quietTimer)
+          clearTimeout(timeoutTimer)
+          resolve({ quiet: quiet, waited: Math.round(performance.now() - start), mutations: mutations })
+        }
+
+        let observer = new MutationObserver(function (records) {
+          mutations += records.length
+          clearTimeout(quietTimer)
+          quietTimer = setTimeout(done, quietMs, true)
+        })
+        observer.observe(document.documentElement || document, { childList: true, subtree: true, attributes: true, characterData: true })
+        quietTimer = setTimeout(done, quietMs, true)
+        timeoutTimer = setTimeout(done, timeoutMs, false)
+      })
+    }
+
     return {
+      version: "__PAGE_SCRIPT_VERSION__",
       getInteractiveRects: getInteractiveRects,
       getVisualViewport: getVisualViewport,
       getFocusedElementId: getFocusedElementId,
       getPageMetadata: getPageMetadata,
       getVisibleText: getVisibleText,
+      observePage: observePage,
+      waitForDomQuiet: waitForDomQuiet,
     }
   })()
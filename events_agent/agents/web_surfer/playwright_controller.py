@@ -1,8 +1,10 @@
 import asyncio
 import base64
+import hashlib
 import io
 import os
 import random
+import time
 from typing import Any, Callable, Dict, Optional, Tuple, Union, cast
 
 # TODO: Fix unfollowed import
@@ -16,12 +18,25 @@ from playwright.async_api import Download, Page
 
 from ._types import (
     InteractiveRegion,
+    PageObservation,
+    PageSettle,
     VisualViewport,
     interactiveregion_from_dict,
     visualviewport_from_dict,
 )
 
 
+# Calls a function of the page script when the installed one has the expected version, returns null otherwise
+_CALL_PAGE_SCRIPT = """
+async ([version, name, args]) => {
+    if (typeof MultimodalWebSurfer === "undefined" || MultimodalWebSurfer.version !== version) {
+        return null
+    }
+    return { value: await MultimodalWebSurfer[name](...args) }
+}
+"""
+
+
 class PlaywrightController:
     """
     A helper class to allow Playwright to interact with web pages to perform actions such as clicking, filling, and scrolling.
@@ -33,6 +48,9 @@ class PlaywrightController:
         viewport_height (int): The height of the viewport.
         _download_handler (Optional[Callable[[Download], None]]): A function to handle downloads.
         to_resize_viewport (bool): Whether to resize the viewport
+        settle_timeout (float): The maximum number of seconds to wait for a page to settle after an action.
+        settle_quiet (float): The number of seconds without DOM mutations after which a page is considered settled.
+        settle_network_timeout (float): The maximum number of seconds to wait for network idle, which pages that poll never reach.
     """
 
     def __init__(
@@ -43,6 +61,9 @@ class PlaywrightController:
         viewport_height: int = 900,
         _download_handler: Optional[Callable[[Download], None]] = None,
         to_resize_viewport: bool = True,
+        settle_timeout: float = 5.0,
+        settle_quiet: float = 0.3,
+        settle_network_timeout: float = 2.0,
     ) -> None:
         """
         Initialize the PlaywrightController.
@@ -59,13 +80,41 @@ class PlaywrightController:
         self.viewport_height = viewport_height
         self._download_handler = _download_handler
         self.to_resize_viewport = to_resize_viewport
+        self.settle_timeout = settle_timeout
+        self.settle_quiet = settle_quiet
+        self.settle_network_timeout = settle_network_timeout
         self._page_script: str = ""
+        self.page_script_version: str = ""
+        # Calls into the page script and how many of them had to (re-)install it first
+        self.script_calls = 0
+        self.script_injections = 0
         self.last_cursor_position: Tuple[float, float] = (0.0, 0.0)
         self._markdown_converter: Optional[Any] | None = None
 
         # Read page_script
         with open(os.path.join(os.path.abspath(os.path.dirname(__file__)), "page_script.js"), "rt") as fh:
             self._page_script = fh.read()
+        self.page_script_version = hashlib.sha1(self._page_script.encode("utf-8")).hexdigest()[:12]
+        self._page_script = self._page_script.replace("__PAGE_SCRIPT_VERSION__", self.page_script_version)
+
+    @property
+    def page_script(self) -> str:
+        """The page script stamped with its version, to install with add_init_script."""
+        return self._page_script
+
+    async def _call(self, page: Page, function: str, *args: Any) -> Any:
+        """
+        Call a function of the page script. The presence and version of the script are checked in the same evaluate,
+        and the script is only parsed again when the document lacks it, e.g. a page opened before the init script.
+        """
+        self.script_calls += 1
+        result = await page.evaluate(_CALL_PAGE_SCRIPT, [self.page_script_version, function, list(args)])
+        if result is None:
+            self.script_injections += 1
+            await page.evaluate(self._page_script)
+            result = await page.evaluate(_CALL_PAGE_SCRIPT, [self.page_script_version, function, list(args)])
+            assert result is not None, "The page script could not be installed"
+        return result["value"]
 
     async def sleep(self, page: Page, duration: Union[int, float]) -> None:
         """
@@ -78,6 +127,76 @@ class PlaywrightController:
         assert page is not None
         await page.wait_for_timeout(duration * 1000)
 
+    async def wait_for_page_settle(self, page: Page, timeout: float | None = None) -> PageSettle:
+        """
+        Wait until the page is stable after an action: loaded, without network activity (for at most
+        settle_network_timeout seconds) and without DOM mutations for settle_quiet seconds, or until the timeout.
+
+        Args:
+            page (Page): The Playwright page object.
+            timeout (float | None): The maximum number of seconds to wait, settle_timeout by default.
+
+        Returns:
+            PageSettle: How long the wait took and which conditions were met.
+        """
+        assert page is not None
+        timeout = self.settle_timeout if timeout is None else timeout
+        started = time.monotonic()
+        settle: PageSettle = {"waited": 0.0, "load": False, "network_idle": False, "dom_quiet": False, "mutations": 0}
+
+        def remaining_ms() -> float:
+            return max((timeout - (time.monotonic() - started)) * 1000, 1)
+
+        try:
+            await page.wait_for_load_state("load", timeout=remaining_ms())
+            settle["load"] = True
+        except (TimeoutError, PlaywrightError):
+            pass
+
+        # Both are awaited together; network idle gets a shorter cap since polling pages never reach it
+        network_idle, dom = await asyncio.gather(
+            page.wait_for_load_state("networkidle", timeout=min(self.settle_network_timeout * 1000, remaining_ms())),
+            self._call(page, "waitForDomQuiet", self.settle_quiet * 1000, remaining_ms()),
+            return_exceptions=True,
+        )
+        settle["network_idle"] = not isinstance(network_idle, BaseException)
+        if isinstance(dom, dict):
+            settle["dom_quiet"] = bool(dom["quiet"])
+            settle["mutations"] = int(dom["mutations"])
+        else:
+            # The document was replaced while waiting, e.g. the action navigated: wait for the new one to load
+            try:
+                await page.wait_for_load_state("load", timeout=remaining_ms())
+            except (TimeoutError, PlaywrightError):
+                pass
+
+        settle["waited"] = round(time.monotonic() - started, 3)
+        return settle
+
+    async def observe_page(self, page: Page) -> PageObservation:
+        """
+        Read the interactive regions, viewport, focused element, visible text, title and metadata of the page in a
+        single evaluate.
+
+        Args:
+            page (Page): The Playwright page object.
+
+        Returns:
+            PageObservation: The state of the page.
+        """
+        assert page is not None
+        result = await self._call(page, "observePage")
+
+        assert isinstance(result, dict)
+        return PageObservation(
+            rects={str(k): interactiveregion_from_dict(v) for k, v in result["rects"].items()},
+            viewport=visualviewport_from_dict(result["viewport"]),
+            focused=None if result["focused"] is None else str(result["focused"]),
+            visible_text=str(result["visibleText"]),
+            title=str(result["title"]),
+            metadata=cast(Dict[str, Any], result["metadata"]),
+        )
+
     async def get_interactive_rects(self, page: Page) -> Dict[str, InteractiveRegion]:
         """
         Retrieve interactive regions from the web page.
@@ -90,11 +209,7 @@ class PlaywrightController:
         """
         assert page is not None
         # Read the regions from the DOM
-        try:
-            await page.evaluate(self._page_script)
-        except Exception:
-            pass
-        result = cast(Dict[str, Dict[str, Any]], await page.evaluate("MultimodalWebSurfer.getInteractiveRects();"))
+        result = cast(Dict[str, Dict[str, Any]], await self._call(page, "getInteractiveRects"))
 
         # Convert the results into appropriate types
         assert isinstance(result, dict)
@@ -116,11 +231,7 @@ class PlaywrightController:
             VisualViewport: The visual viewport of the page.
         """
         assert page is not None
-        try:
-            await page.evaluate(self._page_script)
-        except Exception:
-            pass
-        return visualviewport_from_dict(await page.evaluate("MultimodalWebSurfer.getVisualViewport();"))
+        return visualviewport_from_dict(await self._call(page, "getVisualViewport"))
 
     async def get_focused_rect_id(self, page: Page) -> str | None:
         """
@@ -133,11 +244,7 @@ class PlaywrightController:
             str: The ID of the focused element or None if no control has focus.
         """
         assert page is not None
-        try:
-            await page.evaluate(self._page_script)
-        except Exception:
-            pass
-        result = await page.evaluate("MultimodalWebSurfer.getFocusedElementId();")
+        result = await self._call(page, "getFocusedElementId")
         return None if result is None else str(result)
 
     async def get_page_metadata(self, page: Page) -> Dict[str, Any]:
@@ -151,11 +258,7 @@ class PlaywrightController:
             Dict[str, Any]: A dictionary of page metadata.
         """
         assert page is not None
-        try:
-            await page.evaluate(self._page_script)
-        except Exception:
-            pass
-        result = await page.evaluate("MultimodalWebSurfer.getPageMetadata();")
+        result = await self._call(page, "getPageMetadata")
         assert isinstance(result, dict)
         return cast(Dict[str, Any], result)
 
@@ -171,7 +274,7 @@ class PlaywrightController:
         if self.to_resize_viewport and self.viewport_width and self.viewport_height:
             await page.set_viewport_size({"width": self.viewport_width, "height": self.viewport_height})
         await self.sleep(page, 0.2)
-        await page.add_init_script(path=os.path.join(os.path.abspath(os.path.dirname(__file__)), "page_script.js"))
+        await page.add_init_script(script=self._page_script)
         await page.wait_for_load_state()
 
     async def back(self, page: Page) -> None:
@@ -538,11 +641,7 @@ class PlaywrightController:
             str: The text content of the page.
         """
         assert page is not None
-        try:
-            await page.evaluate(self._page_script)
-        except Exception:
-            pass
-        result = await page.evaluate("MultimodalWebSurfer.getVisibleText();")
+        result = await self._call(page, "getVisibleText")
         assert isinstance(result, str)
         return result
 
@@ -33,10 +33,10 @@ calendar_assistant_assistant_prompt = ChatPromptTemplate.from_messages(
             "Your sole purpose is to identify availability gaps in the user's calendar. "
             "When searching, be persistent. Expand your query bounds if the first search returns no results. "
             "If you need more information or the customer changes their mind, escalate the task back to the main assistant."
-            "Remember that a task isn't completed until after the relevant tool has successfully been used."
-            "\nCurrent time: {time}.",
+            "Remember that a task isn't completed until after the relevant tool has successfully been used.",
         ),
         ("placeholder", "{messages}"),
+        ("system", "Current time: {time}."),
     ]
 ).partial(time=datetime.now)
 
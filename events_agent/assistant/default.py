@@ -1,15 +1,15 @@
-from langchain_anthropic import ChatAnthropic
-from langchain_community.tools.tavily_search import TavilySearchResults
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.runnables import Runnable, RunnableConfig
 from pydantic import BaseModel, Field
 from langchain_core.messages import HumanMessage, SystemMessage
 from events_agent.domain.state import State
+from events_agent.utils.prompt_cache import get_prompt_cache_stats
 
 
 class Assistant:
-    def __init__(self, runnable: Runnable):
+    def __init__(self, runnable: Runnable, name: str = "assistant"):
         self.runnable = runnable
+        self.name = name
 
     def __call__(self, state: State, config: RunnableConfig):
         while True:
@@ -25,6 +25,7 @@ class Assistant:
             #             }
             #         )
             result = self.runnable.invoke(input=state)
+            get_prompt_cache_stats().record_message(self.name, result)
 
             if not result.tool_calls and (not result.content or isinstance(result.content, list) and not result.content[0].get("text")):
                 messages = state["messages"] + [("user", "Respond with a real output.")]
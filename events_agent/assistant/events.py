@@ -5,17 +5,20 @@ from langchain_core.runnables import Runnable, RunnableConfig
 from pydantic import BaseModel, Field
 
 from events_agent.domain.state import State
-from events_agent.tools.events import search_events
+from events_agent.tools.events import search_events, search_more_events
 from events_agent.utils.lang import get_llm
+from events_agent.utils.prompt_cache import get_prompt_cache_stats
 
 
 class EventsAssistant:
-    def __init__(self, runnable: Runnable):
+    def __init__(self, runnable: Runnable, name: str = "events_assistant"):
         self.runnable = runnable
+        self.name = name
 
     def __call__(self, state: State, config: RunnableConfig):
         while True:
             result = self.runnable.invoke(state)
+            get_prompt_cache_stats().record_message(self.name, result)
 
             if not result.tool_calls and (not result.content or isinstance(result.content, list) and not result.content[0].get("text")):
                 messages = state["messages"] + [("user", "Respond with a real output.")]
@@ -91,15 +94,15 @@ events_assistant_prompt = ChatPromptTemplate.from_messages(
             "The user is not aware of the different specialized assistants, so do not mention them; just quietly delegate through function calls. "
             "Provide detailed information to the user, and always double-check the database before concluding that information is unavailable. "
             "When searching, be persistent. Expand your query bounds if the first search returns no results. "
-            "If a search comes up empty, expand your search before giving up."
-            "\nCurrent time: {time}.",
+            "If a search comes up empty, expand your search before giving up.",
         ),
         ("placeholder", "{messages}"),
+        ("system", "Current time: {time}."),
     ]
 ).partial(time=datetime.now)
 
 
-events_assistant_safe_tools = [search_events]
+events_assistant_safe_tools = [search_events, search_more_events]
 # event_booking_sensitive_tools = [sign_up_for_event]
 events_assistant_sensitive_tools = []
 events_assistant_sensitive_tool_names = {t.name for t in events_assistant_sensitive_tools}
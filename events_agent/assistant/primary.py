@@ -4,26 +4,12 @@ import shutil
 import uuid
 from datetime import datetime
 
-import autogen
-import autogen_core
-import playwright
-from autogen_agentchat.agents import AssistantAgent
-from autogen_agentchat.conditions import TextMentionTermination
-from autogen_agentchat.teams import RoundRobinGroupChat
-from autogen_agentchat.ui import Console
-from autogen_ext.models.openai import OpenAIChatCompletionClient
-from langchain_anthropic import ChatAnthropic
-from langchain_community.tools.tavily_search import TavilySearchResults
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.runnables import Runnable, RunnableConfig
 from langchain_core.tools import Tool
-from langchain_google_community import GoogleSearchAPIWrapper, GoogleSearchResults
 from langgraph.graph import MessagesState, StateGraph
-from playwright.async_api import async_playwright
-from playwright.sync_api import sync_playwright
 from pydantic import BaseModel, Field
 
-from events_agent.agents.web_surfer import MultimodalWebSurfer
 from events_agent.assistant.default import CompleteOrEscalate
 from events_agent.assistant.events import ToEventsAssistant
 from events_agent.assistant.web_surfer import ToWebSupervisor
@@ -38,11 +24,10 @@ primary_assistant_prompt = ChatPromptTemplate.from_messages(
             "Your primary role is to search for event information, book events, and provide event recommendations to answer customer queries. "
             "You use a dedicated EventsAssistant to search for events. "
             "You use a dedicated WebSupervisor to register for events. "
-            "\nCurrent user info: {user_info}"
-            "\nCurrent time: {time}."
             "\nLocation: New York, NY.",
         ),
         ("placeholder", "{messages}"),
+        ("system", "Current user info: {user_info}\nCurrent time: {time}."),
     ]
 ).partial(time=datetime.now)
 
@@ -1,54 +1,41 @@
-import asyncio
-import base64
 import os
-import shutil
-import uuid
 from datetime import datetime
 
-import autogen
-import autogen_core
-import playwright
-from autogen_agentchat.agents import AssistantAgent
-from autogen_agentchat.conditions import TextMentionTermination
-from autogen_agentchat.teams import RoundRobinGroupChat
-from autogen_agentchat.ui import Console
-from autogen_ext.models.openai import OpenAIChatCompletionClient
-from langchain_anthropic import ChatAnthropic
-from langchain_community.tools.tavily_search import TavilySearchResults
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.runnables import Runnable, RunnableConfig
 from langchain_core.tools import tool
-from langgraph.graph import MessagesState, StateGraph
-from playwright.async_api import async_playwright
-from playwright.sync_api import sync_playwright
 from pydantic import BaseModel, Field
 
-from events_agent.agents.web_surfer import MultimodalWebSurfer
-from events_agent.assistant.default import CompleteOrEscalate
 from events_agent.domain.state import State
-from events_agent.utils.lang import create_tool_node_with_fallback, get_llm, print_message
-
-config_list = [{"model": os.environ["OPENAI_API_MODEL_NAME"], "api_key": os.environ["OPENAI_API_KEY"]}]
-
-llm_config = {
-    "timeout": 60,
-    "cache_seed": 42,
-    "config_list": config_list,
-    "temperature": 0,
-}
-
-user_proxy = autogen.UserProxyAgent(
-    name="user_proxy",
-    human_input_mode="NEVER",
-    max_consecutive_auto_reply=10,
-    is_termination_msg=lambda x: x.get("content", "").rstrip().endswith("TERMINATE"),
-    code_execution_config={
-        "work_dir": ".web",
-        "use_docker": False,
-    },
-    llm_config=llm_config,
-    system_message="Reply TERMINATE if the task has been solved at full satisfaction. Otherwise, reply CONTINUE, or the reason why the task is not solved yet.",
-)
+from events_agent.utils.lang import get_llm
+
+_web_surfer_agent = None
+
+
+def create_user_proxy():
+    import autogen
+
+    config_list = [{"model": os.environ["OPENAI_API_MODEL_NAME"], "api_key": os.environ["OPENAI_API_KEY"]}]
+
+    llm_config = {
+        "timeout": 60,
+        "cache_seed": 42,
+        "config_list": config_list,
+        "temperature": 0,
+    }
+
+    return autogen.UserProxyAgent(
+        name="user_proxy",
+        human_input_mode="NEVER",
+        max_consecutive_auto_reply=10,
+        is_termination_msg=lambda x: x.get("content", "").rstrip().endswith("TERMINATE"),
+        code_execution_config={
+            "work_dir": ".web",
+            "use_docker": False,
+        },
+        llm_config=llm_config,
+        system_message="Reply TERMINATE if the task has been solved at full satisfaction. Otherwise, reply CONTINUE, or the reason why the task is not solved yet.",
+    )
+
 
 # assistant_agent = autogen.AssistantAgent(
 #     name="assistant_agent",
@@ -56,37 +43,29 @@ user_proxy = autogen.UserProxyAgent(
 # )
 
 
-# async def create_web_surfer():
-#     return MultimodalWebSurfer(
-#         name="web_surfer_agent",
-#         model_client=OpenAIChatCompletionClient(model=os.environ["OPENAI_API_MODEL_NAME"]),
-#         start_page="https://google.com/",
-#         description="I am a web surfer agent. I can help you with web browsing tasks. Always use Google for login, the browser should have a session available with creds.",
-#         debug_dir=".web/debug",
-#         # browser_data_dir=".web/browser_data",
-#         downloads_folder=".web/downloads",
-#         # use_ocr=True,
-#         to_save_screenshots=True,
-#         headless=False,
-#         connect_over_cdp="http://192.168.1.33:9222",
-#         # browser_data_dir="/mnt/c/Users/izlobin/chrome-debug",
-#     )
-
-
-web_surfer_agent = MultimodalWebSurfer(
-    name="web_surfer_agent",
-    model_client=OpenAIChatCompletionClient(model=os.environ["OPENAI_API_MODEL_NAME"]),
-    start_page="https://google.com/",
-    description="I am a web surfer agent. I can help you with web browsing tasks. Always use Google for login, the browser should have a session available with creds.",
-    debug_dir=".web/debug",
-    # browser_data_dir=".web/browser_data",
-    downloads_folder=".web/downloads",
-    # use_ocr=True,
-    to_save_screenshots=True,
-    headless=False,
-    connect_over_cdp="http://192.168.1.33:9222",
-    # browser_data_dir="/mnt/c/Users/izlobin/chrome-debug",
-)
+def get_web_surfer_agent():
+    """Create the web surfer on first use, importing autogen and playwright only when a web action runs."""
+    global _web_surfer_agent
+    if _web_surfer_agent is None:
+        from autogen_ext.models.openai import OpenAIChatCompletionClient
+
+        from events_agent.agents.web_surfer import MultimodalWebSurfer
+
+        _web_surfer_agent = MultimodalWebSurfer(
+            name="web_surfer_agent",
+            model_client=OpenAIChatCompletionClient(model=os.environ["OPENAI_API_MODEL_NAME"]),
+            start_page="https://google.com/",
+            description="I am a web surfer agent. I can help you with web browsing tasks. Always use Google for login, the browser should have a session available with creds.",
+            debug_dir=".web/debug",
+            # browser_data_dir=".web/browser_data",
+            downloads_folder=".web/downloads",
+            # use_ocr=True,
+            to_save_screenshots=True,
+            headless=False,
+            connect_over_cdp="http://192.168.1.33:9222",
+            # browser_data_dir="/mnt/c/Users/izlobin/chrome-debug",
+        )
+    return _web_surfer_agent
 
 
 # async def do_web_action_without_picture(state: MessagesState):
@@ -126,10 +105,12 @@ async def do_web_action(state: State):
     url = tool_call["args"]["url"]
     task = f"Please perform the following task: {request}. The URL to visit is: {url}"
 
-    response = await web_surfer_agent.run(task=task)
+    from autogen_core import Image
+
+    response = await get_web_surfer_agent().run(task=task)
     last_message = response.messages[-1]
     if last_message.type == "MultiModalMessage":
-        if isinstance(last_message.content, list) and isinstance(last_message.content[-1], autogen_core._image.Image):
+        if isinstance(last_message.content, list) and isinstance(last_message.content[-1], Image):
             image = last_message.content[-1]
             tool_content = last_message.content[-2]
             content = [
@@ -257,11 +238,10 @@ web_supervisor_prompt = ChatPromptTemplate.from_messages(
             "Look for confirmation messages to ensure the registration is successful. "
             "Check for buttons like 'register', 'sign up', 'register again' and proceed with the registration process. "
             "If the user is not logged in, interrupt and allow the user to log in. "
-            "Assume the user is looged in, only interrupt if you see on the page that the user is not logged in. "
-            "\n Current time: {time}."
-            "\n User info: {user_info}.",
+            "Assume the user is looged in, only interrupt if you see on the page that the user is not logged in.",
         ),
         ("placeholder", "{messages}"),
+        ("system", "Current time: {time}.\nUser info: {user_info}."),
     ]
 ).partial(time=datetime.now)
 
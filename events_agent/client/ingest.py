@@ -0,0 +1,265 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from opensearchpy import AsyncOpenSearch, OpenSearch
+from opensearchpy.exceptions import ConnectionError, TransportError
+from pydantic import TypeAdapter, ValidationError
+
+from events_agent.client.opensearch import close_async_opensearch_client, get_async_opensearch_client, get_opensearch_client
+from events_agent.domain.scoring import COMPOSITE_SCORE_FIELD, COMPOSITE_SCORE_WEIGHTS
+from events_agent.domain.state import EventDetails
+
+ALL_EVENTS_INDEX = "all-events"
+BULK_CHUNK_SIZE = int(os.getenv("EVENTS_BULK_CHUNK_SIZE", "500"))
+BULK_CONCURRENCY = int(os.getenv("EVENTS_BULK_CONCURRENCY", "4"))
+BULK_MAX_RETRIES = int(os.getenv("EVENTS_BULK_MAX_RETRIES", "5"))
+BULK_BACKOFF = 1.0
+REQUIRED_EVENT_FIELDS = ("url", "dateStart", "title")
+# Item statuses worth retrying: the cluster is overloaded or temporarily failing
+RETRYABLE_STATUSES = {429, 502, 503, 504}
+COMPOSITE_SCORE_PIPELINE = "events-composite-score"
+# Stamped by the pipeline on every write, the incremental sync of the local store uses it as its watermark
+INDEXED_AT_FIELD = "indexedAt"
+
+# Painless port of events_agent.domain.scoring.composite_score
+COMPOSITE_SCORE_SCRIPT = """
+    double compositeScore = 0;
+    for (def entry : params.weights.entrySet()) {
+        def value = ctx[entry.getKey()];
+        if (value instanceof Number) {
+            compositeScore += ((Number) value).doubleValue() * entry.getValue();
+        } else if (value instanceof Boolean) {
+            compositeScore += (value ? 1 : 0) * entry.getValue();
+        }
+    }
+    ctx[params.field] = Math.min(Math.max(compositeScore, 0), 1);
+"""
+
+
+def put_composite_score_pipeline(client: OpenSearch | None = None) -> None:
+    """
+    Create or update the ingest pipeline materializing the composite score and stamping the indexing time, map
+    the fields and make the pipeline the index default so every writer of the index gets them at ingestion time.
+    """
+    client = client or get_opensearch_client()
+    client.ingest.put_pipeline(
+        id=COMPOSITE_SCORE_PIPELINE,
+        body={
+            "description": "Materialize the weighted composite score of the event features",
+            "processors": [
+                {
+                    "script": {
+                        "lang": "painless",
+                        "source": COMPOSITE_SCORE_SCRIPT,
+                        "params": {"weights": COMPOSITE_SCORE_WEIGHTS, "field": COMPOSITE_SCORE_FIELD},
+                    }
+                },
+                {"set": {"field": INDEXED_AT_FIELD, "value": "{{_ingest.timestamp}}"}},
+            ],
+        },
+    )
+    client.indices.put_mapping(
+        index=ALL_EVENTS_INDEX,
+        body={"properties": {COMPOSITE_SCORE_FIELD: {"type": "float"}, INDEXED_AT_FIELD: {"type": "date"}}},
+    )
+    client.indices.put_settings(index=ALL_EVENTS_INDEX, body={"index.default_pipeline": COMPOSITE_SCORE_PIPELINE})
+
+
+def backfill_composite_score(only_missing: bool = True, client: OpenSearch | None = None) -> Dict[str, Any]:
+    """
+    Run the existing documents through the pipeline so the score and the indexing time are present on the whole index.
+    Pass only_missing=False after changing the weights to rescore every document.
+    """
+    client = client or get_opensearch_client()
+    missing = [{"bool": {"must_not": {"exists": {"field": field}}}} for field in (COMPOSITE_SCORE_FIELD, INDEXED_AT_FIELD)]
+    query = {"bool": {"should": missing, "minimum_should_match": 1}} if only_missing else {"match_all": {}}
+    return client.update_by_query(
+        index=ALL_EVENTS_INDEX,
+        pipeline=COMPOSITE_SCORE_PIPELINE,
+        body={"query": query},
+        conflicts="proceed",
+        wait_for_completion=False,
+    )
+
+
+def index_event(data: Dict[str, Any], client: OpenSearch | None = None) -> None:
+    """Index a single event, the default pipeline of the index adds the composite score."""
+    client = client or get_opensearch_client()
+    client.index(index=ALL_EVENTS_INDEX, id=data["url"], body=data)
+
+
+# One adapter per field: scraped events often miss the optional details, which is fine as long as the present ones are well typed
+_event_details_adapters = {name: TypeAdapter(annotation) for name, annotation in EventDetails.__annotations__.items()}
+
+
+def read_events(path: str) -> Iterator[Dict[str, Any]]:
+    """Stream the events of a JSON Lines file holding either one event or one OpenSearch hit per line."""
+    with open(path, "r", encoding="utf-8") as file:
+        for line in file:
+            if line.strip():
+                document = json.loads(line)
+                yield document.get("_source", document)
+
+
+def validate_event(event: Dict[str, Any]) -> Optional[str]:
+    """Check the event against EventDetails. Returns the validation error, or None if the event is valid."""
+    errors = [f"{name}: Field required" for name in REQUIRED_EVENT_FIELDS if event.get(name) is None]
+    for name, adapter in _event_details_adapters.items():
+        if event.get(name) is not None:
+            try:
+                adapter.validate_python(event[name])
+            except ValidationError as e:
+                errors.append(f"{name}: {e.errors()[0]['msg']}")
+    return "; ".join(errors) or None
+
+
+@dataclass
+class BulkIndexStats:
+    indexed: int = 0
+    failed: int = 0
+    invalid: int = 0
+    retries: int = 0
+    seconds: float = 0.0
+    errors: List[str] = field(default_factory=list)
+
+    @property
+    def docs_per_sec(self) -> float:
+        return self.indexed / self.seconds if self.seconds else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"Indexed {self.indexed} events in {self.seconds:.1f}s ({self.docs_per_sec:.0f} docs/sec), "
+            f"{self.failed} failed, {self.invalid} invalid, {self.retries} retries"
+        )
+
+
+async def _bulk_index_chunk(client: AsyncOpenSearch, index: str, chunk: List[Dict[str, Any]], max_retries: int, stats: BulkIndexStats) -> None:
+    pending = chunk
+    for attempt in range(max_retries + 1):
+        body = []
+        for event in pending:
+            body.append({"index": {"_index": index, "_id": event["url"]}})
+            body.append(event)
+
+        try:
+            response = await client.bulk(body=body)
+        except TransportError as e:
+            if not isinstance(e, ConnectionError) and e.status_code not in RETRYABLE_STATUSES:
+                raise
+            retry = pending
+        else:
+            retry = []
+            for event, item in zip(pending, response["items"]):
+                result = item["index"]
+                if result["status"] < 300:
+                    stats.indexed += 1
+                elif result["status"] in RETRYABLE_STATUSES:
+                    retry.append(event)
+                else:
+                    stats.failed += 1
+                    stats.errors.append(f"{event['url']}: {result.get('error')}")
+
+        if not retry:
+            return
+        if attempt < max_retries:
+            stats.retries += 1
+            # Exponential backoff with jitter so concurrent chunks do not retry in lockstep
+            await asyncio.sleep(BULK_BACKOFF * 2**attempt * (0.5 + random.random()))
+            pending = retry
+
+    stats.failed += len(retry)
+    stats.errors.extend(f"{event['url']}: gave up after {max_retries} retries" for event in retry)
+
+
+async def bulk_index_events(
+    events: Iterable[Dict[str, Any]],
+    index: str = ALL_EVENTS_INDEX,
+    chunk_size: int = BULK_CHUNK_SIZE,
+    concurrency: int = BULK_CONCURRENCY,
+    max_retries: int = BULK_MAX_RETRIES,
+    client: AsyncOpenSearch | None = None,
+) -> BulkIndexStats:
+    """
+    Validate and index events with _bulk requests of chunk_size documents, at most concurrency of them in flight.
+
+    Items rejected because the cluster is overloaded are retried with exponential backoff, invalid events are
+    skipped. The default pipeline of the index adds the composite score and the indexing time.
+    """
+    client = client or get_async_opensearch_client()
+    stats = BulkIndexStats()
+    semaphore = asyncio.Semaphore(concurrency)
+    tasks: List[asyncio.Task] = []
+    started = time.perf_counter()
+
+    async def send(chunk: List[Dict[str, Any]]) -> None:
+        try:
+            await _bulk_index_chunk(client, index, chunk, max_retries, stats)
+        finally:
+            semaphore.release()
+
+    chunk: List[Dict[str, Any]] = []
+    for event in events:
+        error = validate_event(event)
+        if error:
+            stats.invalid += 1
+            stats.errors.append(f"{event.get('url')}: {error}")
+            continue
+        chunk.append(event)
+        if len(chunk) >= chunk_size:
+            # Reading waits for a free slot, so a large file is never fully buffered in memory
+            await semaphore.acquire()
+            tasks.append(asyncio.create_task(send(chunk)))
+            chunk = []
+    if chunk:
+        await semaphore.acquire()
+        tasks.append(asyncio.create_task(send(chunk)))
+
+    await asyncio.gather(*tasks)
+    stats.seconds = time.perf_counter() - started
+    return stats
+
+
+async def reindex_events(path: str, disable_refresh: bool = False, **kwargs: Any) -> BulkIndexStats:
+    """Bulk index a JSON Lines file of events, optionally pausing the index refresh during the load."""
+    client = get_async_opensearch_client()
+    if disable_refresh:
+        await client.indices.put_settings(index=ALL_EVENTS_INDEX, body={"index": {"refresh_interval": "-1"}})
+    try:
+        return await bulk_index_events(read_events(path), client=client, **kwargs)
+    finally:
+        if disable_refresh:
+            await client.indices.put_settings(index=ALL_EVENTS_INDEX, body={"index": {"refresh_interval": None}})
+        await close_async_opensearch_client()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Bulk index a JSON Lines file of events into the all-events index")
+    parser.add_argument("path", help="JSON Lines file with one event per line")
+    parser.add_argument("--chunk-size", type=int, default=BULK_CHUNK_SIZE, help="Events per _bulk request")
+    parser.add_argument("--concurrency", type=int, default=BULK_CONCURRENCY, help="_bulk requests in flight")
+    parser.add_argument("--max-retries", type=int, default=BULK_MAX_RETRIES, help="Retries of the items rejected by an overloaded cluster")
+    parser.add_argument("--disable-refresh", action="store_true", help="Pause the index refresh during the load, for full re-indexing")
+    args = parser.parse_args()
+
+    stats = asyncio.run(
+        reindex_events(
+            args.path,
+            disable_refresh=args.disable_refresh,
+            chunk_size=args.chunk_size,
+            concurrency=args.concurrency,
+            max_retries=args.max_retries,
+        )
+    )
+    print(stats)
+    for error in stats.errors[:10]:
+        print(f"  {error}")
+
+
+if __name__ == "__main__":
+    main()
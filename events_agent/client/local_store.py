@@ -0,0 +1,211 @@
+import argparse
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from events_agent.client.ingest import read_events
+from events_agent.client.store import ALL_EVENTS_INDEX, EventStore, SearchPage
+from events_agent.domain.scoring import composite_score
+from events_agent.domain.state import EVENT_DETAILS_FIELDS
+
+BULK_LOAD_BATCH_SIZE = 1000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    url TEXT PRIMARY KEY,
+    date_start REAL NOT NULL,
+    composite_score REAL NOT NULL,
+    doc TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_date_start ON events (date_start);
+CREATE VIRTUAL TABLE IF NOT EXISTS events_fts USING fts5 (title, description, tags, venue, host_group);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+"""
+
+
+def to_epoch(value: Any) -> float:
+    """Convert an ISO 8601 date or date-time (naive values are taken as UTC) or a datetime to epoch seconds."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    moment = value if isinstance(value, datetime) else datetime.fromisoformat(str(value))
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+
+def _match_expression(query: str) -> str:
+    # Quote every keyword so FTS5 operators typed by the model are matched literally; any keyword may match,
+    # like the default operator of an OpenSearch multi_match query
+    return " OR ".join('"' + keyword.replace('"', '""') + '"' for keyword in query.split())
+
+
+def _text(value: Any) -> str:
+    if isinstance(value, list):
+        return " ".join(str(item) for item in value)
+    return "" if value is None else str(value)
+
+
+class SQLiteEventStore(EventStore):
+    """
+    An embedded event store for offline runs and low-latency search, loaded from a snapshot of the all-events index.
+
+    Events are indexed by start date, keywords go through an FTS5 table and the composite score is computed at
+    load time, so results come back in the same order as from OpenSearch: for a plain time window the query score
+    is constant and the ranking is composite score first, URL (the document id) second.
+
+    Args:
+        path (str): The SQLite file of the store, or ":memory:".
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: str = ":memory:") -> None:
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        if path != ":memory:":
+            self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SCHEMA)
+        self._db.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM events").fetchone()[0]
+
+    def search(self, start_time, end_time, page_size, query=None, search_after=None, pit_id=None) -> SearchPage:
+        # A single connection reads consistently between pages, so point-in-time ids are not needed here
+        if query:
+            sql = """
+                SELECT url, doc, score FROM (
+                    SELECT e.url, e.doc, -bm25(events_fts) * (1 + (e.composite_score - 0.5) * 2) AS score
+                    FROM events_fts JOIN events e ON e.rowid = events_fts.rowid
+                    WHERE events_fts MATCH ? AND e.date_start BETWEEN ? AND ?
+                )
+            """
+            args: List[Any] = [_match_expression(query), to_epoch(start_time), to_epoch(end_time)]
+        else:
+            sql = """
+                SELECT url, doc, score FROM (
+                    SELECT url, doc, 1 + (composite_score - 0.5) * 2 AS score
+                    FROM events
+                    WHERE date_start BETWEEN ? AND ?
+                )
+            """
+            args = [to_epoch(start_time), to_epoch(end_time)]
+
+        if search_after:
+            sql += " WHERE score < ? OR (score = ? AND url > ?)"
+            args += [search_after[0], search_after[0], search_after[1]]
+        sql += " ORDER BY score DESC, url ASC LIMIT ?"
+        args.append(page_size)
+
+        with self._lock:
+            rows = self._db.execute(sql, args).fetchall()
+        return SearchPage(
+            events=[json.loads(row["doc"]) for row in rows],
+            search_after=[rows[-1]["score"], rows[-1]["url"]] if len(rows) == page_size else None,
+            pit_id=None,
+        )
+
+    def get(self, urls: List[str]) -> Dict[str, Dict[str, Any]]:
+        if not urls:
+            return {}
+        with self._lock:
+            rows = self._db.execute(f"SELECT url, doc FROM events WHERE url IN ({','.join('?' * len(urls))})", urls).fetchall()
+        return {row["url"]: json.loads(row["doc"]) for row in rows}
+
+    def bulk_load(self, events: Iterable[Dict[str, Any]], batch_size: int = BULK_LOAD_BATCH_SIZE) -> int:
+        """Insert or replace events, e.g. the documents of an all-events snapshot. Returns the number of events loaded."""
+        count = 0
+        batch: List[Dict[str, Any]] = []
+        for event in events:
+            batch.append(event)
+            if len(batch) >= batch_size:
+                count += self._load_batch(batch)
+                batch = []
+        if batch:
+            count += self._load_batch(batch)
+        return count
+
+    def load_snapshot(self, path: str) -> int:
+        """Load a JSON Lines snapshot holding either one event or one OpenSearch hit per line."""
+        return self.bulk_load(read_events(path))
+
+    def delete_before(self, date_start: Any) -> int:
+        """Drop the events starting before the given date. Returns the number of events dropped."""
+        with self._lock:
+            self._db.execute("DELETE FROM events_fts WHERE rowid IN (SELECT rowid FROM events WHERE date_start < ?)", (to_epoch(date_start),))
+            count = self._db.execute("DELETE FROM events WHERE date_start < ?", (to_epoch(date_start),)).rowcount
+            self._db.commit()
+        return count
+
+    def clear(self) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM events")
+            self._db.execute("DELETE FROM events_fts")
+            self._db.commit()
+
+    def get_meta(self, key: str) -> Optional[Any]:
+        """Read a JSON value kept next to the events, e.g. the state of the sync job."""
+        with self._lock:
+            row = self._db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return json.loads(row["value"]) if row else None
+
+    def set_meta(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, json.dumps(value, separators=(",", ":"))))
+            self._db.commit()
+
+    def _load_batch(self, batch: List[Dict[str, Any]]) -> int:
+        with self._lock:
+            for event in batch:
+                doc = {field: event[field] for field in EVENT_DETAILS_FIELDS if field in event}
+                rowid = self._db.execute(
+                    """
+                    INSERT INTO events (url, date_start, composite_score, doc) VALUES (?, ?, ?, ?)
+                    ON CONFLICT (url) DO UPDATE SET date_start = excluded.date_start, composite_score = excluded.composite_score, doc = excluded.doc
+                    RETURNING rowid
+                    """,
+                    (event["url"], to_epoch(event["dateStart"]), composite_score(event), json.dumps(doc, default=str, separators=(",", ":"))),
+                ).fetchone()[0]
+                self._db.execute("DELETE FROM events_fts WHERE rowid = ?", (rowid,))
+                self._db.execute(
+                    "INSERT INTO events_fts (rowid, title, description, tags, venue, host_group) VALUES (?, ?, ?, ?, ?, ?)",
+                    (rowid, *(_text(event.get(field)) for field in ("title", "shortDescription", "tags", "venue", "group"))),
+                )
+            self._db.commit()
+        return len(batch)
+
+
+def scan_opensearch_events(index: str = ALL_EVENTS_INDEX) -> Iterator[Dict[str, Any]]:
+    """Stream every event of the OpenSearch index, to load the local store without an intermediate snapshot file."""
+    from opensearchpy.helpers import scan
+
+    from events_agent.client.opensearch import get_opensearch_client
+
+    for hit in scan(get_opensearch_client(), index=index, query={"query": {"match_all": {}}}, size=BULK_LOAD_BATCH_SIZE):
+        yield hit["_source"]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load events into the local SQLite event store")
+    parser.add_argument("snapshot", nargs="?", help="JSON Lines snapshot of the all-events index; omit to read the index directly")
+    parser.add_argument("--path", default=os.getenv("EVENTS_STORE_PATH", ".cache/events/events.db"), help="SQLite file of the store")
+    parser.add_argument("--replace", action="store_true", help="Drop the events loaded before")
+    args = parser.parse_args()
+
+    store = SQLiteEventStore(args.path)
+    if args.replace:
+        store.clear()
+    count = store.load_snapshot(args.snapshot) if args.snapshot else store.bulk_load(scan_opensearch_events())
+    print(f"Loaded {count} events into {args.path} ({len(store)} in total)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,17 @@
+import asyncio
 import os
 
-import boto3
-from opensearchpy import OpenSearch, RequestsHttpConnection
-from requests_aws4auth import AWS4Auth
+from opensearchpy import AsyncHttpConnection, AsyncOpenSearch, AWSV4SignerAsyncAuth, OpenSearch, RequestsHttpConnection
+
+AWS_REGION = "us-east-1"
+
+# Connection pool tuning for the async client (aiohttp keeps pooled connections alive between requests)
+OPENSEARCH_POOL_MAXSIZE = int(os.getenv("OPENSEARCH_POOL_MAXSIZE", "20"))
+OPENSEARCH_TIMEOUT = int(os.getenv("OPENSEARCH_TIMEOUT", "10"))
 
 _client = None
+_async_client = None
+_async_client_loop = None
 
 
 def get_opensearch_client() -> OpenSearch:
@@ -14,6 +21,10 @@ def get_opensearch_client() -> OpenSearch:
     if _client:
         return _client
 
+    # boto3 is slow to import, it is only needed once the client is created
+    import boto3
+    from requests_aws4auth import AWS4Auth
+
     # Use boto3's default credential chain (mimics TypeScript's defaultProvider)
     session = boto3.Session()
     credentials = session.get_credentials()
@@ -23,7 +34,7 @@ def get_opensearch_client() -> OpenSearch:
     aws_auth = AWS4Auth(
         credentials.access_key,
         credentials.secret_key,
-        "us-east-1",
+        AWS_REGION,
         "es",
         session_token=credentials.token if credentials.token else None,
     )
@@ -40,3 +51,47 @@ def get_opensearch_client() -> OpenSearch:
         raise ConnectionError("Failed to connect to OpenSearch at " + os.getenv("OPENSEARCH_URL"))
 
     return _client
+
+
+def get_async_opensearch_client() -> AsyncOpenSearch:
+    """Get or create an async OpenSearch client bound to the running event loop.
+
+    Requests are signed with the refreshable boto3 credentials, so temporary credentials are renewed
+    transparently. The aiohttp connection pool is sized by OPENSEARCH_POOL_MAXSIZE.
+    """
+    global _async_client, _async_client_loop
+
+    loop = asyncio.get_running_loop()
+    if _async_client and _async_client_loop is loop:
+        return _async_client
+
+    import boto3
+
+    session = boto3.Session()
+    credentials = session.get_credentials()
+    if not credentials:
+        raise ValueError("No AWS credentials found. Ensure AWS CLI is configured or use an IAM role.")
+
+    _async_client = AsyncOpenSearch(
+        hosts=[{"host": os.getenv("OPENSEARCH_URL").replace("https://", ""), "port": 443}],
+        http_auth=AWSV4SignerAsyncAuth(credentials, AWS_REGION, "es"),
+        use_ssl=True,
+        verify_certs=True,
+        connection_class=AsyncHttpConnection,
+        maxsize=OPENSEARCH_POOL_MAXSIZE,
+        timeout=OPENSEARCH_TIMEOUT,
+        http_compress=True,
+    )
+    _async_client_loop = loop
+
+    return _async_client
+
+
+async def close_async_opensearch_client() -> None:
+    """Close the pooled connections of the async client."""
+    global _async_client, _async_client_loop
+
+    if _async_client:
+        await _async_client.close()
+    _async_client = None
+    _async_client_loop = None
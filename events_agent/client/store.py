@@ -0,0 +1,338 @@
+import asyncio
+import logging
+import os
+from abc import ABC, abstractmethod
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple, TypedDict
+
+from opensearchpy.exceptions import NotFoundError
+
+from events_agent.client.opensearch import get_async_opensearch_client, get_opensearch_client
+from events_agent.domain.scoring import COMPOSITE_SCORE_FIELD
+from events_agent.domain.state import EVENT_DETAILS_FIELDS
+from events_agent.utils.cache import get_search_cache, make_cache_key
+
+ALL_EVENTS_INDEX = "all-events"
+# "opensearch" queries the remote index, "sqlite" the local store loaded from an all-events snapshot and "synced"
+# the local store kept up to date by a background sync, falling back to the remote index while it is stale
+EVENTS_STORE = os.getenv("EVENTS_STORE", "opensearch")
+EVENTS_STORE_PATH = os.getenv("EVENTS_STORE_PATH", ".cache/events/events.db")
+# "script" recomputes the composite score per query, "precomputed" reads the composite_score field materialized
+# at ingestion time (see events_agent.client.ingest). Both rank identically, the switch allows A/B comparison.
+SCORING_MODE = os.getenv("EVENTS_SCORING_MODE", "script")
+# Bump whenever the ranking changes so cached search results are not reused across scoring versions
+SCORING_VERSION = f"{SCORING_MODE}-v1"
+# How long OpenSearch keeps the point-in-time snapshot backing a paginated search alive between pages
+PIT_KEEP_ALIVE = "5m"
+# Fields matched by the optional keywords of a search
+TEXT_FIELDS = ["title", "shortDescription", "tags", "venue", "group"]
+
+_store = None
+
+logger = logging.getLogger(__name__)
+
+
+class SearchPage(TypedDict):
+    events: List[Dict[str, Any]]
+    search_after: Optional[List[Any]]
+    pit_id: Optional[str]
+
+
+def _parse_bound(value: date | datetime | str, end: bool) -> Optional[datetime]:
+    """A bound as a datetime, a whole day when only the date is given. None when a string is not an ISO date."""
+    if isinstance(value, str):
+        try:
+            value = date.fromisoformat(value) if len(value) == 10 else datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    if isinstance(value, datetime):
+        return value
+    return datetime.combine(value, time.max if end else time.min)
+
+
+def normalize_time_window(start_time: Optional[date | datetime | str] = None, end_time: Optional[date | datetime | str] = None) -> Tuple[str, str]:
+    """
+    Resolve the bounds to hour-aligned ones, so that windows a few minutes apart share their cache key: the start is
+    rounded down to the hour and the end up to the end of its hour, a date covering the whole day. Open bounds start
+    now and end with the 14th day.
+    """
+    now = datetime.now(timezone.utc)
+    start = _parse_bound(start_time, end=False) if start_time else now
+    end = _parse_bound(end_time, end=True) if end_time else (now + timedelta(days=14)).replace(hour=23)
+    return (
+        start.replace(minute=0, second=0, microsecond=0).isoformat() if start else start_time,
+        end.replace(minute=59, second=59, microsecond=999000).isoformat() if end else end_time,
+    )
+
+
+class EventStore(ABC):
+    """
+    The storage the event tools search in.
+
+    Searches return the best ranked events starting in a time window, one page at a time: a page carries the
+    sort values to pass as search_after to get the next one, or None once the last page was returned.
+    The async variants default to running the sync implementation in a worker thread.
+    """
+
+    name: str
+
+    @abstractmethod
+    def search(
+        self,
+        start_time: str,
+        end_time: str,
+        page_size: int,
+        query: Optional[str] = None,
+        search_after: Optional[List[Any]] = None,
+        pit_id: Optional[str] = None,
+    ) -> SearchPage: ...
+
+    @abstractmethod
+    def get(self, urls: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Return the details of the events found, keyed by URL."""
+
+    async def asearch(
+        self,
+        start_time: str,
+        end_time: str,
+        page_size: int,
+        query: Optional[str] = None,
+        search_after: Optional[List[Any]] = None,
+        pit_id: Optional[str] = None,
+    ) -> SearchPage:
+        return await asyncio.to_thread(self.search, start_time, end_time, page_size, query, search_after, pit_id)
+
+    async def aget(self, urls: List[str]) -> Dict[str, Dict[str, Any]]:
+        return await asyncio.to_thread(self.get, urls)
+
+
+class OpenSearchEventStore(EventStore):
+    """
+    The all-events index of the OpenSearch domain. First pages are served from the search cache when possible, along
+    with the sort values of their last hit. Paging opens a point-in-time snapshot the following pages read from, it is
+    deleted with the last page.
+    """
+
+    name = "opensearch"
+
+    def __init__(self, index: str = ALL_EVENTS_INDEX) -> None:
+        self.index = index
+
+    def search(self, start_time, end_time, page_size, query=None, search_after=None, pit_id=None) -> SearchPage:
+        client = get_opensearch_client()
+        if search_after is None:
+            params, cache_key, page = self._cached_first_page(start_time, end_time, page_size, query)
+            return page or self._cache_first_page(params, cache_key, client.search(**params))
+
+        pit_id = pit_id or client.create_pit(index=self.index, keep_alive=PIT_KEEP_ALIVE)["pit_id"]
+        params = self._search_params(start_time, end_time, page_size, query, search_after, pit_id)
+        try:
+            response = client.search(**params)
+        except NotFoundError:
+            params, pit_id = self._without_pit(params), None
+            response = client.search(**params)
+        page = self._page(params, response, pit_id)
+        if finished_pit_id := self._finish_pit(page):
+            try:
+                client.delete_pit(body={"pit_id": [finished_pit_id]})
+            except NotFoundError:
+                pass
+        return page
+
+    async def asearch(self, start_time, end_time, page_size, query=None, search_after=None, pit_id=None) -> SearchPage:
+        client = get_async_opensearch_client()
+        if search_after is None:
+            params, cache_key, page = self._cached_first_page(start_time, end_time, page_size, query)
+            return page or self._cache_first_page(params, cache_key, await client.search(**params))
+
+        pit_id = pit_id or (await client.create_pit(index=self.index, keep_alive=PIT_KEEP_ALIVE))["pit_id"]
+        params = self._search_params(start_time, end_time, page_size, query, search_after, pit_id)
+        try:
+            response = await client.search(**params)
+        except NotFoundError:
+            params, pit_id = self._without_pit(params), None
+            response = await client.search(**params)
+        page = self._page(params, response, pit_id)
+        if finished_pit_id := self._finish_pit(page):
+            try:
+                await client.delete_pit(body={"pit_id": [finished_pit_id]})
+            except NotFoundError:
+                pass
+        return page
+
+    def _cached_first_page(self, start_time: str, end_time: str, page_size: int, query: Optional[str]) -> Tuple[Dict[str, Any], str, Optional[SearchPage]]:
+        """The parameters and cache key of a first page, and the page itself when it is cached."""
+        params = self._search_params(start_time, end_time, page_size, query)
+        cache_key = make_cache_key("search_events", SCORING_VERSION, params)
+        cached = get_search_cache().get(cache_key)
+        return params, cache_key, self._page(params, cached) if cached is not None else None
+
+    def _cache_first_page(self, params: Dict[str, Any], cache_key: str, response: Dict[str, Any]) -> SearchPage:
+        # The hits keep their sort values, so a cached first page can still be paged through
+        get_search_cache().set(cache_key, {"hits": {"hits": response["hits"]["hits"]}})
+        return self._page(params, response)
+
+    def _without_pit(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """The search of a page on the live index, its snapshot having expired since the previous page."""
+        logger.info(f"Point in time {params['body']['pit']['id']} expired, continuing the search without it")
+        body = {key: value for key, value in params["body"].items() if key != "pit"}
+        return {**params, "index": self.index, "body": body}
+
+    def _finish_pit(self, page: SearchPage) -> Optional[str]:
+        """The snapshot to delete once the last page of a search was read from it."""
+        if page["search_after"] is not None or not page["pit_id"]:
+            return None
+        pit_id, page["pit_id"] = page["pit_id"], None
+        return pit_id
+
+    def get(self, urls: List[str]) -> Dict[str, Dict[str, Any]]:
+        client = get_opensearch_client()
+        # Events are indexed with their URL as the document id, fall back to a single terms query for any other id scheme
+        sources = self._mget_sources(client.mget(**self._mget_params(urls)))
+        missing = [url for url in urls if url not in sources]
+        if missing:
+            response = client.search(**self._terms_params(missing))
+            sources.update({hit["_source"]["url"]: hit["_source"] for hit in response["hits"]["hits"]})
+        return sources
+
+    async def aget(self, urls: List[str]) -> Dict[str, Dict[str, Any]]:
+        client = get_async_opensearch_client()
+        sources = self._mget_sources(await client.mget(**self._mget_params(urls)))
+        missing = [url for url in urls if url not in sources]
+        if missing:
+            response = await client.search(**self._terms_params(missing))
+            sources.update({hit["_source"]["url"]: hit["_source"] for hit in response["hits"]["hits"]})
+        return sources
+
+    def _score_functions(self) -> Dict[str, Any]:
+        if SCORING_MODE == "precomputed":
+            # _score * (1 + (composite_score - 0.5) * 2) == _score * 2 * composite_score; 0.5 is neutral for unscored documents
+            return {
+                "field_value_factor": {"field": COMPOSITE_SCORE_FIELD, "factor": 2, "missing": 0.5},
+                "boost_mode": "multiply",
+            }
+        return {
+            "script_score": {
+                "script": {
+                    "source": """
+                        double compositeScore = 0;
+                        compositeScore += doc['popularity'].value * 0.1;
+                        compositeScore += doc['uniqueness'].value * 0.2;
+                        compositeScore += doc['venue_niceness'].value * 0.15;
+                        compositeScore += doc['free_admision'].value * 0.2;
+                        compositeScore += doc['drinks_provided'].value * 0.1;
+                        compositeScore += doc['food_provided'].value * 0.1;
+                        compositeScore += doc['quietness'].value * 0.05;
+                        compositeScore += doc['proximity'].value * 0.05;
+                        compositeScore += doc['non_commercial'].value * 0.025;
+                        compositeScore += doc['no_additional_expenses'].value * 0.025;
+
+                        // Normalize composite score to be between 0 and 1
+                        compositeScore = Math.min(Math.max(compositeScore, 0), 1);
+
+                        // Adjust the initial score based on the composite score
+                        double adjustmentFactor = 1 + (compositeScore - 0.5) * 2;
+                        return _score * adjustmentFactor;
+                    """
+                }
+            },
+        }
+
+    def _search_params(
+        self,
+        start_time: str,
+        end_time: str,
+        page_size: int,
+        query: Optional[str] = None,
+        search_after: Optional[List[Any]] = None,
+        pit_id: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        must: List[Dict[str, Any]] = [
+            {
+                "range": {
+                    "dateStart": {
+                        "gte": start_time,
+                        "lte": end_time,
+                        "format": "strict_date_optional_time",
+                    }
+                }
+            }
+        ]
+        if query:
+            must.append({"multi_match": {"query": query, "fields": TEXT_FIELDS}})
+
+        params = {
+            "index": self.index,
+            "size": page_size,
+            "body": {
+                "_source": EVENT_DETAILS_FIELDS,
+                "query": {
+                    "function_score": {
+                        "query": {"bool": {"must": must}},
+                        **self._score_functions(),
+                    }
+                },
+                "sort": [{"_score": "desc"}, {"_id": "asc"}],
+            },
+        }
+        if search_after:
+            params["body"]["search_after"] = search_after
+        if pit_id:
+            # A point-in-time search targets the snapshot, not the index
+            del params["index"]
+            params["body"]["pit"] = {"id": pit_id, "keep_alive": PIT_KEEP_ALIVE}
+        return params
+
+    def _page(self, params: Dict[str, Any], response: Dict[str, Any], pit_id: Optional[str] = None) -> SearchPage:
+        hits = response["hits"]["hits"]
+        last_page = len(hits) < params["size"] or "sort" not in hits[-1]
+        return SearchPage(
+            events=[hit["_source"] for hit in hits],
+            search_after=None if last_page else hits[-1]["sort"],
+            pit_id=response.get("pit_id", pit_id),
+        )
+
+    def _mget_params(self, urls: List[str]) -> Dict[str, Any]:
+        return {
+            "index": self.index,
+            "body": {"ids": urls},
+            "_source_includes": EVENT_DETAILS_FIELDS,
+        }
+
+    def _terms_params(self, urls: List[str]) -> Dict[str, Any]:
+        return {
+            "index": self.index,
+            "size": len(urls),
+            "body": {
+                "_source": EVENT_DETAILS_FIELDS,
+                "query": {"terms": {"url": urls}},
+            },
+        }
+
+    def _mget_sources(self, response: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        return {doc["_id"]: doc["_source"] for doc in response["docs"] if doc.get("found")}
+
+
+def get_event_store() -> EventStore:
+    """Get or create the event store selected by EVENTS_STORE."""
+    global _store
+    if _store is None:
+        if EVENTS_STORE == "sqlite":
+            from events_agent.client.local_store import SQLiteEventStore
+
+            _store = SQLiteEventStore(EVENTS_STORE_PATH)
+        elif EVENTS_STORE == "synced":
+            from events_agent.client.sync import create_synced_event_store
+
+            _store = create_synced_event_store(EVENTS_STORE_PATH)
+        elif EVENTS_STORE == "opensearch":
+            _store = OpenSearchEventStore()
+        else:
+            raise ValueError(f"Unknown event store '{EVENTS_STORE}'. Please choose from: opensearch, sqlite, synced")
+    return _store
+
+
+def set_event_store(store: EventStore) -> None:
+    """Replace the event store used by the event tools, e.g. with an in-memory SQLite store in offline runs."""
+    global _store
+    _store = store
@@ -0,0 +1,216 @@
+import argparse
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from opensearchpy import OpenSearch
+
+from events_agent.client.ingest import INDEXED_AT_FIELD
+from events_agent.client.local_store import SQLiteEventStore, to_epoch
+from events_agent.client.opensearch import get_opensearch_client
+from events_agent.client.store import ALL_EVENTS_INDEX, EventStore, OpenSearchEventStore, SearchPage
+
+SYNC_BATCH_SIZE = int(os.getenv("EVENTS_SYNC_BATCH_SIZE", "500"))
+SYNC_INTERVAL = float(os.getenv("EVENTS_SYNC_INTERVAL", "300"))
+# Searches are served locally while the last completed sync is at most this many seconds old
+SYNC_MAX_STALENESS = float(os.getenv("EVENTS_SYNC_MAX_STALENESS", "900"))
+# Events that started before this horizon are neither synced nor kept locally
+SYNC_HORIZON = "now-1d/d"
+SYNC_HORIZON_SECONDS = 24 * 60 * 60
+# Documents become searchable after the index refresh, so each run re-reads this much before the watermark
+SYNC_OVERLAP_MS = 60 * 1000
+SYNC_STATE_KEY = "sync"
+# Marks the pages served by the local store, so the following pages are read from it as well
+LOCAL_PIT_ID = "local"
+
+
+@dataclass
+class SyncStats:
+    synced: int = 0
+    pruned: int = 0
+    cached: int = 0
+
+    def __str__(self) -> str:
+        return f"Synced {self.synced} events ({self.pruned} past events pruned, {self.cached} events cached)"
+
+
+class EventsSync:
+    """
+    Mirror the upcoming events of the all-events index into a local store.
+
+    The first run copies every event starting after the horizon; the next ones only pull the documents indexed
+    since the watermark, the highest indexedAt seen so far. Documents are read in (indexedAt, _id) order with
+    search_after and the sort values of the last applied page are persisted as a resume token, so an interrupted
+    run continues where it stopped. Deleted documents are not propagated, past events are pruned instead.
+
+    Args:
+        store (SQLiteEventStore): The local store the events are applied to, it also keeps the sync state.
+        index (str): The index to mirror.
+        batch_size (int): The number of documents pulled per request.
+        client (OpenSearch | None): The client to read with, the shared one by default.
+    """
+
+    def __init__(self, store: SQLiteEventStore, index: str = ALL_EVENTS_INDEX, batch_size: int = SYNC_BATCH_SIZE, client: Optional[OpenSearch] = None) -> None:
+        self.store = store
+        self.index = index
+        self.batch_size = batch_size
+        self.client = client
+
+    @property
+    def state(self) -> Dict[str, Any]:
+        return self.store.get_meta(SYNC_STATE_KEY) or {}
+
+    @property
+    def last_synced_at(self) -> Optional[float]:
+        return self.state.get("synced_at")
+
+    def is_fresh(self, max_staleness: float = SYNC_MAX_STALENESS) -> bool:
+        synced_at = self.last_synced_at
+        return synced_at is not None and time.time() - synced_at <= max_staleness
+
+    def run_once(self) -> SyncStats:
+        """Pull the documents changed since the watermark. Returns the documents applied and pruned."""
+        client = self.client or get_opensearch_client()
+        state = self.state
+        # The watermark of a run is fixed until it completes so the resume token stays valid for its query
+        watermark = state.get("watermark")
+        next_watermark = state.get("next_watermark", watermark)
+        search_after = state.get("search_after")
+
+        count = 0
+        while True:
+            response = client.search(**self._search_params(watermark, search_after))
+            hits = response["hits"]["hits"]
+            count += self.store.bulk_load(hit["_source"] for hit in hits)
+            if hits:
+                search_after = hits[-1]["sort"]
+                indexed_at = search_after[0]
+                if isinstance(indexed_at, (int, float)) and (next_watermark is None or indexed_at > next_watermark):
+                    next_watermark = indexed_at
+            if len(hits) < self.batch_size:
+                break
+            self.store.set_meta(SYNC_STATE_KEY, {**state, "next_watermark": next_watermark, "search_after": search_after})
+
+        pruned = self.store.delete_before(time.time() - SYNC_HORIZON_SECONDS)
+        self.store.set_meta(SYNC_STATE_KEY, {"watermark": next_watermark, "synced_at": time.time()})
+        return SyncStats(synced=count, pruned=pruned, cached=len(self.store))
+
+    def reset(self) -> None:
+        """Forget the watermark so the next run copies the whole horizon again."""
+        self.store.set_meta(SYNC_STATE_KEY, {})
+
+    def _search_params(self, watermark: Optional[int], search_after: Optional[List[Any]]) -> Dict[str, Any]:
+        must: List[Dict[str, Any]] = [{"range": {"dateStart": {"gte": SYNC_HORIZON, "format": "strict_date_optional_time"}}}]
+        if watermark is not None:
+            must.append({"range": {INDEXED_AT_FIELD: {"gte": watermark - SYNC_OVERLAP_MS, "format": "epoch_millis"}}})
+
+        params = {
+            "index": self.index,
+            "size": self.batch_size,
+            "body": {
+                "query": {"bool": {"must": must}},
+                # Documents indexed before the field was introduced come first and only in the initial copy
+                "sort": [{INDEXED_AT_FIELD: {"order": "asc", "missing": "_first", "unmapped_type": "date"}}, {"_id": "asc"}],
+            },
+        }
+        if search_after:
+            params["body"]["search_after"] = search_after
+        return params
+
+
+class SyncedEventStore(EventStore):
+    """
+    Serve searches from the synced local store while it is fresh enough and fall back to OpenSearch otherwise.
+
+    Args:
+        local (SQLiteEventStore): The store kept up to date by the sync job.
+        remote (EventStore): The store queried when the local data is stale.
+        sync (EventsSync): The sync job of the local store.
+        max_staleness (float): The age in seconds of the last sync up to which the local store is used.
+    """
+
+    name = "synced"
+
+    def __init__(self, local: SQLiteEventStore, remote: EventStore, sync: EventsSync, max_staleness: float = SYNC_MAX_STALENESS) -> None:
+        self.local = local
+        self.remote = remote
+        self.sync = sync
+        self.max_staleness = max_staleness
+
+    def serves_locally(self, start_time: str) -> bool:
+        """Whether the local store is fresh and holds every event of a window starting at start_time."""
+        synced_at = self.sync.last_synced_at
+        return self.sync.is_fresh(self.max_staleness) and to_epoch(start_time) >= synced_at - SYNC_HORIZON_SECONDS
+
+    def search(self, start_time, end_time, page_size, query=None, search_after=None, pit_id=None) -> SearchPage:
+        # Keep reading a paginated search from the store that served its first page, so the sort values match
+        if pit_id == LOCAL_PIT_ID or (search_after is None and self.serves_locally(start_time)):
+            page = self.local.search(start_time, end_time, page_size, query, search_after)
+            return SearchPage(events=page["events"], search_after=page["search_after"], pit_id=LOCAL_PIT_ID)
+        return self.remote.search(start_time, end_time, page_size, query, search_after, pit_id)
+
+    async def asearch(self, start_time, end_time, page_size, query=None, search_after=None, pit_id=None) -> SearchPage:
+        if pit_id == LOCAL_PIT_ID or (search_after is None and self.serves_locally(start_time)):
+            return self.search(start_time, end_time, page_size, query, search_after, pit_id)
+        return await self.remote.asearch(start_time, end_time, page_size, query, search_after, pit_id)
+
+    def get(self, urls: List[str]) -> Dict[str, Dict[str, Any]]:
+        # Only upcoming events are synced, anything else is looked up remotely
+        sources = self.local.get(urls) if self.sync.is_fresh(self.max_staleness) else {}
+        missing = [url for url in urls if url not in sources]
+        if missing:
+            sources.update(self.remote.get(missing))
+        return sources
+
+    async def aget(self, urls: List[str]) -> Dict[str, Dict[str, Any]]:
+        sources = self.local.get(urls) if self.sync.is_fresh(self.max_staleness) else {}
+        missing = [url for url in urls if url not in sources]
+        if missing:
+            sources.update(await self.remote.aget(missing))
+        return sources
+
+
+def start_background_sync(sync: EventsSync, interval: float = SYNC_INTERVAL) -> threading.Event:
+    """Run the sync job every interval seconds in a daemon thread. Set the returned event to stop it."""
+    stopped = threading.Event()
+
+    def loop() -> None:
+        while not stopped.is_set():
+            try:
+                sync.run_once()
+            except Exception as e:
+                print(f"Error syncing events: {str(e)}")
+            stopped.wait(interval)
+
+    threading.Thread(target=loop, name="events-sync", daemon=True).start()
+    return stopped
+
+
+def create_synced_event_store(path: str, interval: float = SYNC_INTERVAL, max_staleness: float = SYNC_MAX_STALENESS) -> SyncedEventStore:
+    """Create the local store at path with its background sync, falling back to OpenSearch until it is fresh."""
+    local = SQLiteEventStore(path)
+    sync = EventsSync(local)
+    start_background_sync(sync, interval)
+    return SyncedEventStore(local, OpenSearchEventStore(), sync, max_staleness)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Sync the upcoming events of the all-events index into the local SQLite event store")
+    parser.add_argument("--path", default=os.getenv("EVENTS_STORE_PATH", ".cache/events/events.db"), help="SQLite file of the store")
+    parser.add_argument("--loop", action="store_true", help="Keep syncing every EVENTS_SYNC_INTERVAL seconds")
+    parser.add_argument("--reset", action="store_true", help="Forget the watermark and copy every upcoming event again")
+    args = parser.parse_args()
+
+    sync = EventsSync(SQLiteEventStore(args.path))
+    if args.reset:
+        sync.reset()
+    print(sync.run_once())
+    while args.loop:
+        time.sleep(SYNC_INTERVAL)
+        print(sync.run_once())
+
+
+if __name__ == "__main__":
+    main()
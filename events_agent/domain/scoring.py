@@ -0,0 +1,32 @@
+from typing import Any, Dict
+
+# Weights of the event features contributing to the composite score (sum to 1)
+COMPOSITE_SCORE_WEIGHTS: Dict[str, float] = {
+    "popularity": 0.1,
+    "uniqueness": 0.2,
+    "venue_niceness": 0.15,
+    "free_admision": 0.2,
+    "drinks_provided": 0.1,
+    "food_provided": 0.1,
+    "quietness": 0.05,
+    "proximity": 0.05,
+    "non_commercial": 0.025,
+    "no_additional_expenses": 0.025,
+}
+
+COMPOSITE_SCORE_FIELD = "composite_score"
+
+
+def composite_score(event: Dict[str, Any]) -> float:
+    """Compute the weighted sum of the event features, clamped to [0, 1]. Missing features count as 0."""
+    score = 0.0
+    for field, weight in COMPOSITE_SCORE_WEIGHTS.items():
+        value = event.get(field)
+        if isinstance(value, (bool, int, float)):
+            score += float(value) * weight
+    return min(max(score, 0.0), 1.0)
+
+
+def score_adjustment(score: float) -> float:
+    """Map a composite score to the multiplier applied to the query score (0.5 is neutral)."""
+    return 1 + (score - 0.5) * 2
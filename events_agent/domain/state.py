@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Annotated, List, Literal, Optional, TypedDict, Union
+from typing import Annotated, Any, List, Literal, Optional, TypedDict, Union
 
 from langgraph.graph.message import AnyMessage, add_messages
 
@@ -32,18 +32,53 @@ class EventDetails(TypedDict):
     spotsLeft: int
 
 
+# The fields of an event returned by the event tools
+EVENT_DETAILS_FIELDS = list(EventDetails.__annotations__)
+
+
 class EventStatus(TypedDict):
     url: str
-    details: EventDetails
+    title: str
+    dateStart: datetime
     found: bool
-    registred: bool
+    registered: bool
     scheduled_to_calendar: bool
 
 
+class RegistrationResult(TypedDict):
+    registered: bool
+    content: str
+
+
+class SearchCursor(TypedDict):
+    start_time: str
+    end_time: str
+    page_size: int
+    query: Optional[str]
+    search_after: List[Any]
+    pit_id: Optional[str]
+
+
+def merge_events(left: Optional[dict], right: Optional[dict]) -> dict:
+    """Merge per-URL deltas into the events, keyed by URL. None clears them."""
+    if right is None:
+        return {}
+    merged = dict(left or {})
+    for url, delta in right.items():
+        merged[url] = {**merged.get(url, {}), **delta}
+    return merged
+
+
 class State(TypedDict):
     messages: Annotated[list[AnyMessage], add_messages]
     user_info: UserInfo
-    events_status: dict[str, EventStatus]
+    # Tools write only the entries they touch, the reducer merges them into the channel
+    events_status: Annotated[dict[str, EventStatus], merge_events]
+    # The full details of the events found, kept out of the prompts and keyed by URL like events_status
+    events_details: Annotated[dict[str, EventDetails], merge_events]
+    search_cursor: Optional[SearchCursor]
+    # The results of the registrations of a batch running in parallel, keyed by URL until they are reported back
+    registrations: Annotated[dict[str, RegistrationResult], merge_events]
 
 
 def update_dialog_stack(left: list[str], right: Optional[str]) -> list[str]:
@@ -0,0 +1,393 @@
+import asyncio
+import hashlib
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    SerializerProtocol,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+from langgraph.checkpoint.memory import MemorySaver
+
+# "sqlite" persists the threads on disk so they survive restarts, "memory" keeps them in process like before
+EVENTS_CHECKPOINTER = os.getenv("EVENTS_CHECKPOINTER", "sqlite")
+EVENTS_CHECKPOINT_PATH = os.getenv("EVENTS_CHECKPOINT_PATH", ".cache/checkpoints/checkpoints.db")
+# Threads left untouched for longer are dropped by gc()
+EVENTS_CHECKPOINT_MAX_AGE = float(os.getenv("EVENTS_CHECKPOINT_MAX_AGE", str(7 * 24 * 60 * 60)))
+# Serialized values above this size are zlib-compressed, screenshots of the web surfer shrink well
+COMPRESS_THRESHOLD = 1024
+COMPRESSED_SUFFIX = "+zlib"
+# Type of the blobs listing the digests of the items of a list channel, the items are stored once per thread
+REFS_TYPE = "refs"
+# Type of the blobs mapping the keys of a dict channel to the digests of their values, stored like list items
+KEYED_REFS_TYPE = "keyed_refs"
+# Threads whose item digests are kept in memory, the least recently used one is dropped past this
+DIGEST_CACHE_THREADS = 64
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL,
+    checkpoint_id TEXT NOT NULL,
+    parent_checkpoint_id TEXT,
+    type TEXT NOT NULL,
+    checkpoint BLOB NOT NULL,
+    metadata_type TEXT NOT NULL,
+    metadata BLOB NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+);
+CREATE INDEX IF NOT EXISTS checkpoints_created_at ON checkpoints (thread_id, created_at);
+CREATE TABLE IF NOT EXISTS blobs (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL,
+    channel TEXT NOT NULL,
+    version TEXT NOT NULL,
+    type TEXT NOT NULL,
+    blob BLOB,
+    PRIMARY KEY (thread_id, checkpoint_ns, channel, version)
+);
+CREATE TABLE IF NOT EXISTS items (
+    thread_id TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    type TEXT NOT NULL,
+    blob BLOB NOT NULL,
+    PRIMARY KEY (thread_id, digest)
+);
+CREATE TABLE IF NOT EXISTS writes (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL,
+    checkpoint_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    channel TEXT NOT NULL,
+    type TEXT NOT NULL,
+    blob BLOB,
+    task_path TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+);
+"""
+
+
+class SqliteCheckpointSaver(BaseCheckpointSaver[str]):
+    """
+    A checkpointer persisting the graph threads to a local SQLite file.
+
+    Like the in-memory saver, channel values are stored per channel version, so a checkpoint only writes the
+    channels updated by its step. List channels such as messages are stored as the digests of their items and
+    each item is written once per thread: a new step adds its new messages, not the whole history again. Dict channels
+    of records keyed by string, such as events_status and events_details, are stored the same way per key, so a step
+    updating one event writes that event only. The digests of the items already stored are kept by message id or
+    key, so a step only serializes its new items.
+    Values above COMPRESS_THRESHOLD bytes are zlib-compressed.
+
+    Args:
+        path (str): The SQLite file, or ":memory:".
+        serde (SerializerProtocol | None): The serializer of the values, the LangGraph default when None.
+    """
+
+    def __init__(self, path: str = EVENTS_CHECKPOINT_PATH, *, serde: Optional[SerializerProtocol] = None) -> None:
+        super().__init__(serde=serde)
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        if path != ":memory:":
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+        self._db.commit()
+        # Per thread, the item and digest of each stored message by id and of each dict channel value by (channel, key),
+        # reused while the channel holds the same object
+        self._digests: OrderedDict[str, Dict[Any, Tuple[Any, str]]] = OrderedDict()
+
+    def _known_digests(self, thread_id: str) -> Dict[Any, Tuple[Any, str]]:
+        known = self._digests.pop(thread_id, None) or {}
+        self._digests[thread_id] = known
+        while len(self._digests) > DIGEST_CACHE_THREADS:
+            self._digests.popitem(last=False)
+        return known
+
+    def _dumps(self, value: Any) -> Tuple[str, bytes]:
+        type_, data = self.serde.dumps_typed(value)
+        if len(data) > COMPRESS_THRESHOLD:
+            return type_ + COMPRESSED_SUFFIX, zlib.compress(data)
+        return type_, data
+
+    def _loads(self, type_: str, data: bytes) -> Any:
+        if type_.endswith(COMPRESSED_SUFFIX):
+            return self.serde.loads_typed((type_[: -len(COMPRESSED_SUFFIX)], zlib.decompress(data)))
+        return self.serde.loads_typed((type_, data))
+
+    def _put_item(self, thread_id: str, known: Dict[Any, Tuple[Any, str]], key: Any, item: Any) -> str:
+        """Store an item once per thread and return its digest, reused while key still maps to the same object."""
+        cached = known.get(key) if key is not None else None
+        if cached is not None and cached[0] is item:
+            return cached[1]
+        type_, data = self._dumps(item)
+        digest = hashlib.sha1(type_.encode("utf-8") + data).hexdigest()
+        self._db.execute("INSERT OR IGNORE INTO items (thread_id, digest, type, blob) VALUES (?, ?, ?, ?)", (thread_id, digest, type_, data))
+        if key is not None:
+            known[key] = (item, digest)
+        return digest
+
+    def _load_items(self, thread_id: str, digests: List[str]) -> Dict[str, Tuple[str, bytes]]:
+        items = {}
+        for start in range(0, len(digests), 500):
+            chunk = digests[start : start + 500]
+            query = f"SELECT digest, type, blob FROM items WHERE thread_id = ? AND digest IN ({','.join('?' * len(chunk))})"
+            items.update({digest: (type_, blob) for digest, type_, blob in self._db.execute(query, (thread_id, *chunk))})
+        return items
+
+    def _put_blob(self, thread_id: str, checkpoint_ns: str, channel: str, version: str, values: Dict[str, Any]) -> None:
+        value = values.get(channel)
+        if channel not in values:
+            row = ("empty", None)
+        elif isinstance(value, list):
+            known = self._known_digests(thread_id)
+            # Messages are keyed by id, a message replaced by id is a new object and is serialized again
+            digests = [self._put_item(thread_id, known, item_id if isinstance(item_id := getattr(item, "id", None), str) else None, item) for item in value]
+            row = (REFS_TYPE, json.dumps(digests).encode("utf-8"))
+        elif _is_keyed(value):
+            known = self._known_digests(thread_id)
+            refs = {key: self._put_item(thread_id, known, (channel, key), item) for key, item in value.items()}
+            row = (KEYED_REFS_TYPE, json.dumps(refs).encode("utf-8"))
+        else:
+            row = self._dumps(value)
+        self._db.execute(
+            "INSERT OR REPLACE INTO blobs (thread_id, checkpoint_ns, channel, version, type, blob) VALUES (?, ?, ?, ?, ?, ?)",
+            (thread_id, checkpoint_ns, channel, str(version), *row),
+        )
+
+    def _load_blobs(self, thread_id: str, checkpoint_ns: str, versions: ChannelVersions) -> Dict[str, Any]:
+        channel_values: Dict[str, Any] = {}
+        for channel, version in versions.items():
+            row = self._db.execute(
+                "SELECT type, blob FROM blobs WHERE thread_id = ? AND checkpoint_ns = ? AND channel = ? AND version = ?",
+                (thread_id, checkpoint_ns, channel, str(version)),
+            ).fetchone()
+            if row is None or row[0] == "empty":
+                continue
+            if row[0] == REFS_TYPE:
+                digests = json.loads(row[1])
+                items = self._load_items(thread_id, digests)
+                channel_values[channel] = [self._loads(*items[digest]) for digest in digests]
+                known = self._known_digests(thread_id)
+                for item, digest in zip(channel_values[channel], digests):
+                    if isinstance(item_id := getattr(item, "id", None), str):
+                        known[item_id] = (item, digest)
+            elif row[0] == KEYED_REFS_TYPE:
+                refs = json.loads(row[1])
+                items = self._load_items(thread_id, list(refs.values()))
+                channel_values[channel] = {key: self._loads(*items[digest]) for key, digest in refs.items()}
+                known = self._known_digests(thread_id)
+                for key, digest in refs.items():
+                    known[(channel, key)] = (channel_values[channel][key], digest)
+            else:
+                channel_values[channel] = self._loads(row[0], row[1])
+        return channel_values
+
+    def _tuple(self, thread_id: str, checkpoint_ns: str, row: Sequence[Any]) -> CheckpointTuple:
+        checkpoint_id, parent_checkpoint_id, type_, checkpoint_blob, metadata_type, metadata_blob = row
+        checkpoint: Checkpoint = self._loads(type_, checkpoint_blob)
+        writes = self._db.execute(
+            "SELECT task_id, channel, type, blob FROM writes WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? ORDER BY rowid",
+            (thread_id, checkpoint_ns, checkpoint_id),
+        ).fetchall()
+        return CheckpointTuple(
+            config={"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint_id}},
+            checkpoint={**checkpoint, "channel_values": self._load_blobs(thread_id, checkpoint_ns, checkpoint["channel_versions"])},
+            metadata=self._loads(metadata_type, metadata_blob),
+            pending_writes=[(task_id, channel, self._loads(type_, blob)) for task_id, channel, type_, blob in writes],
+            parent_config=(
+                {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": parent_checkpoint_id}}
+                if parent_checkpoint_id
+                else None
+            ),
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        columns = "checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata_type, metadata"
+        with self._lock:
+            if checkpoint_id := get_checkpoint_id(config):
+                row = self._db.execute(
+                    f"SELECT {columns} FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                    (thread_id, checkpoint_ns, checkpoint_id),
+                ).fetchone()
+            else:
+                row = self._db.execute(
+                    f"SELECT {columns} FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? ORDER BY checkpoint_id DESC LIMIT 1",
+                    (thread_id, checkpoint_ns),
+                ).fetchone()
+            return self._tuple(thread_id, checkpoint_ns, row) if row else None
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        where, args = [], []
+        if config:
+            where.append("thread_id = ?")
+            args.append(config["configurable"]["thread_id"])
+            if (checkpoint_ns := config["configurable"].get("checkpoint_ns")) is not None:
+                where.append("checkpoint_ns = ?")
+                args.append(checkpoint_ns)
+            if checkpoint_id := get_checkpoint_id(config):
+                where.append("checkpoint_id = ?")
+                args.append(checkpoint_id)
+        if before and (before_checkpoint_id := get_checkpoint_id(before)):
+            where.append("checkpoint_id < ?")
+            args.append(before_checkpoint_id)
+        query = "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata_type, metadata FROM checkpoints"
+        if where:
+            query += " WHERE " + " AND ".join(where)
+        query += " ORDER BY checkpoint_id DESC"
+
+        with self._lock:
+            rows = self._db.execute(query, args).fetchall()
+
+        for thread_id, checkpoint_ns, *row in rows:
+            if limit is not None and limit <= 0:
+                break
+            if filter:
+                metadata = self._loads(row[4], row[5])
+                if not all(metadata.get(key) == value for key, value in filter.items()):
+                    continue
+            if limit is not None:
+                limit -= 1
+            with self._lock:
+                checkpoint_tuple = self._tuple(thread_id, checkpoint_ns, row)
+            yield checkpoint_tuple
+
+    def put(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata, new_versions: ChannelVersions) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+        checkpoint = checkpoint.copy()
+        values: Dict[str, Any] = checkpoint.pop("channel_values")  # type: ignore[misc]
+        with self._lock:
+            # Only the channels updated by this step get a new version to store
+            for channel, version in new_versions.items():
+                self._put_blob(thread_id, checkpoint_ns, channel, version, values)
+            self._db.execute(
+                "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    thread_id,
+                    checkpoint_ns,
+                    checkpoint["id"],
+                    config["configurable"].get("checkpoint_id"),
+                    *self._dumps(checkpoint),
+                    *self._dumps(get_checkpoint_metadata(config, metadata)),
+                    time.time(),
+                ),
+            )
+            self._db.commit()
+        return {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint["id"]}}
+
+    def put_writes(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]], task_id: str, task_path: str = "") -> None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        with self._lock:
+            for idx, (channel, value) in enumerate(writes):
+                idx = WRITES_IDX_MAP.get(channel, idx)
+                # Special channels (errors, interrupts...) have fixed negative indexes and are overwritten, regular writes are kept once
+                statement = "INSERT OR IGNORE" if idx >= 0 else "INSERT OR REPLACE"
+                self._db.execute(
+                    f"{statement} INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (thread_id, checkpoint_ns, checkpoint_id, task_id, idx, channel, *self._dumps(value), task_path),
+                )
+            self._db.commit()
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            self._digests.pop(thread_id, None)
+            for table in ("checkpoints", "blobs", "items", "writes"):
+                self._db.execute(f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
+            self._db.commit()
+
+    def gc(self, max_age: float = EVENTS_CHECKPOINT_MAX_AGE) -> List[str]:
+        """Delete the threads without any checkpoint in the last max_age seconds. Returns the deleted thread ids."""
+        with self._lock:
+            rows = self._db.execute("SELECT thread_id FROM checkpoints GROUP BY thread_id HAVING MAX(created_at) < ?", (time.time() - max_age,)).fetchall()
+        thread_ids = [row[0] for row in rows]
+        for thread_id in thread_ids:
+            self.delete_thread(thread_id)
+        if thread_ids:
+            with self._lock:
+                self._db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return thread_ids
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        for item in await asyncio.to_thread(lambda: list(self.list(config, filter=filter, before=before, limit=limit))):
+            yield item
+
+    async def aput(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata, new_versions: ChannelVersions) -> RunnableConfig:
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]], task_id: str, task_path: str = "") -> None:
+        return await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        return await asyncio.to_thread(self.delete_thread, thread_id)
+
+    def get_next_version(self, current: Optional[str], channel: None) -> str:
+        # Same scheme as the in-memory saver: versions sort as strings and the random part keeps the blobs of forked
+        # histories (e.g. after update_state on an older checkpoint) from overwriting each other
+        current_v = 0 if current is None else current if isinstance(current, int) else int(current.split(".")[0])
+        return f"{current_v + 1:032}.{random.random():016}"
+
+
+_checkpointer = None
+
+
+def _is_keyed(value: Any) -> bool:
+    """Whether a channel value is a dict of records keyed by string, like events_status, stored per key."""
+    return isinstance(value, dict) and all(isinstance(key, str) and isinstance(item, dict) for key, item in value.items())
+
+
+def get_checkpointer() -> BaseCheckpointSaver:
+    """Get or create the checkpointer selected by EVENTS_CHECKPOINTER, shared by every graph of the process."""
+    global _checkpointer
+    if _checkpointer is None:
+        if EVENTS_CHECKPOINTER == "sqlite":
+            _checkpointer = SqliteCheckpointSaver(EVENTS_CHECKPOINT_PATH)
+            deleted = _checkpointer.gc()
+            if deleted:
+                print(f"Deleted {len(deleted)} threads older than {EVENTS_CHECKPOINT_MAX_AGE:.0f}s from {EVENTS_CHECKPOINT_PATH}")
+        elif EVENTS_CHECKPOINTER == "memory":
+            _checkpointer = MemorySaver()
+        else:
+            raise ValueError(f"Unknown checkpointer '{EVENTS_CHECKPOINTER}'. Please choose from: sqlite, memory")
+    return _checkpointer
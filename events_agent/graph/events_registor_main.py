@@ -1,27 +1,37 @@
 import asyncio
+import os
+import sys
+import time
 import uuid
 from datetime import datetime
-from typing import Callable, Literal
 
 from langchain_core.messages import HumanMessage, ToolMessage
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.runnables import RunnableLambda
-from langchain_core.tools import tool
-from langchain_openai import ChatOpenAI
-from langgraph.checkpoint.memory import MemorySaver
-from langgraph.graph import END, START, MessagesState, StateGraph
+from langgraph.graph import END, START, StateGraph
 from langgraph.prebuilt import ToolNode, tools_condition
-from regex import F
+from langgraph.types import Send
 
 from events_agent.assistant.default import Assistant
-from events_agent.assistant.events import CompleteEventsAssistant, EventsAssistant, ToEventsAssistant, events_assistant_runnable
-from events_agent.assistant.primary import primary_assistant_runnable, primary_assistant_tools
 from events_agent.domain.state import State
+from events_agent.graph.checkpoint import get_checkpointer
 from events_agent.tools.calendar import create_calendar_event, get_calendar_events
-from events_agent.tools.events import get_event_details, search_events
+from events_agent.tools.events import get_event_details, get_events_details, search_events, search_more_events
 from events_agent.tools.user_info import fetch_user_info
-from events_agent.tools.web_surfer import ToWebRegisterForEvent, web_register_for_event
-from events_agent.utils.lang import create_tool_node_with_fallback, get_llm, print_message
+from events_agent.tools.web_surfer import (
+    ToWebRegisterForEvent,
+    ToWebRegisterForEvents,
+    web_register_for_event,
+    web_register_join,
+    web_register_tasks,
+    web_register_worker,
+)
+from events_agent.utils.lang import get_llm
+from events_agent.utils.payload import render_events_status
+from events_agent.utils.prompt_cache import get_prompt_cache_stats
+
+# Seconds the graph may take to build; the web surfer, autogen and the Google and AWS clients load on first use
+CREATE_GRAPH_BUDGET = float(os.getenv("EVENTS_CREATE_GRAPH_BUDGET", "1.0"))
 
 
 def handle_tool_error(state) -> dict:
@@ -41,10 +51,17 @@ def handle_tool_error(state) -> dict:
 def user_info_action(state: State):
     return {
         "user_info": fetch_user_info.invoke({}),
-        "events_status": {},
+        # None clears the merged channels, every run starts with no known events
+        "events_status": None,
+        "events_details": None,
     }
 
 
+def render_prompt_state(state: State) -> dict:
+    # The prompt gets a bounded one-line-per-event summary, the event details stay in the state
+    return {**state, "events_status": render_events_status(state.get("events_status", {}))}
+
+
 async def create_graph():
     builder = StateGraph(State)
 
@@ -55,38 +72,51 @@ async def create_graph():
                 "You are an event concierge assisting the user with searching and registering for events. "
                 "\n\nYou are leveraging the following tools:"
                 "\n- Search for events: search_events"
+                "\n- Get the next page of the last search: search_more_events"
                 "\n- Get event details: get_event_details"
+                "\n- Get details of several events in one call: get_events_details"
                 "\n- Register for events: web_register_for_event"
+                "\n- Register for several events in parallel: web_register_for_events"
                 "\n- Check calendar events: get_calendar_events"
                 "\n- Create calendar event: create_calendar_event"
+                "\n\nEvents are identified by short ids (ev_...), every tool accepts an event id in place of its URL."
+                "\nTools return a compact subset of the event fields, ask for more with the fields argument when needed."
                 "\n\nYou follow the following algorithm:"
                 "\n1. Search for events based on the user's request."
-                "\n2. If the user provides a specific event URL, retrieve the event details."
-                "\n3. If the user requests to register for an event, use the web_register_for_event tool."
+                "\n2. If the user provides a specific event URL, retrieve the event details. When checking several events, retrieve them all with one get_events_details call."
+                "\n3. If the user requests to register for an event, use the web_register_for_event tool. To register for several events, call web_register_for_events once with all of them instead."
                 "\n4. If the user requests to create a calendar event, use the create_calendar_event tool after checking the calendar for this event to make sure it is not already there."
                 "\n\nYou need to make sure that the user is registered for the event and the event is added to the calendar by confirming events statuses."
                 "\nIf the status field isn't present then the status is unknown."
                 "\nTo check if the event has already been scheduled to the calendar, you can use the get_calendar_events tool."
                 "\nIf a tool call fails, you need to retry the tool call once."
-                "\n\n Current time: {time}."
-                "\n User info: {user_info}."
-                "\n Events status: {events_status}.",
+                "\nThe current time, the user info and the events status follow the conversation.",
             ),
             ("placeholder", "{messages}"),
+            # Last, so the instructions and the conversation before it stay a cached prefix of the next call
+            (
+                "system",
+                "Current time: {time}."
+                "\nUser info: {user_info}."
+                "\nEvents status (id | start | title | status):\n{events_status}",
+            ),
         ]
     ).partial(time=datetime.now)
-    supervisor_runnable = supervisor_prompt | get_llm().bind_tools(
+    supervisor_runnable = RunnableLambda(render_prompt_state) | supervisor_prompt | get_llm().bind_tools(
         [
             search_events,
+            search_more_events,
             get_event_details,
+            get_events_details,
             # run_web_task,
             ToWebRegisterForEvent,
+            ToWebRegisterForEvents,
             create_calendar_event,
             get_calendar_events,
         ],
         parallel_tool_calls=False,
     )
-    builder.add_node("supervisor", Assistant(supervisor_runnable))
+    builder.add_node("supervisor", Assistant(supervisor_runnable, name="supervisor"))
 
     def route_supervisor(state: State):
         route = tools_condition(state)
@@ -97,10 +127,18 @@ async def create_graph():
         if tool_calls:
             if any(tc["name"] == search_events.name for tc in tool_calls):
                 return "search_events"
+            if any(tc["name"] == search_more_events.name for tc in tool_calls):
+                return "search_more_events"
             if any(tc["name"] == get_event_details.name for tc in tool_calls):
                 return "get_event_details"
+            if any(tc["name"] == get_events_details.name for tc in tool_calls):
+                return "get_events_details"
             if any(tc["name"] == ToWebRegisterForEvent.__name__ for tc in tool_calls):
                 return "web_register_for_event"
+            if any(tc["name"] == ToWebRegisterForEvents.__name__ for tc in tool_calls):
+                # Map step: one worker per event, running in parallel up to the size of the web surfer pool
+                tasks = web_register_tasks(state)
+                return [Send("web_register_worker", task) for task in tasks] if tasks else "web_register_join"
             if any(tc["name"] == create_calendar_event.name for tc in tool_calls):
                 return "create_calendar_event"
             if any(tc["name"] == get_calendar_events.name for tc in tool_calls):
@@ -112,9 +150,13 @@ async def create_graph():
         route_supervisor,
         [
             "search_events",
+            "search_more_events",
             "get_event_details",
+            "get_events_details",
             # "run_web_task",
             "web_register_for_event",
+            "web_register_worker",
+            "web_register_join",
             "create_calendar_event",
             "get_calendar_events",
             END,
@@ -124,15 +166,27 @@ async def create_graph():
     builder.add_node("get_event_details", ToolNode([get_event_details]).with_fallbacks([RunnableLambda(handle_tool_error)], exception_key="error"))
     builder.add_edge("get_event_details", "supervisor")
 
+    builder.add_node("get_events_details", ToolNode([get_events_details]).with_fallbacks([RunnableLambda(handle_tool_error)], exception_key="error"))
+    builder.add_edge("get_events_details", "supervisor")
+
     builder.add_node("search_events", ToolNode([search_events]).with_fallbacks([RunnableLambda(handle_tool_error)], exception_key="error"))
     builder.add_edge("search_events", "supervisor")
 
+    builder.add_node("search_more_events", ToolNode([search_more_events]).with_fallbacks([RunnableLambda(handle_tool_error)], exception_key="error"))
+    builder.add_edge("search_more_events", "supervisor")
+
     # builder.add_node("run_web_task", ToolNode([run_web_task]).with_fallbacks([RunnableLambda(handle_tool_error)], exception_key="error"))
     # builder.add_edge("run_web_task", "supervisor")
 
     builder.add_node("web_register_for_event", web_register_for_event)
     builder.add_edge("web_register_for_event", "supervisor")
 
+    # The join runs once all the workers of the batch are done and answers the tool call with their results
+    builder.add_node("web_register_worker", web_register_worker)
+    builder.add_edge("web_register_worker", "web_register_join")
+    builder.add_node("web_register_join", web_register_join)
+    builder.add_edge("web_register_join", "supervisor")
+
     builder.add_node("create_calendar_event", ToolNode([create_calendar_event]).with_fallbacks([RunnableLambda(handle_tool_error)], exception_key="error"))
     builder.add_edge("create_calendar_event", "supervisor")
 
@@ -144,7 +198,7 @@ async def create_graph():
     builder.add_edge("user_info_action", "supervisor")
     builder.add_edge(START, "user_info_action")
 
-    memory = MemorySaver()
+    memory = get_checkpointer()
     graph = builder.compile(
         checkpointer=memory,
         interrupt_before=[
@@ -156,28 +210,38 @@ async def create_graph():
 
 
 async def main():
-    thread_id = str(uuid.uuid4())
+    # Pass the id of a previous thread to resume it, e.g. a registration interrupted by a crash
+    thread_id = sys.argv[1] if len(sys.argv) > 1 else str(uuid.uuid4())
     config = {"configurable": {"thread_id": thread_id}}
     # log_file_path = f".log/{datetime.now().strftime('%Y%m%d_%H%M')}_{thread_id}.txt"
+    print(f"Thread: {thread_id}")
 
+    started = time.perf_counter()
     graph = await create_graph()
+    elapsed = time.perf_counter() - started
+    print(f"Graph created in {elapsed:.3f}s" + (f", over the {CREATE_GRAPH_BUDGET:.1f}s budget" if elapsed > CREATE_GRAPH_BUDGET else ""))
 
-    result = await graph.ainvoke(
-        # input={"messages": [HumanMessage(content="Find best events for the next week and sign up (register) for all of them through the web browser")]},
-        # input={"messages": [HumanMessage(content="Sign up for this event https://lu.ma/h3qpiaqg")]},  # without dropdown menus
-        # input={"messages": [HumanMessage(content="Sign up for this event https://lu.ma/x58kfr7r")]},  # with dropdown menus
-        # input={"messages": [HumanMessage(content="Sign up for this event and/or confirm participation (url=https://lu.ma/x58kfr7r")]}, # with dropdown menu, works now
-        # input={"messages": [HumanMessage(content="Sign up for this event https://lu.ma/y2viikq6")]},  # waitlist, bloom...
-        # input={"messages": [HumanMessage(content="Sign up for this event https://lu.ma/0p7ujtek")]},  # shopify walk, march 9, 12 PM one click registration
-        # input={"messages": [HumanMessage(content="Sign up for this event https://lu.ma/txi8bg6t")]},  # immigrant happy hour
-        # input={
-        #     "messages": [HumanMessage(content="Sign up for this event https://www.meetup.com/frenchies/events/303804266/")]
-        # },  # meetup simple registration with form
-        # input={"messages": [HumanMessage(content="Sign up for 2 best events for Monday and Tuesday next week. ")]},
-        input={"messages": [HumanMessage(content="Let's find an event for Friday and Saturday next week after 3:00 PM and sign up for them. ")]},
-        config=config,
-        interrupt_before=["pause_web_action"],
-    )
+    snapshot = graph.get_state(config)
+    if snapshot.next:
+        print(f"Resuming thread {thread_id} at {snapshot.next}")
+        result = await graph.ainvoke(None, config)
+    else:
+        result = await graph.ainvoke(
+            # input={"messages": [HumanMessage(content="Find best events for the next week and sign up (register) for all of them through the web browser")]},
+            # input={"messages": [HumanMessage(content="Sign up for this event https://lu.ma/h3qpiaqg")]},  # without dropdown menus
+            # input={"messages": [HumanMessage(content="Sign up for this event https://lu.ma/x58kfr7r")]},  # with dropdown menus
+            # input={"messages": [HumanMessage(content="Sign up for this event and/or confirm participation (url=https://lu.ma/x58kfr7r")]}, # with dropdown menu, works now
+            # input={"messages": [HumanMessage(content="Sign up for this event https://lu.ma/y2viikq6")]},  # waitlist, bloom...
+            # input={"messages": [HumanMessage(content="Sign up for this event https://lu.ma/0p7ujtek")]},  # shopify walk, march 9, 12 PM one click registration
+            # input={"messages": [HumanMessage(content="Sign up for this event https://lu.ma/txi8bg6t")]},  # immigrant happy hour
+            # input={
+            #     "messages": [HumanMessage(content="Sign up for this event https://www.meetup.com/frenchies/events/303804266/")]
+            # },  # meetup simple registration with form
+            # input={"messages": [HumanMessage(content="Sign up for 2 best events for Monday and Tuesday next week. ")]},
+            input={"messages": [HumanMessage(content="Let's find an event for Friday and Saturday next week after 3:00 PM and sign up for them. ")]},
+            config=config,
+            interrupt_before=["pause_web_action"],
+        )
     # print(f"Result: {result}")
 
     snapshot = graph.get_state(config)
@@ -208,6 +272,8 @@ async def main():
             )
         snapshot = graph.get_state(config)
 
+    print(get_prompt_cache_stats().report())
+
     # config = {
     #     "configurable": {
     #         "thread_id": thread_id,
@@ -4,7 +4,6 @@ from datetime import datetime
 
 from langchain_core.messages import ToolMessage
 from langchain_core.prompts import ChatPromptTemplate
-from langgraph.checkpoint.memory import MemorySaver
 from langgraph.graph import END, START, StateGraph
 from langgraph.prebuilt import tools_condition
 
@@ -14,8 +13,9 @@ from events_agent.assistant.events import (
 )
 from events_agent.assistant.transitions import CompleteOrEscalate
 from events_agent.domain.state import State
+from events_agent.graph.checkpoint import get_checkpointer
 from events_agent.tools.calendar import get_calendar_events
-from events_agent.tools.events import search_events
+from events_agent.tools.events import search_events, search_more_events
 from events_agent.utils.lang import create_tool_node_with_fallback, get_llm, print_message
 
 assistant_prompt = ChatPromptTemplate.from_messages(
@@ -41,6 +41,7 @@ def create_graph():
 
     events_assistant_safe_tools = [
         search_events,
+        search_more_events,
         get_calendar_events,
     ]
     events_assistant_sensitive_tools = []
@@ -68,7 +69,7 @@ def create_graph():
     builder.add_edge("safe_tools", "assistant")
     builder.add_edge("sensitive_tools", "assistant")
 
-    memory = MemorySaver()
+    memory = get_checkpointer()
 
     graph = builder.compile(
         checkpointer=memory,
@@ -7,7 +7,6 @@ from langchain_core.messages import HumanMessage, ToolMessage
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.tools import tool
 from langchain_openai import ChatOpenAI
-from langgraph.checkpoint.memory import MemorySaver
 from langgraph.graph import END, START, MessagesState, StateGraph
 from langgraph.prebuilt import ToolNode, tools_condition
 
@@ -24,7 +23,8 @@ from events_agent.assistant.web_surfer import (
     web_supervisor_runnable,
 )
 from events_agent.domain.state import State
-from events_agent.tools.events import search_events
+from events_agent.graph.checkpoint import get_checkpointer
+from events_agent.tools.events import search_events, search_more_events
 from events_agent.tools.user_info import fetch_user_info
 from events_agent.utils.lang import create_tool_node_with_fallback, print_message
 
@@ -106,7 +106,7 @@ async def create_graph():
     builder.add_node("back_to_primary", create_back_to_primary())
     builder.add_edge("back_to_primary", "primary_assistant")
 
-    builder.add_node("web_supervisor", Assistant(web_supervisor_runnable))
+    builder.add_node("web_supervisor", Assistant(web_supervisor_runnable, name="web_supervisor"))
 
     # def route_web_supervisor(
     #     state: State,
@@ -171,6 +171,7 @@ async def create_graph():
     # Events Assistant (search)
     events_assistant_tools = [
         search_events,
+        search_more_events,
     ]
     builder.add_node("events_assistant", EventsAssistant(events_assistant_runnable))
     builder.add_node("events_assistant_tools", create_tool_node_with_fallback(events_assistant_tools))
@@ -208,7 +209,7 @@ async def create_graph():
     builder.add_edge("events_assistant_tools", "events_assistant")
 
     # Primary Assistant
-    builder.add_node("primary_assistant", Assistant(primary_assistant_runnable))
+    builder.add_node("primary_assistant", Assistant(primary_assistant_runnable, name="primary_assistant"))
     builder.add_node("primary_assistant_tools", create_tool_node_with_fallback(primary_assistant_tools))
 
     def route_primary_assistant(
@@ -253,7 +254,7 @@ async def create_graph():
 
     builder.add_conditional_edges("fetch_user_info", route_to_workflow)
 
-    memory = MemorySaver()
+    memory = get_checkpointer()
     graph = builder.compile(
         checkpointer=memory,
         interrupt_before=[
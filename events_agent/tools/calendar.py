@@ -3,23 +3,25 @@ import json
 import os
 from typing import Annotated, Any, Dict, List, Optional
 
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
 from langchain_core.messages import ToolMessage
 from langchain_core.tools import tool
 from langchain_core.tools.base import InjectedToolCallId
 from langgraph.prebuilt import InjectedState
 from langgraph.types import Command
 
+from events_agent.utils.payload import resolve_event_url
+
 SCOPES = ["https://www.googleapis.com/auth/calendar"]
 # SCOPES = ["https://www.googleapis.com/auth/calendar.readonly"]
 
 
 def get_credentials():
     """Get Google API credentials."""
+    # The Google client libraries are slow to import, they are loaded when the calendar is first used
+    from google.auth.transport.requests import Request
+    from google.oauth2.credentials import Credentials
+    from google_auth_oauthlib.flow import InstalledAppFlow
+
     creds = None
     if os.path.exists(".secrets/token.json"):
         creds = Credentials.from_authorized_user_file(".secrets/token.json", SCOPES)
@@ -34,6 +36,12 @@ def get_credentials():
     return creds
 
 
+def get_calendar_service():
+    from googleapiclient.discovery import build
+
+    return build("calendar", "v3", credentials=get_credentials())
+
+
 @tool
 def get_calendar_events(
     tool_call_id: Annotated[str, InjectedToolCallId],
@@ -51,9 +59,7 @@ def get_calendar_events(
     Returns:
         List[Dict]: A list of dictionaries containing the event details.
     """
-    creds = get_credentials()
-
-    service = build("calendar", "v3", credentials=creds)
+    service = get_calendar_service()
     now = datetime.datetime.utcnow().isoformat() + "Z"  # 'Z' indicates UTC time
     time_min = start_time if start_time else now
     time_max = end_time if end_time else None
@@ -78,14 +84,8 @@ def get_calendar_events(
         }
         calendar_events.append(calendar_event)
 
-    events_status = state.get("events_status", {})
-    for event in calendar_events:
-        url = event.get("url")
-        if url:
-            url_status = events_status.get(url)
-            if url_status:
-                url_status["scheduled_to_calendar"] = True
-                events_status[url] = url_status
+    known_events = state.get("events_status", {})
+    events_status = {event["url"]: {"scheduled_to_calendar": True} for event in calendar_events if event.get("url") in known_events}
 
     event_messages = [
         {
@@ -123,15 +123,14 @@ def create_calendar_event(
         end_time (str): The end time of the event in ISO format in UTC.
         title (str): The title of the event.
         description (Optional[str]): A brief description of the event.
-        url (Optional[str]): The URL of the event.
+        url (Optional[str]): The id (ev_...) or URL of the event.
         location (Optional[str]): The location of the event.
 
     Returns:
         Dict: A dictionary containing the created event details.
     """
-    creds = get_credentials()
-
-    service = build("calendar", "v3", credentials=creds)
+    url = resolve_event_url(url, state.get("events_status", {})) if url else url
+    service = get_calendar_service()
     url_description = f"{url}\n\n{description}" if url else description
     event = {
         "summary": title,
@@ -153,17 +152,10 @@ def create_calendar_event(
     }
     print(f"Calendar event created: {created_event_json}")
 
-    events_status = state.get("events_status", {})
-    url_status = events_status.get(url, {})
-    url_status["scheduled_to_calendar"] = True
-    events_status[url] = url_status
-
-    return Command(
-        update={
-            "events_status": events_status,
-            "messages": [ToolMessage(created_event_json, tool_call_id=tool_call_id)],
-        }
-    )
+    update: Dict[str, Any] = {"messages": [ToolMessage(created_event_json, tool_call_id=tool_call_id)]}
+    if url:
+        update["events_status"] = {url: {"scheduled_to_calendar": True}}
+    return Command(update=update)
 
 
 if __name__ == "__main__":
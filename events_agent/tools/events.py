@@ -1,202 +1,103 @@
 from datetime import date, datetime
-import json
 from typing import Annotated, Any, Dict, Optional, List
 from pydantic import BaseModel
 from langgraph.prebuilt import InjectedState
 
 from langchain_core.messages import ToolMessage
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.tools import tool
+from langchain_core.tools import StructuredTool
 from langchain_core.tools.base import InjectedToolCallId
 from langgraph.types import Command
 
-from events_agent.client.opensearch import get_opensearch_client
-from events_agent.domain.state import EventDetails, State
+from events_agent.client.store import SearchPage, get_event_store, normalize_time_window
+from events_agent.domain.state import EventDetails, SearchCursor, State
 from events_agent.utils.lang import get_llm
+from events_agent.utils.payload import EVENT_DETAILS_RESULT_FIELDS, SEARCH_RESULT_FIELDS, encode_events, event_handle, resolve_event_url
 
 # Constants
 OPENSEARCH_URL = "https://search-manual-test-fczgibvrlzm6dobny7dhtzpqmq.aos.us-east-1.on.aws"
-ALL_EVENTS_INDEX = "all-events"
+DEFAULT_PAGE_SIZE = 5
 
 
-@tool
-def search_events(
-    tool_call_id: Annotated[str, InjectedToolCallId],
-    # events_status: Annotated[dict, InjectedState("events_status")],
-    state: Annotated[dict, InjectedState],
-    start_time: Optional[date | datetime] = None,
-    end_time: Optional[date | datetime] = None,
-    # limit: int = 10,
-    # additional_fields: Optional[list[str]] = None,
-):
-    """Search for events based on the event time range."""
-
-    # sort: Optional[list[Dict[str, Any]]] = (None,)
-
-    client = get_opensearch_client()
-
-    search_params = {
-        "index": ALL_EVENTS_INDEX,
-        "size": 5,
-        "body": {
-            "_source": [
-                "url",
-                "dateStart",
-                "dateEnd",
-                "title",
-                "hosts",
-                "group",
-                "address",
-                "guests",
-                "attendees",
-                "shortDescription",
-                "cover",
-                "tags",
-                "venue",
-                "online",
-                "price",
-                "spotsLeft",
-            ],
-            "query": {
-                "function_score": {
-                    "query": {
-                        "bool": {
-                            "must": [
-                                {
-                                    "range": {
-                                        "dateStart": {
-                                            "gte": start_time.isoformat() if start_time else "now",
-                                            "lte": end_time.isoformat() if end_time else "now+14d/d",
-                                            "format": "strict_date_optional_time",
-                                        }
-                                    }
-                                }
-                            ]
-                        }
-                    },
-                    "script_score": {
-                        "script": {
-                            "source": """
-                                double compositeScore = 0;
-                                compositeScore += doc['popularity'].value * 0.1;
-                                compositeScore += doc['uniqueness'].value * 0.2;
-                                compositeScore += doc['venue_niceness'].value * 0.15;
-                                compositeScore += doc['free_admision'].value * 0.2;
-                                compositeScore += doc['drinks_provided'].value * 0.1;
-                                compositeScore += doc['food_provided'].value * 0.1;
-                                compositeScore += doc['quietness'].value * 0.05;
-                                compositeScore += doc['proximity'].value * 0.05;
-                                compositeScore += doc['non_commercial'].value * 0.025;
-                                compositeScore += doc['no_additional_expenses'].value * 0.025;
-                                
-                                // Normalize composite score to be between 0 and 1
-                                compositeScore = Math.min(Math.max(compositeScore, 0), 1);
-                                
-                                // Adjust the initial score based on the composite score
-                                double adjustmentFactor = 1 + (compositeScore - 0.5) * 2;
-                                return _score * adjustmentFactor;
-                            """
-                        }
-                    },
-                }
-            },
-            "sort": [{"_score": "desc"}, {"_id": "asc"}],
-        },
-    }
-
-    response = client.search(**search_params)
-    results = [EventDetails(**hit["_source"]) for hit in response["hits"]["hits"]]
-
-    events_status = state.get("events_status", {})
+def _next_cursor(page: SearchPage, start_time: str, end_time: str, page_size: int, query: Optional[str]) -> Optional[SearchCursor]:
+    """Build the cursor of the next page, or None when the last page was returned."""
+    if page["search_after"] is None:
+        return None
+    return SearchCursor(
+        start_time=start_time,
+        end_time=end_time,
+        page_size=page_size,
+        query=query,
+        search_after=page["search_after"],
+        pit_id=page["pit_id"],
+    )
+
+
+def _known_events(state: dict) -> Dict[str, Any]:
+    return {**state.get("events_details", {}), **state.get("events_status", {})}
+
+
+def _found_event(result: EventDetails) -> Dict[str, Any]:
+    return {"found": True, "title": result.get("title"), "dateStart": result.get("dateStart")}
+
+
+def _search_events_command(
+    tool_call_id: str,
+    state: dict,
+    events: List[Dict[str, Any]],
+    cursor: Optional[SearchCursor],
+    fields: Optional[List[str]] = None,
+    not_found: str = "NOT_FOUND",
+) -> Command:
+    results = [EventDetails(**event) for event in events]
+
+    known_status = state.get("events_status", {})
+    events_status = {}
+    events_details = {}
     for result in results:
-        url_status = events_status.get(result["url"], {})
-        url_status["found"] = True
-        url_status["registred"] = False
-        url_status["scheduled_to_calendar"] = None
-        url_status["details"] = result
+        url_status = _found_event(result)
+        # Found again, the flags recorded by the registration and calendar tools are kept
+        if result["url"] not in known_status:
+            url_status["registered"] = False
+            url_status["scheduled_to_calendar"] = None
         events_status[result["url"]] = url_status
+        events_details[result["url"]] = result
 
     if results:
         print(f"Found {len(results)} events")
         print(f"First event: {results[0]}")
 
-        results_json = [
-            {
-                "type": "text",
-                "text": json.dumps(result),
-            }
-            for result in results
-        ]
-
+        footer = "More events are available, call search_more_events to get the next page." if cursor else ""
         return Command(
             update={
                 "events_status": events_status,
-                "messages": [ToolMessage(results_json, tool_call_id=tool_call_id)],
+                "events_details": events_details,
+                "search_cursor": cursor,
+                "messages": [ToolMessage(encode_events(results, fields or SEARCH_RESULT_FIELDS, footer=footer), tool_call_id=tool_call_id)],
             }
         )
     return Command(
         update={
             "events_status": events_status,
-            "messages": [ToolMessage("NOT_FOUND", tool_call_id=tool_call_id)],
+            "search_cursor": None,
+            "messages": [ToolMessage(not_found, tool_call_id=tool_call_id)],
         }
     )
 
 
-@tool
-def get_event_details(
-    tool_call_id: Annotated[str, InjectedToolCallId],
-    # events_status: Annotated[dict, InjectedState("events_status")],
-    state: Annotated[dict, InjectedState],
-    url: str,
-):
-    """Get event details based on the event URL."""
-    client = get_opensearch_client()
-    search_params = {
-        "index": ALL_EVENTS_INDEX,
-        "size": 1,
-        "body": {
-            "_source": [
-                "url",
-                "dateStart",
-                "dateEnd",
-                "title",
-                "hosts",
-                "group",
-                "address",
-                "guests",
-                "attendees",
-                "shortDescription",
-                "cover",
-                "tags",
-                "venue",
-                "online",
-                "price",
-                "spotsLeft",
-            ],
-            "query": {"term": {"url": url}},
-        },
-    }
-
-    response = client.search(**search_params)
-    results = [EventDetails(**hit["_source"]) for hit in response["hits"]["hits"]]
-    result = results[0] if results else None
-
-    events_status = state.get("events_status", {})
-    url_status = events_status.get(url, {})
-    if result:
-        url_status["found"] = True
-        url_status["details"] = result
-    else:
-        url_status["found"] = False
-    events_status[url] = url_status
+def _event_details_command(tool_call_id: str, state: dict, url: str, sources: Dict[str, Dict[str, Any]], fields: Optional[List[str]] = None) -> Command:
+    result = EventDetails(**sources[url]) if url in sources else None
 
-    if results:
-        print(f"Found event: {results[0]}")
-        result_json = json.dumps(results[0])
+    events_status = {url: _found_event(result) if result else {"found": False}}
+    events_details = {url: result} if result else {}
+
+    if result:
+        print(f"Found event: {result}")
         return Command(
             update={
                 "events_status": events_status,
-                "messages": [ToolMessage(result_json, tool_call_id=tool_call_id)],
+                "events_details": events_details,
+                "messages": [ToolMessage(encode_events([result], fields or EVENT_DETAILS_RESULT_FIELDS), tool_call_id=tool_call_id)],
             }
         )
     return Command(
@@ -207,9 +108,159 @@ def get_event_details(
     )
 
 
+def _events_details_command(tool_call_id: str, state: dict, urls: List[str], sources: Dict[str, Dict[str, Any]], fields: Optional[List[str]] = None) -> Command:
+    events_status = {}
+    events_details = {}
+    results = []
+    not_found = []
+    for url in urls:
+        source = sources.get(url)
+        if source:
+            result = EventDetails(**source)
+            events_status[url] = _found_event(result)
+            events_details[url] = result
+            results.append(result)
+        else:
+            events_status[url] = {"found": False}
+            not_found.append(event_handle(url) if url.startswith("http") else url)
+
+    footer = f"NOT_FOUND: {', '.join(not_found)}" if not_found else ""
+    return Command(
+        update={
+            "events_status": events_status,
+            "events_details": events_details,
+            "messages": [ToolMessage(encode_events(results, fields or EVENT_DETAILS_RESULT_FIELDS, footer=footer), tool_call_id=tool_call_id)],
+        }
+    )
+
+
+FieldsArg = Annotated[
+    Optional[List[str]],
+    f"Event fields to return, defaults to {', '.join(SEARCH_RESULT_FIELDS)}. Also available: url, group, hosts, address, shortDescription, guests, attendees, cover.",
+]
+EventRefArg = Annotated[str, "The event id (ev_...) or URL"]
+
+
+def _search_events(
+    tool_call_id: Annotated[str, InjectedToolCallId],
+    state: Annotated[dict, InjectedState],
+    start_time: Optional[date | datetime] = None,
+    end_time: Optional[date | datetime] = None,
+    query: Optional[str] = None,
+    page_size: int = DEFAULT_PAGE_SIZE,
+    fields: FieldsArg = None,
+):
+    """Search for events based on the event time range and optional keywords. Returns the first page of the best ranked events."""
+    start_time, end_time = normalize_time_window(start_time, end_time)
+    page = get_event_store().search(start_time, end_time, page_size, query)
+    return _search_events_command(tool_call_id, state, page["events"], _next_cursor(page, start_time, end_time, page_size, query), fields)
+
+
+async def _asearch_events(
+    tool_call_id: Annotated[str, InjectedToolCallId],
+    state: Annotated[dict, InjectedState],
+    start_time: Optional[date | datetime] = None,
+    end_time: Optional[date | datetime] = None,
+    query: Optional[str] = None,
+    page_size: int = DEFAULT_PAGE_SIZE,
+    fields: FieldsArg = None,
+):
+    """Search for events based on the event time range and optional keywords. Returns the first page of the best ranked events."""
+    start_time, end_time = normalize_time_window(start_time, end_time)
+    page = await get_event_store().asearch(start_time, end_time, page_size, query)
+    return _search_events_command(tool_call_id, state, page["events"], _next_cursor(page, start_time, end_time, page_size, query), fields)
+
+
+def _search_more_events(
+    tool_call_id: Annotated[str, InjectedToolCallId],
+    state: Annotated[dict, InjectedState],
+    fields: FieldsArg = None,
+):
+    """Get the next page of events of the last search_events call."""
+    cursor = state.get("search_cursor")
+    if not cursor:
+        return Command(update={"messages": [ToolMessage("NO_MORE_EVENTS", tool_call_id=tool_call_id)]})
+
+    query = cursor.get("query")
+    page = get_event_store().search(cursor["start_time"], cursor["end_time"], cursor["page_size"], query, cursor["search_after"], cursor.get("pit_id"))
+    next_cursor = _next_cursor(page, cursor["start_time"], cursor["end_time"], cursor["page_size"], query)
+    return _search_events_command(tool_call_id, state, page["events"], next_cursor, fields, not_found="NO_MORE_EVENTS")
+
+
+async def _asearch_more_events(
+    tool_call_id: Annotated[str, InjectedToolCallId],
+    state: Annotated[dict, InjectedState],
+    fields: FieldsArg = None,
+):
+    """Get the next page of events of the last search_events call."""
+    cursor = state.get("search_cursor")
+    if not cursor:
+        return Command(update={"messages": [ToolMessage("NO_MORE_EVENTS", tool_call_id=tool_call_id)]})
+
+    query = cursor.get("query")
+    page = await get_event_store().asearch(cursor["start_time"], cursor["end_time"], cursor["page_size"], query, cursor["search_after"], cursor.get("pit_id"))
+    next_cursor = _next_cursor(page, cursor["start_time"], cursor["end_time"], cursor["page_size"], query)
+    return _search_events_command(tool_call_id, state, page["events"], next_cursor, fields, not_found="NO_MORE_EVENTS")
+
+
+def _get_event_details(
+    tool_call_id: Annotated[str, InjectedToolCallId],
+    state: Annotated[dict, InjectedState],
+    url: EventRefArg,
+    fields: FieldsArg = None,
+):
+    """Get event details based on the event id or URL."""
+    url = resolve_event_url(url, _known_events(state))
+    return _event_details_command(tool_call_id, state, url, get_event_store().get([url]), fields)
+
+
+async def _aget_event_details(
+    tool_call_id: Annotated[str, InjectedToolCallId],
+    state: Annotated[dict, InjectedState],
+    url: EventRefArg,
+    fields: FieldsArg = None,
+):
+    """Get event details based on the event id or URL."""
+    url = resolve_event_url(url, _known_events(state))
+    return _event_details_command(tool_call_id, state, url, await get_event_store().aget([url]), fields)
+
+
+def _get_events_details(
+    tool_call_id: Annotated[str, InjectedToolCallId],
+    state: Annotated[dict, InjectedState],
+    urls: Annotated[List[str], "The event ids (ev_...) or URLs"],
+    fields: FieldsArg = None,
+):
+    """Get the details of several events at once based on their ids or URLs."""
+    urls = list(dict.fromkeys(resolve_event_url(url, _known_events(state)) for url in urls))
+    return _events_details_command(tool_call_id, state, urls, get_event_store().get(urls), fields)
+
+
+async def _aget_events_details(
+    tool_call_id: Annotated[str, InjectedToolCallId],
+    state: Annotated[dict, InjectedState],
+    urls: Annotated[List[str], "The event ids (ev_...) or URLs"],
+    fields: FieldsArg = None,
+):
+    """Get the details of several events at once based on their ids or URLs."""
+    urls = list(dict.fromkeys(resolve_event_url(url, _known_events(state)) for url in urls))
+    return _events_details_command(tool_call_id, state, urls, await get_event_store().aget(urls), fields)
+
+
+# The tools expose a sync and an async implementation: graphs driven with ainvoke/astream
+# use the non-blocking client, while the sync graphs keep working with the requests-based one.
+# Both go through the event store selected by EVENTS_STORE (see events_agent.client.store).
+search_events = StructuredTool.from_function(func=_search_events, coroutine=_asearch_events, name="search_events")
+search_more_events = StructuredTool.from_function(func=_search_more_events, coroutine=_asearch_more_events, name="search_more_events")
+get_event_details = StructuredTool.from_function(func=_get_event_details, coroutine=_aget_event_details, name="get_event_details")
+get_events_details = StructuredTool.from_function(func=_get_events_details, coroutine=_aget_events_details, name="get_events_details")
+
+
 safe_tools = [
     search_events,
+    search_more_events,
     get_event_details,
+    get_events_details,
 ]
 
 sensitive_tools = []
@@ -225,11 +276,14 @@ assistant_prompt = ChatPromptTemplate.from_messages(
             "The user is not aware of the different specialized assistants, so do not mention them; just quietly delegate through function calls. "
             "Provide detailed information to the user, and always double-check the database before concluding that information is unavailable. "
             "When searching, be persistent. Expand your query bounds if the first search returns no results. "
-            "If a search comes up empty, expand your search before giving up."
-            "\nCurrent time: {time}.",
+            "If a search comes up empty, expand your search before giving up.",
         ),
         ("placeholder", "{messages}"),
+        ("system", "Current time: {time}."),
     ]
 ).partial(time=datetime.now)
 
-assistant_runnable = assistant_prompt | get_llm().bind_tools(safe_tools + sensitive_tools)
+
+def create_assistant_runnable():
+    # Built on demand, the model client is only needed by the graphs and not by the tools
+    return assistant_prompt | get_llm().bind_tools(safe_tools + sensitive_tools)
@@ -1,12 +1,6 @@
 from datetime import date, datetime
 from typing import Dict, List, Optional
 
-import pytz
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
 from langchain_core.runnables import RunnableConfig
 from langchain_core.tools import tool
 
@@ -1,59 +1,150 @@
 import asyncio
-import base64
 import logging
 import os
-import shutil
-import uuid
-from dataclasses import dataclass
 from datetime import datetime
-from typing import Dict, Optional
-
-import autogen
-import autogen_core
-import playwright
-from autogen_agentchat.agents import AssistantAgent
-from autogen_agentchat.conditions import TextMentionTermination
-from autogen_agentchat.teams import RoundRobinGroupChat
-from autogen_agentchat.ui import Console
-from autogen_core import EVENT_LOGGER_NAME
-from autogen_ext.models.openai import OpenAIChatCompletionClient
-from langchain_anthropic import ChatAnthropic
-from langchain_community.tools.tavily_search import TavilySearchResults
+from typing import TYPE_CHECKING, List, Optional, Tuple, TypedDict
+
 from langchain_core.messages import ToolMessage
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.runnables import Runnable, RunnableConfig
-from langchain_core.tools import tool
-from langgraph.graph import MessagesState, StateGraph
 from langgraph.types import Command
-from playwright.async_api import async_playwright
-from playwright.sync_api import sync_playwright
 from pydantic import BaseModel, Field
 
-from events_agent.agents.web_surfer import MultimodalWebSurfer
-from events_agent.assistant.default import CompleteOrEscalate
-from events_agent.domain.state import State
-from events_agent.utils.lang import create_tool_node_with_fallback, get_llm, print_message
-
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(EVENT_LOGGER_NAME)
-logger.addHandler(logging.FileHandler(f".web/log/{datetime.now().strftime('%Y%m%d_%H%M%S')}_autogen.txt"))
-logger.setLevel(logging.INFO)
-
-
-web_surfer_agent = MultimodalWebSurfer(
-    name="web_surfer_agent",
-    model_client=OpenAIChatCompletionClient(model=os.environ["OPENAI_API_MODEL_NAME"], api_key=os.environ["OPENAI_API_KEY"]),
-    start_page="https://google.com/",
-    description="I am a web surfer agent. I can help you with web browsing tasks. Always use Google for login, the browser should have a session available with creds.",
-    debug_dir=".web/debug",
-    # browser_data_dir=".web/browser_data",
-    downloads_folder=".web/downloads",
-    # use_ocr=True,
-    to_save_screenshots=True,
-    headless=False,
-    connect_over_cdp="http://192.168.1.33:9222",
-    # browser_data_dir="/mnt/c/Users/izlobin/chrome-debug",
-)
+from events_agent.domain.state import State, UserInfo
+from events_agent.utils.payload import event_handle, resolve_event_url
+
+# autogen, playwright and the model clients take seconds to import, they are loaded on the first registration
+if TYPE_CHECKING:
+    from events_agent.agents.web_surfer import BrowserContextPool, MultimodalWebSurfer
+
+WEB_SURFER_CDP_URL = os.getenv("WEB_SURFER_CDP_URL", "http://192.168.1.33:9222")
+# The number of browser workers registering for events in parallel, each one drives its own context of the shared browser
+WEB_SURFER_MAX_WORKERS = int(os.getenv("WEB_SURFER_MAX_WORKERS", "3"))
+WEB_SURFER_RECYCLE_AFTER = int(os.getenv("WEB_SURFER_RECYCLE_AFTER", "20"))
+WEB_SURFER_WARM_UP = int(os.getenv("WEB_SURFER_WARM_UP", "1"))
+# The screenshots sent to the model: "png", "jpeg" or "webp", and the quality of the last two
+WEB_SURFER_SCREENSHOT_FORMAT = os.getenv("WEB_SURFER_SCREENSHOT_FORMAT", "jpeg")
+WEB_SURFER_SCREENSHOT_QUALITY = int(os.getenv("WEB_SURFER_SCREENSHOT_QUALITY", "80"))
+WEB_SURFER_LOG_DIR = ".web/log"
+
+_browser_context_pool = None
+_web_surfer_pool = None
+_log_configured = False
+
+
+def configure_web_surfer_logging() -> None:
+    """Send the autogen events of the web surfers to a log file of this run, once."""
+    global _log_configured
+    if _log_configured:
+        return
+
+    from autogen_core import EVENT_LOGGER_NAME
+
+    os.makedirs(WEB_SURFER_LOG_DIR, exist_ok=True)
+    logging.basicConfig(level=logging.INFO)
+    logger = logging.getLogger(EVENT_LOGGER_NAME)
+    logger.addHandler(logging.FileHandler(f"{WEB_SURFER_LOG_DIR}/{datetime.now().strftime('%Y%m%d_%H%M%S')}_autogen.txt"))
+    logger.setLevel(logging.INFO)
+    _log_configured = True
+
+
+def get_browser_context_pool() -> "BrowserContextPool":
+    """One browser for all the surfers, each task runs in its own context logged in with the storage state of the browser."""
+    global _browser_context_pool
+    if _browser_context_pool is None:
+        from events_agent.agents.web_surfer import BrowserContextPool
+
+        _browser_context_pool = BrowserContextPool(
+            max_size=WEB_SURFER_MAX_WORKERS,
+            recycle_after=WEB_SURFER_RECYCLE_AFTER,
+            warm_up=WEB_SURFER_WARM_UP,
+            connect_over_cdp=WEB_SURFER_CDP_URL,
+            headless=False,
+            storage_state=os.getenv("WEB_SURFER_STORAGE_STATE"),
+        )
+    return _browser_context_pool
+
+
+def create_web_surfer_agent(name: str = "web_surfer_agent") -> "MultimodalWebSurfer":
+    from autogen_ext.models.openai import OpenAIChatCompletionClient
+
+    from events_agent.agents.web_surfer import MultimodalWebSurfer
+
+    configure_web_surfer_logging()
+    return MultimodalWebSurfer(
+        name=name,
+        model_client=OpenAIChatCompletionClient(model=os.environ["OPENAI_API_MODEL_NAME"], api_key=os.environ["OPENAI_API_KEY"]),
+        start_page="https://google.com/",
+        description="I am a web surfer agent. I can help you with web browsing tasks. Always use Google for login, the browser should have a session available with creds.",
+        debug_dir=".web/debug",
+        # browser_data_dir=".web/browser_data",
+        downloads_folder=".web/downloads",
+        # use_ocr=True,
+        to_save_screenshots=True,
+        headless=False,
+        connect_over_cdp=WEB_SURFER_CDP_URL,
+        screenshot_format=WEB_SURFER_SCREENSHOT_FORMAT,
+        screenshot_quality=WEB_SURFER_SCREENSHOT_QUALITY,
+        # browser_data_dir="/mnt/c/Users/izlobin/chrome-debug",
+        context_pool=get_browser_context_pool(),
+    )
+
+
+class WebSurferPool:
+    """
+    A bounded pool of web surfer agents.
+
+    Agents are created on demand up to max_workers and handed out one task at a time, so at most max_workers
+    registrations drive the browser concurrently. An agent is reset before going back to the pool, which gives its
+    browser context back to the context pool.
+
+    Args:
+        max_workers (int): The maximum number of agents.
+    """
+
+    def __init__(self, max_workers: int = WEB_SURFER_MAX_WORKERS) -> None:
+        self.max_workers = max(max_workers, 1)
+        self._agents: List["MultimodalWebSurfer"] = []
+        self._idle: List["MultimodalWebSurfer"] = []
+        self._available: Optional[asyncio.Condition] = None
+
+    async def acquire(self) -> "MultimodalWebSurfer":
+        if self._available is None:
+            self._available = asyncio.Condition()
+        async with self._available:
+            while not self._idle and len(self._agents) >= self.max_workers:
+                await self._available.wait()
+            if self._idle:
+                return self._idle.pop()
+            agent = create_web_surfer_agent(f"web_surfer_agent_{len(self._agents)}")
+            self._agents.append(agent)
+            return agent
+
+    async def release(self, agent: "MultimodalWebSurfer") -> None:
+        from autogen_core import CancellationToken
+
+        try:
+            await agent.on_reset(CancellationToken())
+        except Exception as e:
+            print(f"Error resetting {agent.name}: {str(e)}")
+        assert self._available is not None
+        async with self._available:
+            self._idle.append(agent)
+            self._available.notify()
+
+    async def close(self) -> None:
+        for agent in self._agents:
+            await agent.close()
+        self._agents = []
+        self._idle = []
+        if _browser_context_pool is not None:
+            await _browser_context_pool.close()
+
+
+def get_web_surfer_pool() -> WebSurferPool:
+    global _web_surfer_pool
+    if _web_surfer_pool is None:
+        _web_surfer_pool = WebSurferPool()
+    return _web_surfer_pool
+
 
 # @tool
 # async def run_web_task(url: str, task: str, user_info: str) -> Dict:
@@ -93,15 +184,6 @@ web_surfer_agent = MultimodalWebSurfer(
 #     return content
 
 
-from typing import Sequence
-
-from autogen_agentchat.base import TerminatedException, TerminationCondition
-from autogen_agentchat.messages import AgentEvent, ChatMessage, StopMessage, ToolCallExecutionEvent
-from autogen_core import Component
-from pydantic import BaseModel
-from typing_extensions import Self
-
-
 def approve(reasoning: str) -> None:
     """Approve the message when all feedbacks have been addressed."""
     print(f"Approved. Reasoning: {reasoning}")
@@ -119,18 +201,25 @@ class ToWebRegisterForEvent(BaseModel):
     """Transfers work to a specialized assistant to handle web browsing tasks."""
 
     request: str = Field(description="Additional information about the event registration request.")
-    url: str = Field(description="The URL of the event page.")
+    url: str = Field(description="The id (ev_...) or URL of the event page.")
 
 
-async def web_register_for_event(state: State):
-    tool_call = state["messages"][-1].tool_calls[0]
+class ToWebRegisterForEvents(BaseModel):
+    """Registers for several events at once, each one in its own browser tab."""
 
-    assert tool_call["name"] == "ToWebRegisterForEvent", "Expected tool call to be 'ToWebRegisterForEvent'"
+    request: str = Field(description="Additional information about the event registration request.")
+    urls: List[str] = Field(description="The ids (ev_...) or URLs of the event pages.")
+
+
+class RegistrationTask(TypedDict):
+    tool_call_id: str
+    url: str
+    request: str
+    user_info: UserInfo
 
-    request = tool_call["args"]["request"]
-    url = tool_call["args"]["url"]
-    user_info = state["user_info"]
 
+async def register_for_event(url: str, request: str, user_info: UserInfo) -> Tuple[bool, str]:
+    """Register the user for the event with an agent of the pool. Returns whether the registration completed and the last message of the agent."""
     task = "Register the user for the event at the specified URL:"
     if request:
         task += f"\nRequest: {request}"
@@ -156,13 +245,22 @@ async def web_register_for_event(state: State):
     # function_call_termination = FunctionCallTermination(function_name="approve")
     # agent_team = RoundRobinGroupChat([web_surfer_agent], max_turns=2, termination_condition=web_surfer_agent.termination_condition)
 
-    termination_condition = TextMentionTermination("COMPLETED") | TextMentionTermination("ERROR")
-    agent_team = RoundRobinGroupChat([web_surfer_agent], max_turns=15, termination_condition=termination_condition)
-    response = await agent_team.run(task=task)
+    from autogen_agentchat.conditions import TextMentionTermination
+    from autogen_agentchat.teams import RoundRobinGroupChat
+    from autogen_core import Image
+
+    web_surfer_pool = get_web_surfer_pool()
+    agent = await web_surfer_pool.acquire()
+    try:
+        termination_condition = TextMentionTermination("COMPLETED") | TextMentionTermination("ERROR")
+        agent_team = RoundRobinGroupChat([agent], max_turns=15, termination_condition=termination_condition)
+        response = await agent_team.run(task=task)
+    finally:
+        await web_surfer_pool.release(agent)
 
     last_message = response.messages[-1]
     if last_message.type == "MultiModalMessage":
-        if isinstance(last_message.content, list) and isinstance(last_message.content[-1], autogen_core._image.Image):
+        if isinstance(last_message.content, list) and isinstance(last_message.content[-1], Image):
             content = last_message.content[-2]
         else:
             content = last_message.content[-1]
@@ -173,22 +271,71 @@ async def web_register_for_event(state: State):
     # content = "COMPLETED"
 
     registered = True if content == "COMPLETED" else False
+    return registered, content
+
 
-    events_status = state.get("events_status", {})
-    url_status = events_status.get(url, {})
-    url_status["registered"] = registered
-    events_status[url] = url_status
+async def web_register_for_event(state: State):
+    tool_call = state["messages"][-1].tool_calls[0]
+
+    assert tool_call["name"] == "ToWebRegisterForEvent", "Expected tool call to be 'ToWebRegisterForEvent'"
+
+    url = resolve_event_url(tool_call["args"]["url"], state.get("events_status", {}))
+    registered, content = await register_for_event(url, tool_call["args"]["request"], state["user_info"])
 
     return Command(
         update={
-            "events_status": events_status,
+            "events_status": {url: {"registered": registered}},
             "messages": [ToolMessage(content, tool_call_id=tool_call["id"])],
         }
     )
 
 
+def web_register_tasks(state: State) -> List[RegistrationTask]:
+    """Split a ToWebRegisterForEvents call into one registration task per event."""
+    tool_call = state["messages"][-1].tool_calls[0]
+
+    assert tool_call["name"] == "ToWebRegisterForEvents", "Expected tool call to be 'ToWebRegisterForEvents'"
+
+    urls = [resolve_event_url(ref, state.get("events_status", {})) for ref in tool_call["args"]["urls"]]
+    return [
+        RegistrationTask(tool_call_id=tool_call["id"], url=url, request=tool_call["args"]["request"], user_info=state["user_info"])
+        for url in dict.fromkeys(urls)
+    ]
+
+
+async def web_register_worker(task: RegistrationTask):
+    # Runs once per event of the batch, the reducers merge the results of the parallel runs
+    try:
+        registered, content = await register_for_event(task["url"], task["request"], task["user_info"])
+    except Exception as e:
+        registered, content = False, f"ERROR: {repr(e)}"
+
+    return {
+        "events_status": {task["url"]: {"registered": registered}},
+        "registrations": {task["url"]: {"registered": registered, "content": content}},
+    }
+
+
+def web_register_join(state: State):
+    tool_call = state["messages"][-1].tool_calls[0]
+    registrations = state.get("registrations") or {}
+
+    lines = [f"{event_handle(url)} | {url} | {'registered' if result['registered'] else 'not registered'} | {result['content']}" for url, result in registrations.items()]
+    content = "\n".join(lines) if lines else "No events to register for."
+
+    return {
+        # None clears the results so the next batch starts empty
+        "registrations": None,
+        "messages": [ToolMessage(content, tool_call_id=tool_call["id"])],
+    }
+
+
 async def main() -> None:
+    from autogen_agentchat.teams import RoundRobinGroupChat
+
     # Define a team
+    web_surfer_pool = get_web_surfer_pool()
+    web_surfer_agent = await web_surfer_pool.acquire()
     agent_team = RoundRobinGroupChat([web_surfer_agent], max_turns=20)
 
     # stream = agent_team.run_stream(task="Register for the Climate Tech Demo Night event: https://lu.ma/9blmqsnp")
@@ -199,7 +346,8 @@ async def main() -> None:
     )
     print(result)
 
-    await web_surfer_agent.close()
+    await web_surfer_pool.release(web_surfer_agent)
+    await web_surfer_pool.close()
 
 
 if __name__ == "__main__":
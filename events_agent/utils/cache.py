@@ -0,0 +1,122 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+SEARCH_CACHE_MAXSIZE = int(os.getenv("EVENTS_CACHE_MAXSIZE", "256"))
+SEARCH_CACHE_TTL = float(os.getenv("EVENTS_CACHE_TTL", "3600"))
+# Optional on-disk tier shared by every process on the host, e.g. ".cache/events/search.db"
+SEARCH_CACHE_PATH = os.getenv("EVENTS_CACHE_PATH")
+
+_search_cache = None
+
+
+def make_cache_key(*parts: Any) -> str:
+    """Build a stable key from JSON-serializable parts."""
+    raw = json.dumps(parts, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """
+    A TTL'd, size-bounded LRU cache with an optional SQLite tier.
+
+    Entries are kept in process memory first; when a path is given, writes also go to a local SQLite file
+    so other processes (and restarts) can reuse the results until they expire.
+
+    Args:
+        maxsize (int): The maximum number of entries held in memory.
+        ttl (float): The time to live of an entry in seconds.
+        path (str | None): The SQLite file backing the cache. If None, the cache is in-process only.
+    """
+
+    def __init__(self, maxsize: int = 256, ttl: float = 3600, path: Optional[str] = None) -> None:
+        assert maxsize > 0
+        assert ttl > 0
+
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.path = path
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, expires_at REAL NOT NULL, value TEXT NOT NULL)")
+            self._db.commit()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value or None if it is missing or expired."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+
+            if self._db is not None:
+                row = self._db.execute("SELECT expires_at, value FROM cache WHERE key = ?", (key,)).fetchone()
+                if row and row[0] > now:
+                    value = json.loads(row[1])
+                    self._remember(key, row[0], value)
+                    self.disk_hits += 1
+                    return value
+
+            self.misses += 1
+            return None
+
+    def set(self, key: str, value: Any) -> None:
+        """Store a JSON-serializable value."""
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            self._remember(key, expires_at, value)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO cache (key, expires_at, value) VALUES (?, ?, ?)",
+                    (key, expires_at, json.dumps(value, default=str)),
+                )
+                self._db.execute("DELETE FROM cache WHERE expires_at <= ?", (time.time(),))
+                self._db.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM cache")
+                self._db.commit()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "size": len(self._entries),
+        }
+
+    def _remember(self, key: str, expires_at: float, value: Any) -> None:
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+
+def get_search_cache() -> ResultCache:
+    """Get or create the process-wide cache for event search results."""
+    global _search_cache
+    if _search_cache is None:
+        _search_cache = ResultCache(maxsize=SEARCH_CACHE_MAXSIZE, ttl=SEARCH_CACHE_TTL, path=SEARCH_CACHE_PATH)
+    return _search_cache
@@ -0,0 +1,145 @@
+import argparse
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+# Import budgets in milliseconds of the graph entry points and of the modules other processes start from
+IMPORT_BUDGETS_MS: Dict[str, float] = {
+    "events_agent.graph.events_registor_main": 1500,
+    # Builds its assistants, and so the OpenAI client, at import time
+    "events_agent.graph.supervisor_main": 3000,
+    "events_agent.tools.events": 1200,
+    "events_agent.client.sync": 1200,
+}
+# Packages loaded on first use only, importing an entry point must not pull them in
+LAZY_PACKAGES = [
+    "autogen",
+    "autogen_agentchat",
+    "autogen_core",
+    "autogen_ext",
+    "playwright",
+    "boto3",
+    "googleapiclient",
+    "google_auth_oauthlib",
+    "langchain_anthropic",
+    "langchain_community",
+]
+# Slower machines scale every budget, e.g. EVENTS_IMPORT_BUDGET_SCALE=2 on a shared CI runner
+IMPORT_BUDGET_SCALE = float(os.getenv("EVENTS_IMPORT_BUDGET_SCALE", "1.0"))
+IMPORT_TIME_RUNS = 3
+
+_IMPORT_TIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+@dataclass
+class ImportTiming:
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+@dataclass
+class ImportProfile:
+    """The modules imported by `python -X importtime -c "import <entry_point>"`, in the order they finished loading."""
+
+    entry_point: str
+    timings: List[ImportTiming] = field(default_factory=list)
+
+    @property
+    def total_ms(self) -> float:
+        # Top-level lines cover everything the interpreter imported for the statement, nested lines are included in them
+        return sum(timing.cumulative_us for timing in self.timings if timing.depth == 0) / 1000
+
+    @property
+    def modules(self) -> List[str]:
+        return [timing.module for timing in self.timings]
+
+    def by_package(self) -> Dict[str, float]:
+        """Milliseconds spent in each top-level package, counting only the own time of its modules."""
+        packages: Dict[str, float] = defaultdict(float)
+        for timing in self.timings:
+            packages[timing.module.split(".")[0]] += timing.self_us / 1000
+        return dict(sorted(packages.items(), key=lambda item: item[1], reverse=True))
+
+    def lazy_packages_imported(self, packages: List[str] = LAZY_PACKAGES) -> List[str]:
+        imported = {module.split(".")[0] for module in self.modules}
+        return [package for package in packages if package in imported]
+
+
+def parse_importtime(entry_point: str, output: str) -> ImportProfile:
+    profile = ImportProfile(entry_point)
+    for line in output.splitlines():
+        match = _IMPORT_TIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            profile.timings.append(ImportTiming(module, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    return profile
+
+
+def profile_import(entry_point: str, runs: int = IMPORT_TIME_RUNS, python: str = sys.executable) -> ImportProfile:
+    """
+    Import the entry point in fresh interpreters and keep the fastest run, the others being slowed down by a cold disk
+    cache or a busy machine.
+    """
+    best: Optional[ImportProfile] = None
+    for _ in range(max(runs, 1)):
+        result = subprocess.run([python, "-X", "importtime", "-c", f"import {entry_point}"], capture_output=True, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(f"Importing {entry_point} failed:\n{result.stderr[-2000:]}")
+        profile = parse_importtime(entry_point, result.stderr)
+        if best is None or profile.total_ms < best.total_ms:
+            best = profile
+    return best
+
+
+def check_budget(profile: ImportProfile, budget_ms: float) -> List[str]:
+    """Return the budget violations of the profile, an empty list when it is within budget."""
+    violations = []
+    if profile.total_ms > budget_ms:
+        violations.append(f"{profile.entry_point} imports in {profile.total_ms:.0f}ms, over its {budget_ms:.0f}ms budget")
+    for package in profile.lazy_packages_imported():
+        violations.append(f"{profile.entry_point} imports {package}, which should be loaded on first use")
+    return violations
+
+
+def format_report(profile: ImportProfile, top: int = 10) -> str:
+    lines = [f"{profile.entry_point}: {profile.total_ms:.0f}ms, {len(profile.timings)} modules"]
+    for package, ms in list(profile.by_package().items())[:top]:
+        lines.append(f"  {ms:8.1f}ms  {package}")
+    return "\n".join(lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Report the import time of the events_agent entry points and check it against their budgets")
+    parser.add_argument("entry_points", nargs="*", help="Modules to profile, every budgeted entry point by default")
+    parser.add_argument("--check", action="store_true", help="Exit with an error when an entry point is over budget or imports a lazy package")
+    parser.add_argument("--runs", type=int, default=IMPORT_TIME_RUNS, help="Imports per entry point, the fastest one is kept")
+    parser.add_argument("--top", type=int, default=10, help="Packages listed per entry point")
+    args = parser.parse_args()
+
+    violations = []
+    for entry_point in args.entry_points or list(IMPORT_BUDGETS_MS):
+        try:
+            profile = profile_import(entry_point, args.runs)
+        except RuntimeError as e:
+            print(str(e))
+            violations.append(f"{entry_point} fails to import")
+            continue
+        print(format_report(profile, args.top))
+        budget = IMPORT_BUDGETS_MS.get(entry_point)
+        if budget is not None:
+            violations += check_budget(profile, budget * IMPORT_BUDGET_SCALE)
+
+    for violation in violations:
+        print(f"Budget violation: {violation}")
+    if args.check and violations:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
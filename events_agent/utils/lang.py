@@ -2,7 +2,6 @@ import os
 
 from langchain_core.messages import ToolMessage
 from langchain_core.runnables import RunnableLambda
-from langchain_openai import ChatOpenAI
 from langgraph.prebuilt import ToolNode
 
 _llm_instance = None
@@ -11,6 +10,9 @@ _llm_instance = None
 def get_llm():
     global _llm_instance
     if _llm_instance is None:
+        # The OpenAI SDK takes about a second to import, only load it once a model is needed
+        from langchain_openai import ChatOpenAI
+
         _llm_instance = ChatOpenAI(api_key=os.getenv("OPENAI_API_KEY"), model=os.getenv("OPENAI_API_MODEL_NAME", "gpt-4o-mini"))
     return _llm_instance
 
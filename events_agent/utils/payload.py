@@ -0,0 +1,123 @@
+import hashlib
+import json
+import os
+from typing import Any, Dict, Iterable, List, Mapping, Optional
+
+# Rough size of a token for English text and JSON, good enough to budget the tool responses
+CHARS_PER_TOKEN = 4
+TOOL_RESPONSE_TOKEN_BUDGET = int(os.getenv("EVENTS_TOOL_RESPONSE_TOKEN_BUDGET", "1500"))
+MAX_LIST_ITEMS = 3
+MAX_TEXT_LENGTH = 280
+# The supervisor prompt lists the status of the most recent events only, so its size stays bounded
+EVENTS_STATUS_MAX_LINES = int(os.getenv("EVENTS_STATUS_MAX_LINES", "30"))
+EVENTS_STATUS_TITLE_LENGTH = 60
+EVENT_HANDLE_PREFIX = "ev_"
+
+# Fields returned by default: enough to rank and pick events, the rest is available on request
+SEARCH_RESULT_FIELDS = ["title", "dateStart", "dateEnd", "venue", "price", "spotsLeft", "online", "tags"]
+EVENT_DETAILS_RESULT_FIELDS = SEARCH_RESULT_FIELDS + ["url", "group", "hosts", "address", "shortDescription", "attendees"]
+
+
+def event_handle(url: str) -> str:
+    """A short id of the event, stable across turns and threads since it is derived from the URL."""
+    return EVENT_HANDLE_PREFIX + hashlib.sha1(url.encode("utf-8")).hexdigest()[:6]
+
+
+def resolve_event_url(ref: str, *known: Mapping[str, Any]) -> str:
+    """Map an event handle back to the URL among the known events (keyed by URL). URLs and unknown handles are returned as is."""
+    if not ref.startswith(EVENT_HANDLE_PREFIX):
+        return ref
+    for events in known:
+        for url in events or {}:
+            if isinstance(url, str) and url and event_handle(url) == ref:
+                return url
+    return ref
+
+
+def compact_value(value: Any) -> Any:
+    """Truncate long lists (keeping the count of the omitted items) and long texts."""
+    if isinstance(value, list) and len(value) > MAX_LIST_ITEMS:
+        return [compact_value(item) for item in value[:MAX_LIST_ITEMS]] + [f"+{len(value) - MAX_LIST_ITEMS} more"]
+    if isinstance(value, list):
+        return [compact_value(item) for item in value]
+    if isinstance(value, str) and len(value) > MAX_TEXT_LENGTH:
+        return value[:MAX_TEXT_LENGTH] + "..."
+    return value
+
+
+def compact_event(event: Mapping[str, Any], fields: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+    """Project the event on the given fields, led by its handle. Empty values are dropped."""
+    compacted: Dict[str, Any] = {"id": event_handle(event["url"])}
+    for field in fields or SEARCH_RESULT_FIELDS:
+        value = event.get(field)
+        if value is not None and value != [] and value != "":
+            compacted[field] = compact_value(value)
+    return compacted
+
+
+def dumps(value: Any) -> str:
+    return json.dumps(value, default=str, ensure_ascii=False, separators=(",", ":"))
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def encode_events(events: List[Mapping[str, Any]], fields: Optional[Iterable[str]] = None, budget: int = TOOL_RESPONSE_TOKEN_BUDGET, footer: str = "") -> str:
+    """
+    Encode events as one compact JSON object per line within a token budget.
+
+    Events that do not fit are listed by handle only, so they can still be fetched with a narrower projection.
+    """
+    fields = list(fields or SEARCH_RESULT_FIELDS)
+    lines: List[str] = []
+    omitted: List[str] = []
+    used = estimate_tokens(footer)
+    for event in events:
+        line = dumps(compact_event(event, fields))
+        tokens = estimate_tokens(line)
+        if omitted or (lines and used + tokens > budget):
+            omitted.append(event_handle(event["url"]))
+            continue
+        lines.append(line)
+        used += tokens
+
+    if omitted:
+        lines.append(f"{len(omitted)} more events omitted to stay within the response budget: {', '.join(omitted)}. Get them with get_events_details.")
+    if footer:
+        lines.append(footer)
+    return "\n".join(lines)
+
+
+def _flag(value: Optional[bool]) -> str:
+    return "?" if value is None else "yes" if value else "no"
+
+
+def render_events_status(events_status: Mapping[str, Mapping[str, Any]], max_lines: int = EVENTS_STATUS_MAX_LINES) -> str:
+    """Render one line per event: id, start, title and status flags, "?" standing for an unknown status."""
+    # Skip keys that are not event URLs, e.g. left by a tool called without one
+    items = [(url, status) for url, status in (events_status or {}).items() if isinstance(url, str) and url]
+    if not items:
+        return "none"
+
+    lines = []
+    if len(items) > max_lines:
+        # Events the user acted on are always listed, the remaining lines go to the most recently found ones
+        acted = {url for url, status in items if status.get("registered") or status.get("scheduled_to_calendar")}
+        others = [url for url, _ in items if url not in acted]
+        remaining = max(max_lines - len(acted), 0)
+        shown = acted | set(others[len(others) - remaining :] if remaining else [])
+        lines.append(f"({len(items) - len(shown)} earlier events not shown)")
+        items = [(url, status) for url, status in items if url in shown]
+    for url, status in items:
+        title = status.get("title") or ""
+        if len(title) > EVENTS_STATUS_TITLE_LENGTH:
+            title = title[:EVENTS_STATUS_TITLE_LENGTH] + "..."
+        date_start = str(status.get("dateStart") or "?")[:16].replace("T", " ")
+        # Threads checkpointed before the search tools wrote "registered" spell the flag "registred"
+        registered = status.get("registered", status.get("registred"))
+        lines.append(
+            f"{event_handle(url)} | {date_start} | {title} | "
+            f"found={_flag(status.get('found'))} registered={_flag(registered)} calendar={_flag(status.get('scheduled_to_calendar'))}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,57 @@
+import threading
+from typing import Any, Dict, Optional
+
+_prompt_cache_stats = None
+
+
+class PromptCacheStats:
+    """
+    The prompt tokens of the model calls, and how many of them the provider read from its prompt cache, per caller.
+
+    Providers cache the longest prompt prefix they have seen recently, so the prompts keep their instructions first,
+    then the conversation, and the context that changes on every call (time, user info, events status) last.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._callers: Dict[str, Dict[str, int]] = {}
+
+    def record(self, name: str, input_tokens: int, cached_tokens: int) -> None:
+        with self._lock:
+            stats = self._callers.setdefault(name, {"calls": 0, "input_tokens": 0, "cached_tokens": 0})
+            stats["calls"] += 1
+            stats["input_tokens"] += input_tokens
+            stats["cached_tokens"] += cached_tokens
+
+    def record_message(self, name: str, message: Any) -> None:
+        """Record the usage of a model response, a message without usage metadata is skipped."""
+        usage: Optional[Dict[str, Any]] = getattr(message, "usage_metadata", None)
+        if not usage:
+            return
+        details = usage.get("input_token_details") or {}
+        self.record(name, usage.get("input_tokens", 0), details.get("cache_read", 0) or 0)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {
+                name: {**stats, "hit_ratio": round(stats["cached_tokens"] / stats["input_tokens"], 3) if stats["input_tokens"] else 0.0}
+                for name, stats in self._callers.items()
+            }
+
+    def report(self) -> str:
+        lines = ["Prompt cache:"]
+        for name, stats in self.stats().items():
+            lines.append(f"  {name}: {stats['calls']} calls, {stats['cached_tokens']}/{stats['input_tokens']} input tokens cached ({stats['hit_ratio']:.0%})")
+        return "\n".join(lines)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._callers.clear()
+
+
+def get_prompt_cache_stats() -> PromptCacheStats:
+    """Get or create the process-wide prompt cache statistics."""
+    global _prompt_cache_stats
+    if _prompt_cache_stats is None:
+        _prompt_cache_stats = PromptCacheStats()
+    return _prompt_cache_stats
@@ -0,0 +1,94 @@
+import argparse
+import random
+import time
+from typing import Callable, Dict
+
+from PIL import Image, ImageDraw, ImageFont
+
+from events_agent.agents.web_surfer._set_of_mark import TOP_NO_LABEL_ZONE, add_set_of_mark
+from events_agent.agents.web_surfer._types import InteractiveRegion
+
+# The viewport of the surfer and the resolution of the screenshots sent to the model
+VIEWPORT = (1440, 1440)
+MLM_SIZE = (1224, 765)
+
+
+def synthetic_rois(count: int, seed: int = 0) -> Dict[str, InteractiveRegion]:
+    """Interactive regions of button to paragraph sizes, most of them in the viewport and the others above or below it."""
+    rnd = random.Random(seed)
+    rois: Dict[str, InteractiveRegion] = {}
+    for i in range(count):
+        width, height = rnd.randint(20, 400), rnd.randint(12, 120)
+        left = rnd.randint(0, VIEWPORT[0] - width)
+        top = rnd.randint(-VIEWPORT[1] // 4, VIEWPORT[1] + VIEWPORT[1] // 4)
+        rect = {"x": left, "y": top, "width": width, "height": height, "top": top, "right": left + width, "bottom": top + height, "left": left}
+        rois[str(10 + i)] = {"tag_name": "button", "role": "button", "aria_name": f"Button {i}", "v_scrollable": False, "rects": [rect]}
+    return rois
+
+
+def synthetic_screenshot(seed: int = 0) -> Image.Image:
+    rnd = random.Random(seed)
+    image = Image.new("RGB", VIEWPORT, (255, 255, 255))
+    draw = ImageDraw.Draw(image)
+    for _ in range(200):
+        left, top = rnd.randint(0, VIEWPORT[0]), rnd.randint(0, VIEWPORT[1])
+        draw.rectangle((left, top, left + rnd.randint(10, 300), top + rnd.randint(10, 80)), fill=tuple(rnd.randint(0, 255) for _ in range(3)))
+    return image
+
+
+def legacy_add_set_of_mark(screenshot: Image.Image, rois: Dict[str, InteractiveRegion]) -> Image.Image:
+    """The renderer before the label and color caches: one Random and one text layout per label, scaled afterwards."""
+    fnt = ImageFont.load_default(14)
+    base = screenshot.convert("L").convert("RGBA")
+    overlay = Image.new("RGBA", base.size)
+    draw = ImageDraw.Draw(overlay)
+    for r in rois:
+        for rect in rois[r]["rects"]:
+            mid = ((rect["right"] + rect["left"]) / 2.0, (rect["top"] + rect["bottom"]) / 2.0)
+            if not (0 <= mid[0] < base.size[0] and 0 <= mid[1] < base.size[1]):
+                continue
+            rnd = random.Random(int(r))
+            color = [rnd.randint(0, 255), rnd.randint(125, 255), rnd.randint(0, 50)]
+            rnd.shuffle(color)
+            color = (*color, 255)
+            luminance = color[0] * 0.3 + color[1] * 0.59 + color[2] * 0.11
+            text_color = (0, 0, 0, 255) if luminance > 90 else (255, 255, 255, 255)
+            location, anchor = ((rect["right"], rect["top"]), "rb") if rect["top"] > TOP_NO_LABEL_ZONE else ((rect["right"], rect["bottom"]), "rt")
+            draw.rectangle(((rect["left"], rect["top"]), (rect["right"], rect["bottom"])), outline=color, fill=(*color[:3], 48), width=2)
+            bbox = draw.textbbox(location, r, font=fnt, anchor=anchor, align="center")
+            draw.rectangle((bbox[0] - 3, bbox[1] - 3, bbox[2] + 3, bbox[3] + 3), fill=color)
+            draw.text(location, r, fill=text_color, font=fnt, anchor=anchor, align="center")
+    comp = Image.alpha_composite(base, overlay)
+    scaled = comp.resize(MLM_SIZE)
+    comp.close()
+    return scaled
+
+
+def time_ms(render: Callable[[], Image.Image], runs: int) -> float:
+    """The fastest of the runs, after a first one filling the caches."""
+    render().close()
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        render().close()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare the set-of-mark renderers on synthetic interactive regions")
+    parser.add_argument("--sizes", type=int, nargs="*", default=[50, 500, 5000], help="Numbers of interactive regions")
+    parser.add_argument("--runs", type=int, default=5, help="Runs per renderer, the fastest one is kept")
+    args = parser.parse_args()
+
+    screenshot = synthetic_screenshot()
+    print(f"{'regions':>8} {'legacy':>10} {'current':>10} {'speedup':>8}")
+    for count in args.sizes:
+        rois = synthetic_rois(count)
+        legacy = time_ms(lambda: legacy_add_set_of_mark(screenshot, rois), args.runs)
+        current = time_ms(lambda: add_set_of_mark(screenshot, rois, MLM_SIZE)[0], args.runs)
+        print(f"{count:>8} {legacy:8.1f}ms {current:8.1f}ms {legacy / current:7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+import pytest
+
+from events_agent.utils import cache as cache_module
+from events_agent.utils.cache import ResultCache, make_cache_key
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1_000_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> Clock:
+    clock = Clock()
+    monkeypatch.setattr(cache_module.time, "time", clock)
+    return clock
+
+
+def test_make_cache_key_ignores_dict_order() -> None:
+    assert make_cache_key("search_events", {"a": 1, "b": [1, 2]}) == make_cache_key("search_events", {"b": [1, 2], "a": 1})
+    assert make_cache_key("search_events", {"a": 1}) != make_cache_key("search_events", {"a": 2})
+
+
+def test_hits_and_misses_are_counted() -> None:
+    cache = ResultCache()
+    assert cache.get("key") is None
+    cache.set("key", {"hits": []})
+
+    assert cache.get("key") == {"hits": []}
+    assert cache.stats() == {"hits": 1, "disk_hits": 0, "misses": 1, "size": 1}
+
+
+def test_entries_expire_after_ttl(clock: Clock) -> None:
+    cache = ResultCache(ttl=60)
+    cache.set("key", 1)
+
+    clock.now += 59
+    assert cache.get("key") == 1
+    clock.now += 2
+    assert cache.get("key") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_least_recently_used_entry_is_evicted() -> None:
+    cache = ResultCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_sqlite_tier_is_shared_across_instances(tmp_path, clock: Clock) -> None:
+    path = str(tmp_path / "search.db")
+    ResultCache(ttl=60, path=path).set("key", {"hits": {"hits": [{"sort": [1.5, "id"]}]}})
+
+    other = ResultCache(ttl=60, path=path)
+    assert other.get("key") == {"hits": {"hits": [{"sort": [1.5, "id"]}]}}
+    assert other.get("key") is not None
+    assert other.stats() == {"hits": 1, "disk_hits": 1, "misses": 0, "size": 1}
+
+    clock.now += 61
+    assert ResultCache(ttl=60, path=path).get("key") is None
+
+
+def test_clear_empties_both_tiers(tmp_path) -> None:
+    path = str(tmp_path / "search.db")
+    cache = ResultCache(path=path)
+    cache.set("key", 1)
+    cache.clear()
+
+    assert cache.get("key") is None
+    assert ResultCache(path=path).get("key") is None
@@ -0,0 +1,121 @@
+from typing import Annotated, Any, Dict, List, TypedDict
+
+import pytest
+from langchain_core.messages import AIMessage, AnyMessage, HumanMessage
+from langgraph.checkpoint.base import empty_checkpoint
+from langgraph.graph import END, START, StateGraph
+from langgraph.graph.message import add_messages
+
+from events_agent.graph import checkpoint as checkpoint_module
+from events_agent.graph.checkpoint import COMPRESSED_SUFFIX, KEYED_REFS_TYPE, REFS_TYPE, SqliteCheckpointSaver
+
+
+def merge_records(left: Dict[str, Any], right: Dict[str, Any]) -> Dict[str, Any]:
+    return {**(left or {}), **(right or {})}
+
+
+class State(TypedDict):
+    messages: Annotated[List[AnyMessage], add_messages]
+    records: Annotated[Dict[str, Dict[str, Any]], merge_records]
+    note: str
+
+
+def reply(state: State) -> Dict[str, Any]:
+    turn = len(state["messages"]) // 2
+    return {"messages": [AIMessage(f"Reply {turn}")], "records": {f"key-{turn}": {"turn": turn}}, "note": f"turn {turn}"}
+
+
+def build_graph(saver: SqliteCheckpointSaver):
+    graph = StateGraph(State)
+    graph.add_node("reply", reply)
+    graph.add_edge(START, "reply")
+    graph.add_edge("reply", END)
+    return graph.compile(checkpointer=saver)
+
+
+def count(saver: SqliteCheckpointSaver, table: str, thread_id: str) -> int:
+    return saver._db.execute(f"SELECT COUNT(*) FROM {table} WHERE thread_id = ?", (thread_id,)).fetchone()[0]
+
+
+def blob_types(saver: SqliteCheckpointSaver, channel: str) -> List[str]:
+    return [row[0] for row in saver._db.execute("SELECT type FROM blobs WHERE channel = ?", (channel,))]
+
+
+def put(saver: SqliteCheckpointSaver, thread_id: str, values: Dict[str, Any]) -> Dict[str, Any]:
+    checkpoint = empty_checkpoint()
+    versions = {channel: saver.get_next_version(None, None) for channel in values}
+    checkpoint["channel_values"] = values
+    checkpoint["channel_versions"] = versions
+    return saver.put({"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}}, checkpoint, {"source": "input", "step": 0}, versions)
+
+
+def test_graph_state_round_trips_through_the_file(tmp_path) -> None:
+    path = str(tmp_path / "checkpoints.db")
+    config = {"configurable": {"thread_id": "thread"}}
+    graph = build_graph(SqliteCheckpointSaver(path))
+    for turn in range(3):
+        graph.invoke({"messages": [HumanMessage(f"Message {turn}")]}, config)
+
+    state = build_graph(SqliteCheckpointSaver(path)).get_state(config)
+
+    assert state.values == graph.get_state(config).values
+    assert [message.content for message in state.values["messages"]] == ["Message 0", "Reply 0", "Message 1", "Reply 1", "Message 2", "Reply 2"]
+    assert state.values["records"] == {"key-0": {"turn": 0}, "key-1": {"turn": 1}, "key-2": {"turn": 2}}
+    assert len(list(graph.get_state_history(config))) == 9
+
+
+def test_list_and_dict_items_are_stored_once_per_thread(tmp_path) -> None:
+    path = str(tmp_path / "checkpoints.db")
+    saver = SqliteCheckpointSaver(path)
+    graph = build_graph(saver)
+    config = {"configurable": {"thread_id": "thread"}}
+    for turn in range(3):
+        graph.invoke({"messages": [HumanMessage(f"Message {turn}")]}, config)
+
+    # 6 messages and 3 records, although every checkpoint holds the whole history
+    assert count(saver, "items", "thread") == 9
+    assert set(blob_types(saver, "messages")) == {REFS_TYPE}
+    assert set(blob_types(saver, "records")) == {KEYED_REFS_TYPE}
+
+    # A reopened saver has no digests in memory and finds the stored items
+    build_graph(SqliteCheckpointSaver(path)).invoke({"messages": [HumanMessage("Message 3")]}, config)
+    assert count(saver, "items", "thread") == 12
+
+
+def test_pending_writes_are_returned_with_their_checkpoint() -> None:
+    saver = SqliteCheckpointSaver(":memory:")
+    config = put(saver, "thread", {"note": "hello"})
+
+    saver.put_writes(config, [("note", "first"), ("records", {"a": {"turn": 1}})], "task-1")
+    saver.put_writes(config, [("note", "again")], "task-1")
+    saver.put_writes(config, [("__error__", "failed"), ("__error__", "failed twice")], "task-2")
+
+    checkpoint_tuple = saver.get_tuple(config)
+    assert checkpoint_tuple.checkpoint["channel_values"] == {"note": "hello"}
+    assert checkpoint_tuple.pending_writes == [("task-1", "note", "first"), ("task-1", "records", {"a": {"turn": 1}}), ("task-2", "__error__", "failed twice")]
+
+
+def test_large_values_are_compressed(tmp_path) -> None:
+    path = str(tmp_path / "checkpoints.db")
+    note = "screenshot " * 500
+    config = put(SqliteCheckpointSaver(path), "thread", {"note": note, "records": {}})
+
+    saver = SqliteCheckpointSaver(path)
+    assert [type_.endswith(COMPRESSED_SUFFIX) for type_ in blob_types(saver, "note")] == [True]
+    assert saver.get_tuple(config).checkpoint["channel_values"] == {"note": note, "records": {}}
+
+
+def test_gc_deletes_threads_left_untouched(monkeypatch: pytest.MonkeyPatch) -> None:
+    saver = SqliteCheckpointSaver(":memory:")
+    now = 1_000_000.0
+    monkeypatch.setattr(checkpoint_module.time, "time", lambda: now)
+    old = put(saver, "old", {"messages": [HumanMessage("Old", id="1")]})
+    now += 100
+    put(saver, "new", {"messages": [HumanMessage("New", id="2")]})
+    now += 50
+
+    assert saver.gc(max_age=120) == ["old"]
+    assert saver.get_tuple(old) is None
+    assert [count(saver, table, "old") for table in ("checkpoints", "blobs", "items", "writes")] == [0, 0, 0, 0]
+    assert count(saver, "items", "new") == 1
+    assert saver.gc(max_age=120) == []
@@ -0,0 +1,21 @@
+import re
+
+import pytest
+
+from events_agent.utils.importtime import IMPORT_BUDGET_SCALE, IMPORT_BUDGETS_MS, check_budget, profile_import
+
+_MISSING_MODULE = re.compile(r"No module named '([^']+)'")
+# More imports than the CLI default, the fastest one stays within budget on a busy runner
+RUNS = 7
+
+
+@pytest.mark.parametrize("entry_point", list(IMPORT_BUDGETS_MS))
+def test_import_budget(entry_point: str) -> None:
+    try:
+        profile = profile_import(entry_point, RUNS)
+    except RuntimeError as e:
+        missing = _MISSING_MODULE.search(str(e))
+        if missing and not missing.group(1).startswith("events_agent"):
+            pytest.skip(f"{entry_point} needs {missing.group(1)}, which is not installed")
+        raise
+    assert check_budget(profile, IMPORT_BUDGETS_MS[entry_point] * IMPORT_BUDGET_SCALE) == []
@@ -0,0 +1,80 @@
+from typing import Any, Dict
+
+import pytest
+
+from events_agent.client.local_store import SQLiteEventStore
+from events_agent.domain.scoring import composite_score
+
+WINDOW = ("2026-10-17T00:00:00", "2026-10-31T23:59:59")
+
+
+def make_event(i: int, title: str = "Meetup", date_start: str = "2026-10-20T18:00:00", **features: Any) -> Dict[str, Any]:
+    return {"url": f"https://example.com/events/{i}", "title": title, "dateStart": date_start, **features}
+
+
+@pytest.fixture
+def event_store(tmp_path) -> SQLiteEventStore:
+    return SQLiteEventStore(str(tmp_path / "events.db"))
+
+
+def urls(page) -> list:
+    return [event["url"] for event in page["events"]]
+
+
+def test_keyword_search_ranks_by_bm25_and_composite_score(event_store: SQLiteEventStore) -> None:
+    event_store.bulk_load(
+        [
+            make_event(0, "Python meetup"),
+            make_event(1, "Python meetup", uniqueness=1, free_admision=1),
+            make_event(2, "Rust meetup"),
+            make_event(3, "Python meetup", date_start="2026-11-20T18:00:00"),
+        ]
+    )
+
+    page = event_store.search(*WINDOW, 10, "python")
+
+    assert urls(page) == ["https://example.com/events/1", "https://example.com/events/0"]
+    assert page["search_after"] is None
+    assert page["pit_id"] is None
+    # FTS5 operators are matched as plain keywords
+    assert urls(event_store.search(*WINDOW, 10, 'python AND "')) == urls(page)
+
+
+def test_pages_follow_score_then_url_across_ties(event_store: SQLiteEventStore) -> None:
+    events = [make_event(i, uniqueness=i % 3 // 2, free_admision=i % 2) for i in range(7)]
+    event_store.bulk_load(events, batch_size=2)
+
+    pages = [event_store.search(*WINDOW, 3)]
+    while pages[-1]["search_after"] is not None:
+        pages.append(event_store.search(*WINDOW, 3, None, pages[-1]["search_after"]))
+
+    expected = sorted(events, key=lambda event: (-composite_score(event), event["url"]))
+    assert [url for page in pages for url in urls(page)] == [event["url"] for event in expected]
+    assert [len(page["events"]) for page in pages] == [3, 3, 1]
+    assert pages[0]["search_after"][1] == expected[2]["url"]
+
+
+def test_reloading_an_event_replaces_its_keywords(event_store: SQLiteEventStore) -> None:
+    event_store.bulk_load([make_event(0, "Python meetup")])
+    event_store.bulk_load([make_event(0, "Rust meetup")])
+
+    assert len(event_store) == 1
+    assert event_store.search(*WINDOW, 10, "python")["events"] == []
+    assert event_store.get(["https://example.com/events/0"])["https://example.com/events/0"]["title"] == "Rust meetup"
+
+
+def test_delete_before_drops_past_events(event_store: SQLiteEventStore) -> None:
+    event_store.bulk_load([make_event(0, "Python meetup", "2026-10-18T18:00:00"), make_event(1, "Python meetup", "2026-10-20T18:00:00")])
+
+    assert event_store.delete_before("2026-10-19") == 1
+    assert len(event_store) == 1
+    assert urls(event_store.search(*WINDOW, 10, "python")) == ["https://example.com/events/1"]
+    assert event_store.get(["https://example.com/events/0"]) == {}
+
+
+def test_meta_survives_reopening(tmp_path) -> None:
+    path = str(tmp_path / "events.db")
+    SQLiteEventStore(path).set_meta("sync", {"watermark": 1700000000000, "search_after": [1700000000000, "a"]})
+
+    assert SQLiteEventStore(path).get_meta("sync") == {"watermark": 1700000000000, "search_after": [1700000000000, "a"]}
+    assert SQLiteEventStore(path).get_meta("missing") is None
@@ -0,0 +1,107 @@
+import json
+
+from events_agent.utils.payload import EVENTS_STATUS_TITLE_LENGTH, MAX_LIST_ITEMS, MAX_TEXT_LENGTH, encode_events, event_handle, render_events_status, resolve_event_url
+
+
+def make_event(i: int, **fields) -> dict:
+    return {"url": f"https://example.com/events/{i}", "title": f"Event {i}", "dateStart": "2026-10-20T18:00:00", **fields}
+
+
+def test_event_handles_are_short_stable_and_resolve_back() -> None:
+    url = "https://example.com/events/1"
+    handle = event_handle(url)
+
+    assert handle == event_handle(url)
+    assert handle.startswith("ev_") and len(handle) == 9
+    assert resolve_event_url(handle, {}, {"https://example.com/events/0": {}, url: {}}) == url
+
+
+def test_urls_and_unknown_handles_resolve_to_themselves() -> None:
+    known = {"https://example.com/events/0": {}, None: {}, "": {}}
+
+    assert resolve_event_url("https://example.com/events/9", known) == "https://example.com/events/9"
+    assert resolve_event_url("ev_000000", known, None) == "ev_000000"
+
+
+def test_events_are_projected_and_compacted() -> None:
+    event = make_event(0, tags=["a", "b", "c", "d", "e"], shortDescription="x" * 1000, venue="", hosts=None)
+
+    (line,) = encode_events([event], ["title", "tags", "shortDescription", "venue", "hosts"]).splitlines()
+
+    assert json.loads(line) == {
+        "id": event_handle(event["url"]),
+        "title": "Event 0",
+        "tags": ["a", "b", "c", f"+{5 - MAX_LIST_ITEMS} more"],
+        "shortDescription": "x" * MAX_TEXT_LENGTH + "...",
+    }
+
+
+def test_events_past_the_budget_are_listed_by_handle() -> None:
+    events = [make_event(i, shortDescription="word " * 50) for i in range(10)]
+
+    lines = encode_events(events, ["title", "shortDescription"], budget=200, footer="Call search_more_events for more").splitlines()
+
+    shown = [json.loads(line)["id"] for line in lines[:-2]]
+    omitted = [event_handle(event["url"]) for event in events[len(shown) :]]
+    assert 0 < len(shown) < len(events)
+    assert shown == [event_handle(event["url"]) for event in events[: len(shown)]]
+    assert lines[-2] == f"{len(omitted)} more events omitted to stay within the response budget: {', '.join(omitted)}. Get them with get_events_details."
+    assert lines[-1] == "Call search_more_events for more"
+
+
+def test_first_event_is_kept_even_above_the_budget() -> None:
+    lines = encode_events([make_event(0, shortDescription="x" * 200), make_event(1)], ["shortDescription"], budget=1).splitlines()
+
+    assert json.loads(lines[0])["id"] == event_handle("https://example.com/events/0")
+    assert lines[1].startswith(f"1 more events omitted to stay within the response budget: {event_handle('https://example.com/events/1')}.")
+
+
+def make_status(i: int, **flags) -> dict:
+    return {"url": f"https://example.com/events/{i}", "title": f"Event {i}", "dateStart": "2026-10-20T18:00:00", "found": True, **flags}
+
+
+def test_status_lines_show_handle_start_title_and_flags() -> None:
+    events_status = {
+        "https://example.com/events/0": make_status(0, title="T" * 100, registered=True, scheduled_to_calendar=False),
+        "https://example.com/events/1": {"title": "Event 1"},
+    }
+
+    assert render_events_status(events_status).splitlines() == [
+        f"{event_handle('https://example.com/events/0')} | 2026-10-20 18:00 | {'T' * EVENTS_STATUS_TITLE_LENGTH}... | found=yes registered=yes calendar=no",
+        f"{event_handle('https://example.com/events/1')} | ? | Event 1 | found=? registered=? calendar=?",
+    ]
+
+
+def test_old_registred_spelling_is_read() -> None:
+    events_status = {"https://example.com/events/0": make_status(0, registred=True), "https://example.com/events/1": make_status(1, registered=False, registred=True)}
+
+    lines = render_events_status(events_status).splitlines()
+
+    assert "registered=yes" in lines[0]
+    assert "registered=no" in lines[1]
+
+
+def test_keys_that_are_not_urls_are_skipped() -> None:
+    assert render_events_status({"": make_status(0), None: make_status(1)}) == "none"
+    assert render_events_status({}) == "none"
+    assert render_events_status({None: make_status(1), "https://example.com/events/2": make_status(2)}).startswith(event_handle("https://example.com/events/2"))
+
+
+def test_long_status_keeps_acted_on_and_most_recent_events() -> None:
+    events_status = {f"https://example.com/events/{i}": make_status(i) for i in range(40)}
+    events_status["https://example.com/events/3"]["registered"] = True
+    events_status["https://example.com/events/10"]["scheduled_to_calendar"] = True
+
+    lines = render_events_status(events_status, max_lines=5).splitlines()
+
+    assert lines[0] == "(35 earlier events not shown)"
+    assert [line.split(" | ")[0] for line in lines[1:]] == [event_handle(f"https://example.com/events/{i}") for i in (3, 10, 37, 38, 39)]
+
+
+def test_acted_on_events_are_kept_past_the_cap() -> None:
+    events_status = {f"https://example.com/events/{i}": make_status(i, registered=i < 3) for i in range(6)}
+
+    lines = render_events_status(events_status, max_lines=2).splitlines()
+
+    assert lines[0] == "(3 earlier events not shown)"
+    assert [line.split(" | ")[0] for line in lines[1:]] == [event_handle(f"https://example.com/events/{i}") for i in range(3)]
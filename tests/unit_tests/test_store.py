@@ -0,0 +1,116 @@
+import asyncio
+from typing import Any, Dict, List
+
+import pytest
+from opensearchpy.exceptions import NotFoundError
+
+from events_agent.client import store
+from events_agent.client.store import OpenSearchEventStore
+from events_agent.utils.cache import ResultCache
+
+
+class FakeClient:
+    """Serves n events sorted by descending score, records the calls and can expire its snapshots."""
+
+    def __init__(self, n: int) -> None:
+        self.events = [{"url": f"https://example.com/events/{i}", "title": f"Event {i}"} for i in range(n)]
+        self.calls: List[Any] = []
+        self.expired = False
+
+    def create_pit(self, index: str, keep_alive: str) -> Dict[str, Any]:
+        self.calls.append("create_pit")
+        return {"pit_id": f"pit-{self.calls.count('create_pit')}"}
+
+    def delete_pit(self, body: Dict[str, Any]) -> None:
+        self.calls.append(("delete_pit", body["pit_id"]))
+
+    def search(self, **params: Any) -> Dict[str, Any]:
+        body = params["body"]
+        pit_id = body.get("pit", {}).get("id")
+        if pit_id and self.expired:
+            raise NotFoundError(404, "search_context_missing_exception", {})
+        self.calls.append(("search", pit_id, body.get("search_after")))
+        start = body["search_after"][1] + 1 if "search_after" in body else 0
+        hits = [{"_source": event, "sort": [1.0, i]} for i, event in enumerate(self.events) if i >= start][: params["size"]]
+        response: Dict[str, Any] = {"hits": {"hits": hits}}
+        if pit_id:
+            response["pit_id"] = pit_id
+        return response
+
+
+class FakeAsyncClient:
+    def __init__(self, client: FakeClient) -> None:
+        self.client = client
+
+    async def create_pit(self, **kwargs: Any) -> Dict[str, Any]:
+        return self.client.create_pit(**kwargs)
+
+    async def delete_pit(self, **kwargs: Any) -> None:
+        return self.client.delete_pit(**kwargs)
+
+    async def search(self, **kwargs: Any) -> Dict[str, Any]:
+        return self.client.search(**kwargs)
+
+
+@pytest.fixture
+def client(monkeypatch: pytest.MonkeyPatch) -> FakeClient:
+    client = FakeClient(12)
+    cache = ResultCache()
+    monkeypatch.setattr(store, "get_opensearch_client", lambda: client)
+    monkeypatch.setattr(store, "get_async_opensearch_client", lambda: FakeAsyncClient(client))
+    monkeypatch.setattr(store, "get_search_cache", lambda: cache)
+    return client
+
+
+@pytest.fixture(params=["sync", "async"])
+def search(request: pytest.FixtureRequest, client: FakeClient):
+    event_store = OpenSearchEventStore()
+    if request.param == "sync":
+        return event_store.search
+    return lambda *args: asyncio.run(event_store.asearch(*args))
+
+
+def test_repeated_full_page_search_is_served_from_cache(client: FakeClient, search) -> None:
+    first = search("2026-10-17T00:00:00", "2026-10-31T23:59:59", 5)
+    again = search("2026-10-17T00:00:00", "2026-10-31T23:59:59", 5)
+
+    assert again == first
+    assert len(first["events"]) == 5
+    assert first["search_after"] == [1.0, 4]
+    assert first["pit_id"] is None
+    assert client.calls == [("search", None, None)]
+
+
+def test_paging_opens_one_snapshot_and_deletes_it_with_the_last_page(client: FakeClient, search) -> None:
+    pages = [search("a", "b", 5)]
+    while pages[-1]["search_after"] is not None:
+        pages.append(search("a", "b", 5, None, pages[-1]["search_after"], pages[-1]["pit_id"]))
+
+    assert [event["url"] for page in pages for event in page["events"]] == [event["url"] for event in client.events]
+    assert [page["pit_id"] for page in pages] == [None, "pit-1", None]
+    assert client.calls == [
+        ("search", None, None),
+        "create_pit",
+        ("search", "pit-1", [1.0, 4]),
+        ("search", "pit-1", [1.0, 9]),
+        ("delete_pit", ["pit-1"]),
+    ]
+
+
+def test_expired_snapshot_continues_without_it(client: FakeClient, search) -> None:
+    first = search("a", "b", 5)
+    second = search("a", "b", 5, None, first["search_after"], first["pit_id"])
+    client.expired = True
+
+    third = search("a", "b", 5, None, second["search_after"], second["pit_id"])
+
+    assert [event["url"] for event in third["events"]] == [event["url"] for event in client.events[10:]]
+    assert third == {"events": third["events"], "search_after": None, "pit_id": None}
+    assert client.calls[-1] == ("search", None, [1.0, 9])
+
+
+def test_windows_minutes_apart_share_the_cached_page(client: FakeClient, search) -> None:
+    for start, end in [("2026-10-17T09:05:00", "2026-10-18T17:30:00"), ("2026-10-17T09:40:12", "2026-10-18T17:02:00")]:
+        search(*store.normalize_time_window(start, end), 5)
+
+    assert client.calls == [("search", None, None)]
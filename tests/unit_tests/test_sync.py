@@ -0,0 +1,156 @@
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+import pytest
+
+from events_agent.client import sync as sync_module
+from events_agent.client.local_store import SQLiteEventStore
+from events_agent.client.store import EventStore, SearchPage
+from events_agent.client.sync import LOCAL_PIT_ID, SYNC_OVERLAP_MS, EventsSync, SyncedEventStore
+
+BASE_INDEXED_AT = 1_700_000_000_000
+
+
+def upcoming(days: float = 2) -> str:
+    return (datetime.now(timezone.utc) + timedelta(days=days)).isoformat()
+
+
+class FakeIndex:
+    """Serves documents in (indexedAt, _id) order like the sync query, records the queries and can fail mid-run."""
+
+    def __init__(self) -> None:
+        self.docs: List[Dict[str, Any]] = []
+        self.queries: List[Dict[str, Any]] = []
+        self.fail_after: Optional[int] = None
+
+    def add(self, i: int, offset_ms: int, date_start: Optional[str] = None) -> None:
+        self.docs.append({"url": f"https://example.com/events/{i}", "title": f"Event {i}", "dateStart": date_start or upcoming(), "indexedAt": BASE_INDEXED_AT + offset_ms})
+
+    def search(self, **params: Any) -> Dict[str, Any]:
+        if self.fail_after is not None and len(self.queries) >= self.fail_after:
+            raise ConnectionError("connection reset")
+        body = params["body"]
+        self.queries.append(body)
+        since = next((must["range"]["indexedAt"]["gte"] for must in body["query"]["bool"]["must"] if "indexedAt" in must["range"]), None)
+        hits = sorted(
+            ({"_source": doc, "sort": [doc["indexedAt"], doc["url"]]} for doc in self.docs if since is None or doc["indexedAt"] >= since),
+            key=lambda hit: hit["sort"],
+        )
+        if "search_after" in body:
+            hits = [hit for hit in hits if hit["sort"] > body["search_after"]]
+        return {"hits": {"hits": hits[: params["size"]]}}
+
+
+class FakeRemote(EventStore):
+    name = "remote"
+
+    def __init__(self) -> None:
+        self.calls: List[Any] = []
+
+    def search(self, start_time, end_time, page_size, query=None, search_after=None, pit_id=None) -> SearchPage:
+        self.calls.append(("search", search_after, pit_id))
+        return SearchPage(events=[{"url": "https://example.com/remote"}], search_after=None, pit_id=None)
+
+    def get(self, urls: List[str]) -> Dict[str, Dict[str, Any]]:
+        self.calls.append(("get", urls))
+        return {url: {"url": url} for url in urls}
+
+
+@pytest.fixture
+def index() -> FakeIndex:
+    index = FakeIndex()
+    for i in range(5):
+        index.add(i, i * 1000)
+    return index
+
+
+@pytest.fixture
+def events_sync(tmp_path, index: FakeIndex) -> EventsSync:
+    return EventsSync(SQLiteEventStore(str(tmp_path / "events.db")), batch_size=2, client=index)
+
+
+def test_next_run_only_pulls_documents_since_the_watermark(events_sync: EventsSync, index: FakeIndex) -> None:
+    stats = events_sync.run_once()
+
+    assert (stats.synced, stats.cached) == (5, 5)
+    assert events_sync.state["watermark"] == BASE_INDEXED_AT + 4000
+    assert events_sync.is_fresh()
+
+    index.add(5, 500_000)
+    index.queries.clear()
+    stats = events_sync.run_once()
+
+    # Only the overlap before the watermark is read again
+    assert index.queries[0]["query"]["bool"]["must"][1]["range"]["indexedAt"]["gte"] == BASE_INDEXED_AT + 4000 - SYNC_OVERLAP_MS
+    assert (stats.synced, stats.cached) == (6, 6)
+    assert events_sync.state["watermark"] == BASE_INDEXED_AT + 500_000
+
+
+def test_interrupted_run_resumes_from_its_last_page(events_sync: EventsSync, index: FakeIndex) -> None:
+    index.fail_after = 2
+    with pytest.raises(ConnectionError):
+        events_sync.run_once()
+
+    state = events_sync.state
+    assert state["search_after"] == [BASE_INDEXED_AT + 3000, "https://example.com/events/3"]
+    assert state["next_watermark"] == BASE_INDEXED_AT + 3000
+    assert len(events_sync.store) == 4
+    assert not events_sync.is_fresh()
+
+    index.fail_after = None
+    index.queries.clear()
+    stats = events_sync.run_once()
+
+    assert index.queries[0]["search_after"] == state["search_after"]
+    assert stats.synced == 1
+    assert events_sync.state == {"watermark": BASE_INDEXED_AT + 4000, "synced_at": pytest.approx(time.time(), abs=60)}
+
+
+def test_events_past_the_horizon_are_pruned(events_sync: EventsSync, index: FakeIndex) -> None:
+    index.add(5, 5000, upcoming(days=-3))
+
+    stats = events_sync.run_once()
+
+    assert (stats.synced, stats.pruned, stats.cached) == (6, 1, 5)
+
+
+def test_fresh_sync_serves_every_page_locally(events_sync: EventsSync, monkeypatch: pytest.MonkeyPatch) -> None:
+    events_sync.run_once()
+    remote = FakeRemote()
+    synced = SyncedEventStore(events_sync.store, remote, events_sync, max_staleness=60)
+    start, end = upcoming(days=0), upcoming(days=7)
+
+    first = synced.search(start, end, 3)
+    assert first["pit_id"] == LOCAL_PIT_ID
+    assert len(first["events"]) == 3
+
+    # The sync going stale between pages does not switch the search to another ranking
+    now = time.time()
+    monkeypatch.setattr(sync_module.time, "time", lambda: now + 120)
+    second = asyncio.run(synced.asearch(start, end, 3, None, first["search_after"], first["pit_id"]))
+
+    assert second["pit_id"] == LOCAL_PIT_ID
+    assert second["search_after"] is None
+    assert len({event["url"] for event in first["events"] + second["events"]}) == 5
+    assert remote.calls == []
+
+    assert synced.search(start, end, 3)["pit_id"] is None
+    assert remote.calls == [("search", None, None)]
+
+
+def test_windows_before_the_horizon_and_stale_syncs_go_remote(events_sync: EventsSync) -> None:
+    remote = FakeRemote()
+    synced = SyncedEventStore(events_sync.store, remote, events_sync)
+
+    assert synced.search(upcoming(days=0), upcoming(days=7), 3)["events"] == [{"url": "https://example.com/remote"}]
+
+    events_sync.run_once()
+    assert not synced.serves_locally(upcoming(days=-2))
+    assert synced.serves_locally(upcoming(days=0))
+    assert synced.get(["https://example.com/events/0", "https://example.com/other"]) == {
+        "https://example.com/events/0": events_sync.store.get(["https://example.com/events/0"])["https://example.com/events/0"],
+        "https://example.com/other": {"url": "https://example.com/other"},
+    }
+    assert remote.calls == [("search", None, None), ("get", ["https://example.com/other"])]